@@ -0,0 +1,69 @@
+"""Compare TimeseriesCsvWriter with np.savetxt in append mode
+
+Usage:
+    python benchmarks/csv_writer.py --packages 1000 --samples 1000
+"""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+
+from drift_cli.export_impl.csv_writer import TimeseriesCsvWriter
+
+
+def _savetxt(path: Path, blocks):
+    """The former path: reopen file and np.savetxt for each package"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(" " * 256 + "\n")
+    for block in blocks:
+        with open(path, "a", encoding="utf-8") as file:
+            np.savetxt(file, block, delimiter=",", fmt="%.5f")
+    with open(path, "r+", encoding="utf-8") as file:
+        file.seek(0)
+        file.write(f"topic,{len(blocks)},0,0")
+
+
+def _writer(path: Path, blocks):
+    writer = TimeseriesCsvWriter(path)
+    for block in blocks:
+        writer.write(block)
+    writer.close("topic", len(blocks), 0, 0)
+
+
+@click.command()
+@click.option("--packages", default=1000, help="Number of packages")
+@click.option("--samples", default=1000, help="Number of samples in a package")
+def main(packages: int, samples: int):
+    """Run benchmark"""
+    blocks = [np.random.rand(samples).astype(np.float32) for _ in range(packages)]
+    folder = Path(tempfile.mkdtemp())
+    try:
+        results = {}
+        for name, func in (("np.savetxt", _savetxt), ("TimeseriesCsvWriter", _writer)):
+            path = folder / f"{name}.csv"
+            begin = time.perf_counter()
+            func(path, blocks)
+            results[name] = time.perf_counter() - begin
+            size = path.stat().st_size
+            print(
+                f"{name:>20}: {results[name]:.3f} s, "
+                f"{packages / results[name]:.0f} packages/s, "
+                f"{size / results[name] / 1e6:.1f} MB/s"
+            )
+
+        assert (folder / "np.savetxt.csv").read_bytes() == (
+            folder / "TimeseriesCsvWriter.csv"
+        ).read_bytes(), "outputs differ"
+        print(
+            f"{'speedup':>20}: {results['np.savetxt'] / results['TimeseriesCsvWriter']:.1f}x"
+        )
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,125 @@
+"""Measure throughput of `export raw` modes with a synthetic Drift source
+
+Each mode runs in a fresh process, so that its peak RSS isn't affected by other modes.
+No network or Drift instance is needed.
+
+Usage:
+    python benchmarks/export.py --packages 2000 --topics 2 --latency 0.0005
+    python benchmarks/export.py --mode csv --mode jpeg --samples 10000
+"""
+
+import asyncio
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+
+import click
+from synthetic import START, SyntheticClient, make_template
+
+from drift_cli.export_impl.raw import export_raw
+
+# options of export_raw and kinds of topics which each mode exports
+MODES: Dict[str, Tuple[Dict, Tuple[str, ...]]] = {
+    "raw": ({}, ("timeseries", "image", "typed")),
+    "metadata": ({"with_metadata": True}, ("timeseries", "image", "typed")),
+    "metadata-jsonl": (
+        {"with_metadata": True, "metadata_format": "jsonl"},
+        ("timeseries", "image", "typed"),
+    ),
+    "archive": ({"archive": True}, ("timeseries", "image", "typed")),
+    "csv": ({"csv": True}, ("timeseries", "typed")),
+    "npy": ({"npy": True}, ("timeseries",)),
+    "jpeg": ({"jpeg": True}, ("image",)),
+}
+
+
+def _run(mode: str, params: Dict) -> Tuple[int, int, float, float]:
+    """Export synthetic topics in a worker process
+    Returns:
+        number of packages, their size in bytes, time in seconds, peak RSS in MB
+    """
+    options, kinds = MODES[mode]
+    topics = {
+        f"{kind}-{i}": make_template(kind, params[kind])
+        for kind in kinds
+        for i in range(params["topics"])
+    }
+    client = SyntheticClient(topics, params["packages"], params["latency"])
+    size = sum(
+        len(pkg.blob)
+        for topic in topics
+        for pkg in client.walk(topic, START.timestamp(), START.timestamp() + 1)
+    )
+
+    dest = tempfile.mkdtemp()
+    try:
+        begin = time.perf_counter()
+        asyncio.run(
+            export_raw(
+                client,
+                dest,
+                params["parallel"],
+                topics=[""],
+                start=START.isoformat(),
+                stop=client.stop.isoformat(),
+                segment_size=1_000_000_000,
+                scale=0,
+                precision=5,
+                prefetch=params["prefetch"],
+                shards=params["shards"],
+                workers=params["workers"],
+                progress_mode="none",
+                **options,
+            )
+        )
+        elapsed = time.perf_counter() - begin
+    finally:
+        shutil.rmtree(dest)
+
+    rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    count = len(topics) * params["packages"]
+    return count, size * params["packages"], elapsed, rss / 1024
+
+
+@click.command()
+@click.option(
+    "--mode",
+    "modes",
+    multiple=True,
+    type=click.Choice(list(MODES)),
+    help="Modes to run, all by default",
+)
+@click.option("--packages", default=1000, help="Number of packages in each topic")
+@click.option("--topics", default=1, help="Number of topics of each kind")
+@click.option("--latency", default=0.0, help="Delay before each package in seconds")
+@click.option("--samples", "timeseries", default=1000, help="Samples in time series")
+@click.option("--image-size", "image", default=256, help="Width and height of images")
+@click.option("--fields", "typed", default=16, help="Fields in typed data")
+@click.option("--parallel", default=10, help="Number of topics exported in parallel")
+@click.option("--prefetch", default=4, help="Packages to read ahead")
+@click.option("--shards", default=1, help="Time windows of a topic read in parallel")
+@click.option("--workers", default=None, type=int, help="Processes for JPEG")
+def main(modes: List[str], **params):
+    """Run benchmark"""
+    print(
+        f"{'mode':>15} {'packages':>9} {'time, s':>8} {'packages/s':>11} "
+        f"{'MB/s':>8} {'peak RSS, MB':>13}"
+    )
+    for mode in modes or MODES:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            count, size, elapsed, rss = pool.submit(_run, mode, params).result()
+        print(
+            f"{mode:>15} {count:>9} {elapsed:>8.2f} {count / elapsed:>11.0f} "
+            f"{size / elapsed / 1e6:>8.1f} {rss:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,173 @@
+"""Synthetic Drift source for benchmarks
+
+Packages are built like the fixtures in tests/export_test.py, but on the fly,
+so that a large topic doesn't take memory of the benchmark process.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+
+import numpy as np
+from drift_bytes import OutputBuffer, Variant
+from drift_client import DriftDataPackage
+from drift_protocol.common import DataPayload, DriftPackage, StatusCode
+from drift_protocol.meta import ImageInfo, MetaInfo, TypedDataInfo
+from google.protobuf.any_pb2 import Any  # pylint: disable=no-name-in-module
+from wavelet_buffer import WaveletBuffer, WaveletType, denoise
+
+KINDS = ("timeseries", "image", "typed")
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+STEP = 1000  # ms between packages
+
+
+def _pack(data: bytes) -> Any:
+    payload = DataPayload()
+    payload.data = data
+    msg = Any()
+    msg.Pack(payload)
+    return msg
+
+
+def _timeseries(samples: int) -> DriftPackage:
+    signal = np.random.rand(samples).astype(np.float32)
+    buffer = WaveletBuffer(
+        signal_shape=[samples],
+        signal_number=1,
+        decomposition_steps=2,
+        wavelet_type=WaveletType.DB1,
+    )
+    buffer.decompose(signal, denoise.Null())
+
+    pkg = DriftPackage()
+    pkg.status = 0
+    pkg.data.append(_pack(buffer.serialize(compression_level=16)))
+    pkg.meta.type = MetaInfo.TIME_SERIES
+    return pkg
+
+
+def _image(size: int) -> DriftPackage:
+    image = np.random.rand(3, size, size).astype(np.float32)
+    buffer = WaveletBuffer(
+        signal_shape=[size, size],
+        signal_number=3,
+        decomposition_steps=2,
+        wavelet_type=WaveletType.DB1,
+    )
+    buffer.decompose(image, denoise.Null())
+
+    pkg = DriftPackage()
+    pkg.status = 0
+    pkg.data.append(_pack(buffer.serialize(compression_level=16)))
+    pkg.meta.type = MetaInfo.IMAGE
+    pkg.meta.image_info.type = ImageInfo.WB
+    pkg.meta.image_info.width = size
+    pkg.meta.image_info.height = size
+    pkg.meta.image_info.channel_layout = "RGB"
+    return pkg
+
+
+def _typed(fields: int) -> DriftPackage:
+    buffer = OutputBuffer()
+    info = TypedDataInfo()
+    for i in range(fields):
+        item = info.items.add()
+        item.name = f"field_{i}"
+        item.status = StatusCode.GOOD
+        buffer.push(Variant(float(i)))
+
+    pkg = DriftPackage()
+    pkg.status = 0
+    pkg.data.append(_pack(buffer.bytes()))
+    pkg.meta.type = MetaInfo.TYPED_DATA
+    pkg.meta.typed_data_info.CopyFrom(info)
+    return pkg
+
+
+def make_template(kind: str, size: int) -> DriftPackage:
+    """Make package without ID and timestamps
+    Args:
+        kind: timeseries, image or typed
+        size: Samples in time series, width of square image or number of typed fields
+    """
+    if kind == "timeseries":
+        return _timeseries(size)
+    if kind == "image":
+        return _image(size)
+    if kind == "typed":
+        return _typed(size)
+    raise ValueError(f"Unknown kind of topic '{kind}'")
+
+
+class _Walk:
+    """Iterator over packages of a topic with latency of each package"""
+
+    def __init__(self, template: DriftPackage, first: int, last: int, latency: float):
+        self._template = template
+        self._next = first
+        self._last = last
+        self._latency = latency
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> DriftDataPackage:
+        if self._next >= self._last:
+            raise StopIteration
+
+        if self._latency > 0:
+            time.sleep(self._latency)
+
+        number, self._next = self._next, self._next + 1
+        pkg = DriftPackage()
+        pkg.CopyFrom(self._template)
+        pkg.id = int(START.timestamp() * 1000) + number * STEP
+        if pkg.meta.type == MetaInfo.TIME_SERIES:
+            info = pkg.meta.time_series_info
+            info.start_timestamp.FromMilliseconds(pkg.id)
+            info.stop_timestamp.FromMilliseconds(pkg.id + STEP)
+        return DriftDataPackage(pkg.SerializeToString())
+
+
+class SyntheticClient:
+    """Fake DriftClient with get_topics and walk
+
+    Each topic has `packages` packages, one per second from 2022-01-01T00:00:00Z.
+    """
+
+    def __init__(
+        self, topics: Dict[str, DriftPackage], packages: int, latency: float = 0.0
+    ):
+        """
+        Args:
+            topics: Template of packages for each topic, see make_template()
+            packages: Number of packages in each topic
+            latency: Delay before each package in seconds
+        """
+        self._templates = topics
+        self._packages = packages
+        self._latency = latency
+
+    @property
+    def stop(self) -> datetime:
+        """Time point after the last package"""
+        return datetime.fromtimestamp(
+            START.timestamp() + self._packages * STEP / 1000, timezone.utc
+        )
+
+    def get_topics(self) -> List[str]:
+        """Topic names"""
+        return list(self._templates)
+
+    def walk(
+        self, topic: str, start: float, stop: float, **_kwargs
+    ) -> Iterator[DriftDataPackage]:
+        """Walk packages with start <= timestamp < stop in seconds"""
+
+        def _number(timestamp: float) -> int:
+            # number of the first package with the timestamp or newer
+            return -(-int((timestamp - START.timestamp()) * 1000) // STEP)
+
+        first = max(0, _number(start))
+        last = min(self._packages, _number(stop))
+        return _Walk(self._templates[topic], first, max(first, last), self._latency)
@@ -0,0 +1,83 @@
+"""Compare TopicSelector with the former filter_topics on many topics
+
+Usage:
+    python benchmarks/topic_selector.py --topics 100000
+"""
+
+import random
+import time
+from typing import List
+
+import click
+
+from drift_cli.utils.selector import TopicSelector
+
+FAMILIES = ["sensor", "camera", "log", "status", "vibration", "power"]
+
+
+def _former_filter(topics: List[str], names: List[str]) -> List[str]:
+    """The former filter_topics: each topic against each name in a Python loop"""
+
+    def _filter(topic: str) -> bool:
+        for name in names:
+            if name == topic:
+                return True
+            if name.endswith("*") and topic.startswith(name[:-1]):
+                return True
+        return False
+
+    return list(filter(_filter, topics))
+
+
+def _topics(count: int) -> List[str]:
+    rng = random.Random(42)
+    return [
+        f"site-{rng.randrange(100)}/{rng.choice(FAMILIES)}-{i}/ch{rng.randrange(8)}"
+        for i in range(count)
+    ]
+
+
+def _measure(name: str, func, repeat: int) -> List[str]:
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - begin) / repeat
+    print(f"{name:>40}: {elapsed * 1000:8.1f} ms, {len(result)} topics")
+    return result
+
+
+@click.command()
+@click.option("--topics", "count", default=100_000, help="Number of topic names")
+@click.option("--patterns", default=200, help="Number of prefix patterns")
+@click.option("--repeat", default=1, help="Number of runs to average")
+def main(count: int, patterns: int, repeat: int):
+    """Run benchmark"""
+    topics = _topics(count)
+    sites = [f"site-{i}/" for i in range(100)]
+    prefixes = [f"{site}{family}-*" for site in sites for family in FAMILIES[:2]][
+        :patterns
+    ]
+    names = topics[::1000]
+
+    include = prefixes + names
+    former = _measure(
+        f"former, {len(include)} patterns",
+        lambda: _former_filter(topics, include),
+        repeat,
+    )
+    selector = TopicSelector(include)
+    current = _measure(
+        f"TopicSelector, {len(include)} patterns",
+        lambda: selector.select(topics),
+        repeat,
+    )
+    assert former == current, "results differ"
+
+    selector = TopicSelector(
+        ["site-*"], ["*/log-*", "re:site-[0-4]\\d/.*", "*/ch[67]"] + names
+    )
+    _measure("TopicSelector, globs and regex", lambda: selector.select(topics), repeat)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
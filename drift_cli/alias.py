@@ -5,10 +5,9 @@ from typing import Optional
 import click
 from click import Abort
 
-from drift_cli.config import Config, read_config, write_config, Alias
+from drift_cli.config import Config, read_config, write_config, Alias, get_alias
 from drift_cli.utils.consoles import console, error_console
 from drift_cli.utils.error import error_handle
-from drift_cli.utils.helpers import get_alias
 
 
 @click.group()
@@ -1,18 +1,59 @@
 """Main module"""
 
+import importlib
 from importlib import metadata
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Union
 
 import click
 
 from drift_cli.alias import alias
-from drift_cli.export import export
-
 from drift_cli.config import write_config, Config
 
 
-@click.group()
+class LazyGroup(click.Group):
+    """Group which imports subcommands only when they are called
+
+    The export commands need numpy, wavelet_buffer, drift_client etc.,
+    so we don't import them for alias commands or `--version`.
+    """
+
+    def __init__(self, *args, lazy_commands: Dict[str, str] = None, **kwargs):
+        """
+        Keyword Args:
+            lazy_commands: Name of command => "module:attribute" of its group
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx) -> List[str]:
+        return sorted(super().list_commands(ctx) + list(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in self.lazy_commands:
+            module, attribute = self.lazy_commands[cmd_name].split(":")
+            return getattr(importlib.import_module(module), attribute)
+        return super().get_command(ctx, cmd_name)
+
+
+class ParallelType(click.ParamType):
+    """Number of parallel tasks or "auto" """
+
+    name = "INTEGER|auto"
+
+    def convert(self, value, param, ctx) -> Union[int, str]:
+        if value == "auto":
+            return value
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            self.fail(f"{value!r} is not an integer or 'auto'", param, ctx)
+        if number < 1:
+            self.fail(f"{value!r} must be positive", param, ctx)
+        return number
+
+
+@click.group(cls=LazyGroup, lazy_commands={"export": "drift_cli.export:export"})
 @click.version_option(metadata.version("drift-cli"))
 @click.option(
     "--config",
@@ -23,8 +64,9 @@ from drift_cli.config import write_config, Config
 @click.option(
     "--parallel",
     "-p",
-    type=int,
-    help="Number of parallel tasks to use, defaults to 10",
+    type=ParallelType(),
+    help="Number of parallel tasks to use, defaults to 10. "
+    "'auto' adjusts it to throughput and errors at runtime",
 )
 @click.option(
     "--debug",
@@ -32,13 +74,34 @@ from drift_cli.config import write_config, Config
     is_flag=True,
     help="Enable debug logging",
 )
+@click.option(
+    "--profile",
+    type=Path,
+    help="Measure wall and CPU time of export stages for each topic, "
+    "print a summary and write a JSON report to this file",
+)
+@click.option(
+    "--cprofile",
+    type=Path,
+    help="Run the command under cProfile and write its stats to this file "
+    "(only the main thread is profiled)",
+)
+@click.option(
+    "--trace",
+    type=Path,
+    help="Record waits and stages of export for each topic and thread "
+    "into this file in Chrome trace format",
+)
 @click.pass_context
 def cli(
     ctx,
     config: Optional[Path] = None,
-    parallel: Optional[int] = None,
+    parallel: Optional[Union[int, str]] = None,
     debug: bool = False,
-):
+    profile: Optional[Path] = None,
+    cprofile: Optional[Path] = None,
+    trace: Optional[Path] = None,
+):  # pylint: disable=too-many-arguments
     """CLI client for PANDA | Drift Platform"""
     if config is None:
         config = Path.home() / ".drift-cli" / "config.toml"
@@ -53,6 +116,57 @@ def cli(
     ctx.obj["parallel"] = parallel
     ctx.obj["debug"] = debug
 
+    if profile:
+        _enable_profiler(ctx, profile)
+    if trace:
+        _enable_tracer(ctx, trace)
+    if cprofile:
+        _enable_cprofile(ctx, cprofile)
+
+
+def _enable_profiler(ctx, path: Path):
+    # pylint: disable=import-outside-toplevel
+    from drift_cli.utils.consoles import stderr_console
+    from drift_cli.utils.profiling import Profiler, set_profiler
+
+    profiler = Profiler()
+    set_profiler(profiler)
+
+    def _report():
+        set_profiler(None)
+        profiler.print_summary(stderr_console)
+        profiler.save(path)
+
+    ctx.call_on_close(_report)
+
+
+def _enable_tracer(ctx, path: Path):
+    from drift_cli.utils.tracing import (  # pylint: disable=import-outside-toplevel
+        Tracer,
+        set_tracer,
+    )
+
+    tracer = Tracer()
+    set_tracer(tracer)
+
+    def _save_trace():
+        set_tracer(None)
+        tracer.save(path)
+
+    ctx.call_on_close(_save_trace)
+
+
+def _enable_cprofile(ctx, path: Path):
+    import cProfile  # pylint: disable=import-outside-toplevel
+
+    c_profiler = cProfile.Profile()
+    c_profiler.enable()
+
+    def _dump():
+        c_profiler.disable()
+        c_profiler.dump_stats(path)
+
+    ctx.call_on_close(_dump)
+
 
 cli.add_command(alias, "alias")
-cli.add_command(export, "export")
@@ -5,8 +5,11 @@ from pathlib import Path
 from typing import Dict
 
 import tomlkit as toml
+from click import Abort
 from pydantic import BaseModel, Field
 
+from drift_cli.utils.consoles import error_console
+
 
 class Alias(BaseModel):
     """Alias of storage instance"""
@@ -34,3 +37,14 @@ def read_config(path: Path) -> Config:
     """Read config from TOML file"""
     with open(path, "r", encoding="utf8") as config_file:
         return Config.parse_obj(toml.load(config_file))
+
+
+def get_alias(config_path: Path, name: str) -> Alias:
+    """Helper method to parse alias from config"""
+    conf = read_config(config_path)
+
+    if name not in conf.aliases:
+        error_console.print(f"Alias '{name}' doesn't exist")
+        raise Abort()
+    alias_: Alias = conf.aliases[name]
+    return alias_
@@ -1,6 +1,9 @@
 """Export Command"""
 
 import asyncio
+import math
+from pathlib import Path
+from typing import Dict, Tuple
 
 import click
 from click import Abort
@@ -8,12 +11,22 @@ from drift_client import DriftClient
 
 from drift_cli.config import Alias
 from drift_cli.config import read_config
-from drift_cli.export_impl.raw import export_raw
-from drift_cli.utils.consoles import error_console
+from drift_cli.export_impl.aggregate import parse_stats
+from drift_cli.export_impl.archive import ArchiveReader
+from drift_cli.export_impl.compression import COMPRESSIONS
+from drift_cli.export_impl.local import LocalClient
+from drift_cli.export_impl.plan import plan_export, print_plan
+from drift_cli.export_impl.raw import export_raw, parse_pyramid
+from drift_cli.export_impl.stream import STDOUT
+from drift_cli.utils.consoles import console, error_console
 from drift_cli.utils.error import error_handle
 from drift_cli.utils.helpers import (
+    filter_topics,
     parse_path,
 )
+from drift_cli.utils.humanize import parse_ci_size, parse_time_interval
+from drift_cli.utils.limiter import AUTO, AUTO_MAX_PARALLEL
+from drift_cli.utils.selector import TopicSelector
 
 start_option = click.option(
     "--start",
@@ -29,69 +42,278 @@ stop_option = click.option(
 
 topics_option = click.option(
     "--topics",
-    help="Export only these topics, separated by comma. You can use * as a wildcard",
+    help="Export only these topics, separated by comma. You can use globs "
+    "with *, ? and [...] or regular expressions with re: prefix",
     default="",
 )
 
-
-@click.group()
-def export():
-    """Export data from a bucket somewhere else"""
+exclude_option = click.option(
+    "--exclude",
+    help="Skip these topics, separated by comma. Same patterns as --topics",
+    default="",
+)
 
 
-@export.command()
-@click.argument("src")
-@click.argument("dest")
-@stop_option
-@start_option
-@topics_option
-@click.option(
+csv_option = click.option(
     "--csv",
     help="Export data as CSV instead of raw data (only for timeseries)",
     default=False,
     is_flag=True,
 )
-@click.option(
+
+npy_option = click.option(
+    "--npy",
+    help="Export data as float32 .npy files instead of raw data (only for timeseries)",
+    default=False,
+    is_flag=True,
+)
+
+jpeg_option = click.option(
     "--jpeg",
     help="Export data as JPEG instead of raw data (only for images)",
     default=False,
     is_flag=True,
 )
-@click.option(
+
+jpeg_scale_option = click.option(
+    "--jpeg-scale",
+    help="Scale factor of images (only for --jpeg): 0 - full size, "
+    "1 - half, 2 - quarter, ...",
+    type=click.IntRange(min=0),
+    default=0,
+)
+
+pyramid_option = click.option(
+    "--pyramid",
+    help="Export images with several scale factors from one decode, separated "
+    "by comma, e.g. 0,2,3 (only for --jpeg). They go to TOPIC/scale_N folders",
+    type=str,
+)
+
+archive_option = click.option(
+    "--archive",
+    help="Export raw data into large segment files with an index "
+    "instead of a file for each package",
+    default=False,
+    is_flag=True,
+)
+
+segment_size_option = click.option(
+    "--segment-size",
+    help="Size of a segment file for --archive e.g. 500MB",
+    default="1GB",
+)
+
+with_metadata_option = click.option(
     "--with-metadata/--no-with-metadata",
     help="Export metadata along with the data (doesn't work with --csv)",
     default=False,
 )
-@click.option(
+
+metadata_format_option = click.option(
+    "--metadata-format",
+    help="Format of metadata (only with --with-metadata): json - a JSON file "
+    "per package, jsonl - one line per package in DEST/TOPIC.meta.jsonl",
+    type=click.Choice(["json", "jsonl"]),
+    default="json",
+)
+
+scale_option = click.option(
     "--scale",
     help="Scale factor for data (only for --csv): 0 - no scaling, 1 - 2x, 2 - 4x, ...) ",
     default=0,
 )
-@click.pass_context
-def raw(
-    ctx,
-    src: str,
-    dest: str,
-    start: str,
-    stop: str,
-    topics: str,
-    csv: bool,
-    jpeg: bool,
-    with_metadata: bool,
-    scale: int,
-):  # pylint: disable=too-many-arguments
-    """Export data from SRC bucket to DST folder
 
-    SRC should be in the format of ALIAS/BUCKET_NAME.
-    DST should be a path to a folder.
+precision_option = click.option(
+    "--precision",
+    help="Number of digits after the decimal point (only for --csv)",
+    type=click.IntRange(min=0),
+    default=5,
+)
 
-    As result, the folder will contain a folder for each entry in the bucket.
-    Each entry folder will contain a file for each record
-    in the entry with the timestamp as the name.
-    """
-    if start is None or stop is None:
-        error_console.print("Error: --start and --stop are required")
+resume_option = click.option(
+    "--resume",
+    help="Continue export of each topic from the checkpoint of the previous run "
+    "in DEST/.checkpoints",
+    default=False,
+    is_flag=True,
+)
+
+prefetch_option = click.option(
+    "--prefetch",
+    help="Number of packages to read ahead for each topic while "
+    "the previous ones are being exported (0 - no read-ahead)",
+    type=int,
+    default=4,
+)
+
+shards_option = click.option(
+    "--shards",
+    help="Number of time windows to read each topic in parallel. "
+    "CSV export keeps the timestamp order",
+    type=click.IntRange(min=1),
+    default=1,
+)
+
+workers_option = click.option(
+    "--workers",
+    help="Number of processes to decode and encode images (only for --jpeg), "
+    "defaults to number of CPU cores",
+    type=click.IntRange(min=1),
+)
+
+fsync_option = click.option(
+    "--fsync",
+    help="When to flush written files to disk: none - leave it to the OS, "
+    "batch - before each checkpoint, always - after each file or package",
+    type=click.Choice(["none", "batch", "always"]),
+    default="none",
+)
+
+aggregate_option = click.option(
+    "--aggregate",
+    help="Reduce time series to statistics of time windows of this length, "
+    "e.g. 1s, 500ms or 5m (only with --csv or --npy)",
+    type=str,
+)
+
+stats_option = click.option(
+    "--stats",
+    help="Statistics of each window for --aggregate, separated by comma: "
+    "min, max, mean, rms, std",
+    default="min,max,mean",
+)
+
+compress_option = click.option(
+    "--compress",
+    help="Compress raw data, CSV and metadata files on the fly "
+    "(not supported with --archive and --npy)",
+    type=click.Choice(list(COMPRESSIONS)),
+)
+
+max_bandwidth_option = click.option(
+    "--max-bandwidth",
+    help="Maximal total throughput of all topics per second, "
+    "e.g. 20MB. Not limited by default",
+    type=str,
+)
+
+progress_option = click.option(
+    "--progress",
+    "progress_mode",
+    help="How to show progress: rich - progress bars, plain - text lines, "
+    "json - JSON lines, none - only errors. Use plain or json for cron jobs",
+    type=click.Choice(["rich", "plain", "json", "none"]),
+    default="rich",
+)
+
+
+@click.group()
+def export():
+    """Export data from a bucket somewhere else"""
+
+
+def export_options(func):
+    """Options of export commands which read topics and export them"""
+    for option in reversed(
+        [
+            stop_option,
+            start_option,
+            topics_option,
+            exclude_option,
+            csv_option,
+            npy_option,
+            jpeg_option,
+            jpeg_scale_option,
+            pyramid_option,
+            archive_option,
+            segment_size_option,
+            with_metadata_option,
+            metadata_format_option,
+            scale_option,
+            precision_option,
+            aggregate_option,
+            stats_option,
+            resume_option,
+            prefetch_option,
+            shards_option,
+            workers_option,
+            fsync_option,
+            compress_option,
+            max_bandwidth_option,
+            progress_option,
+        ]
+    ):
+        func = option(func)
+    return func
+
+
+def _check_stdout_options(dest: str, options):
+    """Options which need files can't be used with DEST '-'"""
+    if dest == STDOUT:
+        unsupported = [
+            f"--{name.replace('_', '-')}"
+            for name in (
+                "npy",
+                "jpeg",
+                "archive",
+                "with_metadata",
+                "aggregate",
+                "compress",
+                "resume",
+            )
+            if options[name]
+        ]
+        if unsupported:
+            error_console.print(
+                f"Error: {', '.join(unsupported)} can't be used with DEST '-'"
+            )
+            raise Abort()
+
+
+def _check_jpeg_options(options):
+    """Check options of images and parse --pyramid"""
+    if (options["jpeg_scale"] or options["pyramid"]) and not options["jpeg"]:
+        error_console.print("Error: --jpeg-scale and --pyramid need --jpeg")
+        raise Abort()
+    if options["jpeg_scale"] and options["pyramid"]:
+        error_console.print("Error: --jpeg-scale and --pyramid are mutually exclusive")
+        raise Abort()
+    if options["pyramid"]:
+        try:
+            options["pyramid"] = parse_pyramid(options["pyramid"])
+        except ValueError as err:
+            error_console.print(f"Error: {err}")
+            raise Abort() from err
+
+
+def _check_aggregate_options(options):
+    """Check options of statistics and parse --aggregate and --stats"""
+    if options["aggregate"] and not (options["csv"] or options["npy"]):
+        error_console.print("Error: --aggregate is supported only with --csv or --npy")
         raise Abort()
+    if options["aggregate"]:
+        try:
+            period = parse_time_interval(options["aggregate"]) * 1000
+            if not math.isfinite(period):
+                raise ValueError(f"Failed to parse {options['aggregate']}")
+            options["aggregate"] = round(period)
+            options["stats"] = parse_stats(options["stats"])
+        except ValueError as err:
+            error_console.print(f"Error: {err}")
+            raise Abort() from err
+        if options["aggregate"] <= 0:
+            error_console.print("Error: --aggregate must be positive")
+            raise Abort()
+
+
+def _check_options(dest: str, options):
+    """Check options of export and parse them in place,
+    before clients connect to the sources"""
+    csv, npy, jpeg = options["csv"], options["npy"], options["jpeg"]
+    with_metadata = options["with_metadata"]
+
+    _check_stdout_options(dest, options)
 
     if csv and jpeg:
         error_console.print("Error: --csv and --jpeg are mutually exclusive")
@@ -101,26 +323,217 @@ def raw(
         error_console.print("Error: --with-metadata is not supported with --csv")
         raise Abort()
 
-    alias_name, _ = parse_path(src)
-    alias: Alias = read_config(ctx.obj["config_path"]).aliases[alias_name]
+    if npy and (csv or jpeg or with_metadata):
+        error_console.print(
+            "Error: --npy can't be used with --csv, --jpeg or --with-metadata"
+        )
+        raise Abort()
 
-    loop = asyncio.get_event_loop()
-    run = loop.run_until_complete
+    if options["archive"] and (csv or npy or jpeg):
+        error_console.print("Error: --archive is supported only for raw data")
+        raise Abort()
+
+    _check_jpeg_options(options)
+
+    if options["compress"] and (options["archive"] or npy):
+        error_console.print(
+            "Error: --compress is not supported with --archive and --npy"
+        )
+        raise Abort()
+    if options["compress"] and options["fsync"] == "always":
+        error_console.print("Error: --compress is not supported with --fsync always")
+        raise Abort()
 
-    client = DriftClient(alias.address, alias.password, loop=loop)
+    _check_aggregate_options(options)
 
+    try:
+        options["max_bandwidth"] = parse_ci_size(options["max_bandwidth"])
+    except ValueError as err:
+        error_console.print(f"Error: --max-bandwidth must be a size, e.g. 20MB: {err}")
+        raise Abort() from err
+    if options["max_bandwidth"] is not None and options["max_bandwidth"] <= 0:
+        error_console.print("Error: --max-bandwidth must be positive")
+        raise Abort()
+
+
+def _run_export(ctx, client, dest: str, **options):
+    """Run export with options checked by _check_options()"""
+    loop = asyncio.get_event_loop()
     with error_handle(ctx.obj["debug"]):
-        run(
+        loop.run_until_complete(
             export_raw(
                 client,
                 dest,
                 parallel=ctx.obj["parallel"],
-                topics=topics.split(","),
-                start=start,
-                stop=stop,
-                csv=csv,
-                jpeg=jpeg,
-                with_metadata=with_metadata,
-                scale=scale,
+                topics=options.pop("topics").split(","),
+                exclude=options.pop("exclude").split(","),
+                segment_size=parse_ci_size(options.pop("segment_size")),
+                **options,
+            )
+        )
+
+
+def _drift_client(ctx, src: str) -> DriftClient:
+    alias_name, _ = parse_path(src)
+    alias: Alias = read_config(ctx.obj["config_path"]).aliases[alias_name]
+    return DriftClient(alias.address, alias.password, loop=asyncio.get_event_loop())
+
+
+def _drift_clients(ctx, sources: Tuple[str, ...]) -> Dict[str, DriftClient]:
+    """Drift clients by alias names, ALIAS of each source can be a glob"""
+    aliases = read_config(ctx.obj["config_path"]).aliases
+    names = []
+    for src in sources:
+        pattern, _ = parse_path(src)
+        matched = TopicSelector([pattern]).select(aliases)
+        if not matched:
+            error_console.print(f"Error: no aliases match '{pattern}'")
+            raise Abort()
+        names += [name for name in matched if name not in names]
+
+    loop = asyncio.get_event_loop()
+    return {
+        name: DriftClient(aliases[name].address, aliases[name].password, loop=loop)
+        for name in names
+    }
+
+
+@export.command()
+@click.argument("src", nargs=-1, required=True)
+@click.argument("dest")
+@export_options
+@click.pass_context
+def raw(ctx, src: Tuple[str, ...], dest: str, **options):
+    """Export data from SRC bucket to DST folder
+
+    SRC should be in the format of ALIAS/BUCKET_NAME.
+    DST should be a path to a folder.
+
+    As result, the folder will contain a folder for each entry in the bucket.
+    Each entry folder will contain a file for each record
+    in the entry with the timestamp as the name.
+
+    Several SRC or a glob in ALIAS, e.g. 'device-*', export the aliases
+    at once into DST/ALIAS folders. They share --parallel and --max-bandwidth.
+
+    DST '-' streams packages to stdout as length-prefixed frames, or typed data
+    with --csv as NDJSON rows. The progress goes to stderr.
+    """
+    if options["start"] is None or options["stop"] is None:
+        error_console.print("Error: --start and --stop are required")
+        raise Abort()
+
+    _check_options(dest, options)
+    clients = _drift_clients(ctx, src)
+    alias_name, _ = parse_path(src[0])
+    if len(src) == 1 and alias_name in clients:
+        # a single alias keeps the layout DST/TOPIC
+        _run_export(ctx, clients[alias_name], dest, **options)
+    else:
+        _run_export(ctx, clients, dest, **options)
+
+
+@export.command()
+@click.argument("src", type=click.Path(exists=True, file_okay=False))
+@click.argument("dest")
+@export_options
+@click.pass_context
+def local(ctx, src: str, dest: str, **options):
+    """Export data from SRC folder to DST folder
+
+    SRC should be a folder exported with `export raw` with or without --archive.
+    The data is transcoded with the same options as `export raw` has,
+    e.g. --csv or --jpeg, without reading it from the device again.
+    --start and --stop default to the time range of the exported packages.
+    """
+    _check_options(dest, options)
+    client = LocalClient(Path(src))
+    if options["start"] is None or options["stop"] is None:
+        time_range = client.time_range(
+            filter_topics(
+                client.get_topics(),
+                options["topics"].split(","),
+                options["exclude"].split(","),
             )
         )
+        if time_range is None:
+            error_console.print(f"Error: no packages found in {src}")
+            raise Abort()
+        options["start"] = options["start"] or time_range[0]
+        options["stop"] = options["stop"] or time_range[1]
+
+    _run_export(ctx, client, dest, **options)
+
+
+@export.command()
+@click.argument("src")
+@start_option
+@stop_option
+@topics_option
+@exclude_option
+@click.option(
+    "--samples",
+    help="Number of time windows to sample in each topic",
+    type=click.IntRange(min=1),
+    default=5,
+)
+@click.option(
+    "--sample-size",
+    help="Maximal number of packages to read in each sampled window",
+    type=click.IntRange(min=2),
+    default=10,
+)
+@click.pass_context
+def plan(ctx, src: str, **options):
+    """Estimate size and duration of export from SRC bucket
+
+    SRC should be in the format of ALIAS/BUCKET_NAME.
+
+    A few packages are read in several time windows of each topic and extrapolated
+    to the whole time range. Duration is estimated at the measured speed
+    with --parallel topics exported at once.
+    """
+    if options["start"] is None or options["stop"] is None:
+        error_console.print("Error: --start and --stop are required")
+        raise Abort()
+
+    parallel = ctx.obj["parallel"]
+    parallel = AUTO_MAX_PARALLEL if parallel == AUTO else parallel
+    with error_handle(ctx.obj["debug"]):
+        client = _drift_client(ctx, src)
+        topics = filter_topics(
+            client.get_topics(),
+            options.pop("topics").split(","),
+            options.pop("exclude").split(","),
+        )
+        loop = asyncio.get_event_loop()
+        plans = loop.run_until_complete(
+            plan_export(client, topics, parallel, **options)
+        )
+        print_plan(plans, parallel, console)
+
+
+@export.command()
+@click.argument("src")
+@click.argument("dest")
+@click.option(
+    "--ids",
+    help="Extract only packages with these IDs, separated by comma",
+    default="",
+)
+@click.pass_context
+def extract(ctx, src: str, dest: str, ids: str):
+    """Extract packages from SRC archive to DEST folder
+
+    SRC should be a topic folder exported with `export raw --archive`.
+    Each package is saved as a file with its ID as the name.
+    """
+    with error_handle(ctx.obj["debug"]):
+        reader = ArchiveReader(Path(src))
+        Path(dest).mkdir(exist_ok=True, parents=True)
+        if ids:
+            for package_id in (int(package_id) for package_id in ids.split(",")):
+                (Path(dest) / f"{package_id}.dp").write_bytes(reader.read(package_id))
+        else:
+            for package_id, blob in reader:
+                (Path(dest) / f"{package_id}.dp").write_bytes(blob)
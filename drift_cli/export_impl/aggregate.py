@@ -0,0 +1,146 @@
+"""Window aggregation of time series"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+STATS = ("min", "max", "mean", "rms", "std")
+
+
+def parse_stats(stats: str) -> List[str]:
+    """Parse comma separated list of statistics"""
+    names = [name.strip().lower() for name in stats.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STATS]
+    if unknown or not names:
+        raise ValueError(
+            f"Unknown statistics '{','.join(unknown)}', use {', '.join(STATS)}"
+        )
+    return names
+
+
+class WindowAggregator:
+    """Reduce blocks of time series to statistics of fixed time windows
+
+    Samples of a package are spread evenly between its start and stop timestamps.
+    Windows start at the first sample, so window K covers
+    [first + K * period, first + (K + 1) * period). A row of the output has
+    the start timestamp of the window in milliseconds and the statistics
+    in the given order, each of them for all the columns of a sample.
+    Statistics of windows without samples are NaN, so that the output stays regular.
+    The last window is kept until the next block or flush().
+    """
+
+    def __init__(
+        self,
+        period: int,
+        stats: Sequence[str],
+        state: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            period: Length of window in milliseconds
+            stats: Names of statistics, see STATS
+            state: State of a previous aggregator to continue, see state()
+        """
+        self._period = period
+        self._stats = list(stats)
+        self._origin: Optional[float] = None
+        self._next = 0  # index of the next window to output
+        # accumulators of the last window, arrays with one row
+        self._pending: Optional[Dict[str, np.ndarray]] = None
+        if state:
+            self._origin = state["origin"]
+            self._next = state["next"]
+            if state["pending"] is not None:
+                self._pending = {
+                    key: np.array(value) for key, value in state["pending"].items()
+                }
+
+    def state(self) -> Dict[str, Any]:
+        """State to continue aggregation after a checkpoint, JSON serializable"""
+        pending = None
+        if self._pending is not None:
+            pending = {key: value.tolist() for key, value in self._pending.items()}
+        return {"origin": self._origin, "next": self._next, "pending": pending}
+
+    def add(self, block: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Add block of samples and return rows of the completed windows
+        Args:
+            block: Samples, one row per sample
+            start: Timestamp of the first sample in milliseconds
+            stop: Timestamp after the last sample in milliseconds
+        Returns:
+            Array with a row per window
+        """
+        if len(block) == 0:
+            return self._empty()
+
+        block = np.asarray(block, dtype=np.float64).reshape(len(block), -1)
+        if self._origin is None:
+            self._origin = float(start)
+
+        times = start + np.arange(len(block)) * ((stop - start) / len(block))
+        windows = ((times - self._origin) // self._period).astype(np.int64)
+        first = np.concatenate(([0], np.flatnonzero(np.diff(windows)) + 1))
+        groups = {
+            "window": windows[first],
+            "count": np.diff(np.append(first, len(block))),
+            "sum": np.add.reduceat(block, first, axis=0),
+            "sumsq": np.add.reduceat(block * block, first, axis=0),
+            "min": np.minimum.reduceat(block, first, axis=0),
+            "max": np.maximum.reduceat(block, first, axis=0),
+        }
+
+        pending = self._pending
+        if pending is not None and pending["window"][0] == groups["window"][0]:
+            groups["count"][0] += pending["count"][0]
+            groups["sum"][0] += pending["sum"][0]
+            groups["sumsq"][0] += pending["sumsq"][0]
+            groups["min"][0] = np.minimum(groups["min"][0], pending["min"][0])
+            groups["max"][0] = np.maximum(groups["max"][0], pending["max"][0])
+        elif pending is not None:
+            groups = {
+                key: np.concatenate((pending[key], value))
+                for key, value in groups.items()
+            }
+
+        self._pending = {key: value[-1:] for key, value in groups.items()}
+        return self._rows({key: value[:-1] for key, value in groups.items()})
+
+    def flush(self) -> np.ndarray:
+        """Return row of the last window"""
+        if self._pending is None:
+            return self._empty()
+        pending, self._pending = self._pending, None
+        return self._rows(pending)
+
+    def _empty(self) -> np.ndarray:
+        if self._pending is None:
+            return np.empty((0, 0))
+        return np.empty((0, 1 + len(self._stats) * self._pending["sum"].shape[1]))
+
+    def _rows(self, groups: Dict[str, np.ndarray]) -> np.ndarray:
+        if len(groups["window"]) == 0:
+            return self._empty()
+
+        count = groups["count"][:, np.newaxis]
+        mean = groups["sum"] / count
+        square = groups["sumsq"] / count
+        stats = {
+            "min": lambda: groups["min"],
+            "max": lambda: groups["max"],
+            "mean": lambda: mean,
+            "rms": lambda: np.sqrt(square),
+            "std": lambda: np.sqrt(np.maximum(square - mean * mean, 0.0)),
+        }
+        rows = np.hstack([stats[name]() for name in self._stats])
+
+        # windows without samples are NaN
+        indexes = groups["window"] - self._next
+        output = np.full((indexes[-1] + 1, 1 + rows.shape[1]), np.nan)
+        output[:, 0] = self._origin + (self._next + np.arange(len(output))) * (
+            self._period
+        )
+        output[indexes, 1:] = rows
+        self._next += len(output)
+        return output
@@ -0,0 +1,182 @@
+"""Append-only archive of packages"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+INDEX_FILE = "index.dpi"
+INDEX_RECORD = struct.Struct("<QIQI")  # package_id, segment, offset, size
+
+
+def _segment_name(number: int) -> str:
+    return f"segment_{number:06d}.dpa"
+
+
+def is_archive(path: Path) -> bool:
+    """Check if folder is an archive of a topic"""
+    return (Path(path) / INDEX_FILE).exists()
+
+
+class ArchiveWriter:
+    """Append package blobs of a topic into large segment files
+
+    The folder contains segment_NNNNNN.dpa files with concatenated blobs
+    and index.dpi with a fixed-size record (package_id, segment, offset, size)
+    for each package. An existing archive is overwritten unless the writer
+    appends to it.
+    """
+
+    def __init__(
+        self, path: Path, segment_size: int = 1_000_000_000, append: bool = False
+    ):
+        """
+        Args:
+            path: Folder of the archive
+            segment_size: Size of segment file after which a new one is started
+            append: Continue the existing archive instead of overwriting it
+        """
+        self._path = Path(path)
+        self._path.mkdir(exist_ok=True, parents=True)
+        self._segment_size = segment_size
+        self._segment = 0
+        if append:
+            self._recover()
+        else:
+            self._remove()
+
+        self._index = open(  # pylint: disable=consider-using-with
+            self._path / INDEX_FILE, "ab"
+        )
+        self._open_segment()
+
+    def _remove(self):
+        """Remove index and segments of the existing archive"""
+        (self._path / INDEX_FILE).unlink(missing_ok=True)
+        for segment in self._path.glob("segment_*.dpa"):
+            segment.unlink()
+
+    def _recover(self):
+        """Drop data which isn't in the index, e.g. after the index
+        was truncated to a checkpoint"""
+        index_path = self._path / INDEX_FILE
+        end = 0
+        if index_path.exists():
+            size = index_path.stat().st_size
+            size -= size % INDEX_RECORD.size
+            os.truncate(index_path, size)
+            if size > 0:
+                with open(index_path, "rb") as file:
+                    file.seek(size - INDEX_RECORD.size)
+                    _, self._segment, offset, length = INDEX_RECORD.unpack(
+                        file.read(INDEX_RECORD.size)
+                    )
+                    end = offset + length
+
+        for segment in self._path.glob("segment_*.dpa"):
+            number = int(segment.stem.split("_")[1])
+            if number > self._segment:
+                segment.unlink()
+            elif number == self._segment and segment.stat().st_size > end:
+                os.truncate(segment, end)
+
+    def _open_segment(self):
+        self._file = open(  # pylint: disable=consider-using-with
+            self._path / _segment_name(self._segment), "ab"
+        )
+        self._offset = self._file.tell()
+
+    def append(self, package_id: int, blob: bytes):
+        """Append package blob"""
+        if self._offset > 0 and self._offset + len(blob) > self._segment_size:
+            self._file.close()
+            self._segment += 1
+            self._open_segment()
+
+        self._file.write(blob)
+        self._index.write(
+            INDEX_RECORD.pack(package_id, self._segment, self._offset, len(blob))
+        )
+        self._offset += len(blob)
+
+    def flush(self):
+        """Flush segment and index"""
+        self._file.flush()
+        self._index.flush()
+
+    def sync(self):
+        """Flush segment and index to disk, the segment goes first
+        so that the index never points to missing data"""
+        self.flush()
+        os.fsync(self._file.fileno())
+        os.fsync(self._index.fileno())
+
+    @property
+    def index_path(self) -> Path:
+        """Path to index file"""
+        return self._path / INDEX_FILE
+
+    @property
+    def index_size(self) -> int:
+        """Size of flushed index"""
+        return self._index.tell()
+
+    def close(self):
+        """Close files"""
+        self._file.close()
+        self._index.close()
+
+
+class ArchiveReader:
+    """Read packages from an archive written by ArchiveWriter"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Folder of the archive
+        Raises:
+            FileNotFoundError: if there is no index in the folder
+        """
+        self._path = Path(path)
+        with open(self._path / INDEX_FILE, "rb") as file:
+            data = file.read()
+
+        # ignore a partially written record at the end
+        data = data[: len(data) - len(data) % INDEX_RECORD.size]
+        self._index: Dict[int, Tuple[int, int, int]] = {
+            package_id: (segment, offset, size)
+            for package_id, segment, offset, size in INDEX_RECORD.iter_unpack(data)
+        }
+
+    def ids(self) -> List[int]:
+        """IDs of packages in the archive, sorted"""
+        return sorted(self._index)
+
+    def read(self, package_id: int) -> bytes:
+        """Read blob of package
+        Raises:
+            RuntimeError: if there is no package with the ID
+        """
+        if package_id not in self._index:
+            raise RuntimeError(f"Package {package_id} not found in {self._path}")
+
+        segment, offset, size = self._index[package_id]
+        with open(self._path / _segment_name(segment), "rb") as file:
+            file.seek(offset)
+            return file.read(size)
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        """Iterate over (package_id, blob) sorted by ID"""
+        files = {}
+        try:
+            for package_id in self.ids():
+                segment, offset, size = self._index[package_id]
+                if segment not in files:
+                    files[segment] = open(  # pylint: disable=consider-using-with
+                        self._path / _segment_name(segment), "rb"
+                    )
+                files[segment].seek(offset)
+                yield package_id, files[segment].read(size)
+        finally:
+            for file in files.values():
+                file.close()
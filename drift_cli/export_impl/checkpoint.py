@@ -0,0 +1,121 @@
+"""Checkpoints to resume export"""
+
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from drift_client import DriftDataPackage
+from pydantic import BaseModel, Field
+
+CHECKPOINT_FOLDER = ".checkpoints"
+
+
+class Checkpoint(BaseModel):
+    """Manifest of an exported topic"""
+
+    mode: str
+    package_id: int = 0
+    checksum: int = 0
+    count: int = 0
+    outputs: Dict[str, int] = Field(default_factory=dict)
+    state: Dict[str, Any] = Field(default_factory=dict)
+
+
+class TopicCheckpoint:
+    """Keep checkpoint of a topic in DEST/.checkpoints/TOPIC.json
+
+    The checkpoint stores the last exported package ID, a running CRC32 of
+    exported blobs and sizes of the files which the exporter appends to.
+    When the export is resumed, the files are truncated to these sizes,
+    so that data written after the last checkpoint isn't duplicated.
+    Otherwise the checkpoint of a previous run is removed, because the files
+    are overwritten and it doesn't describe them any more.
+    """
+
+    INTERVAL = 5.0
+
+    def __init__(self, dest: str, topic: str, mode: str, **kwargs):
+        """
+        Args:
+            dest: Destination folder of export
+            topic: Topic name
+            mode: Export mode, a checkpoint of another mode is ignored
+        Keyword Args:
+            resume (bool): Load the existing checkpoint if checkpoints are enabled
+            enabled (bool): Save checkpoints, defaults to True
+        """
+        self._dest = Path(dest)
+        self._path = self._dest / CHECKPOINT_FOLDER / f"{topic}.json"
+        self._enabled = kwargs.get("enabled", True)
+        self._saved_at = time.monotonic()
+        self.checkpoint = Checkpoint(mode=mode)
+        self.resumed = False
+
+        if not (self._enabled and kwargs.get("resume", False)):
+            self._path.unlink(missing_ok=True)
+        elif self._path.exists():
+            with open(self._path, "r", encoding="utf-8") as file:
+                checkpoint = Checkpoint.parse_obj(json.load(file))
+            if checkpoint.mode == mode:
+                self.checkpoint = checkpoint
+                self.resumed = True
+                for name, size in checkpoint.outputs.items():
+                    if (self._dest / name).exists():
+                        os.truncate(self._dest / name, size)
+
+    @property
+    def package_id(self) -> int:
+        """ID of the last exported package, 0 if nothing was exported"""
+        return self.checkpoint.package_id
+
+    @property
+    def count(self) -> int:
+        """Number of exported packages"""
+        return self.checkpoint.count
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """State of the exporter saved with the checkpoint"""
+        return self.checkpoint.state
+
+    def update(self, package: DriftDataPackage):
+        """Mark package as exported"""
+        self.checkpoint.package_id = package.package_id
+        self.checkpoint.checksum = zlib.crc32(package.blob, self.checkpoint.checksum)
+        self.checkpoint.count += 1
+
+    def due(self) -> bool:
+        """Check if it is time to save the checkpoint"""
+        return self._enabled and time.monotonic() - self._saved_at >= self.INTERVAL
+
+    def save(
+        self, outputs: Optional[Dict[Path, int]] = None, fsync: bool = False, **state
+    ):
+        """Save checkpoint, the outputs must be flushed before
+        Args:
+            outputs: Sizes of files which the exporter appends to
+            fsync: Flush the checkpoint to disk before it replaces the previous one
+            state: State of the exporter to restore it
+        """
+        if not self._enabled:
+            return
+
+        if outputs is not None:
+            self.checkpoint.outputs = {
+                str(Path(path).relative_to(self._dest)): size
+                for path, size in outputs.items()
+            }
+        self.checkpoint.state.update(state)
+
+        self._path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = self._path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.checkpoint.dict(), file)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, self._path)
+        self._saved_at = time.monotonic()
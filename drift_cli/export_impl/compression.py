@@ -0,0 +1,130 @@
+"""Streaming compression of exported files"""
+
+import bz2
+import gzip
+import io
+import lzma
+import zlib
+from pathlib import Path
+from typing import Optional, Union
+
+COMPRESSIONS = ("gzip", "bz2", "xz")
+SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+
+def suffix(compress: Optional[str]) -> str:
+    """File suffix of compression, empty if data isn't compressed"""
+    return SUFFIXES[compress] if compress else ""
+
+
+def _compressor(compress: str):
+    if compress == "gzip":
+        # wbits=31 writes a gzip header and trailer
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compress == "bz2":
+        return bz2.BZ2Compressor()
+    if compress == "xz":
+        return lzma.LZMACompressor()
+    raise ValueError(f"Unknown compression '{compress}'")
+
+
+def compress_bytes(data: bytes, compress: str) -> bytes:
+    """Compress data in one go"""
+    compressor = _compressor(compress)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress_bytes(data: bytes, compress: str) -> bytes:
+    """Decompress data which may consist of several streams"""
+    if compress == "gzip":
+        return gzip.decompress(data)
+    if compress == "bz2":
+        return bz2.decompress(data)
+    if compress == "xz":
+        return lzma.decompress(data)
+    raise ValueError(f"Unknown compression '{compress}'")
+
+
+class CompressedFile(io.RawIOBase):
+    """Binary file which compresses written data on the fly
+
+    flush() finishes the current compressed stream, the next write starts
+    a new one. So at its flushed size the file is a valid sequence of streams
+    (gzip members, bz2 or xz streams), which the standard tools decompress
+    as one file. A checkpoint can truncate the file to this size and
+    the export appends new streams to it. Each stream has its own header and
+    dictionary, so the file should be flushed only at checkpoints.
+    """
+
+    def __init__(
+        self, path: Path, compress: str, append: bool = False, buffering: int = -1
+    ):
+        """
+        Args:
+            path: Path to file, it is overwritten
+            compress: Compression, see COMPRESSIONS
+            append: Continue the existing file instead of overwriting it
+            buffering: Size of the file buffer
+        """
+        super().__init__()
+        _compressor(compress)  # check compression before the file is created
+        self._file = open(  # pylint: disable=consider-using-with
+            path, "ab" if append else "wb", buffering=buffering
+        )
+        self._compress = compress
+        self._compressor = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._compressor is None:
+            self._compressor = _compressor(self._compress)
+        self._file.write(self._compressor.compress(data))
+        return memoryview(data).nbytes
+
+    def flush(self):
+        """Finish the current stream and write buffered data to the file"""
+        if self._compressor is not None:
+            self._file.write(self._compressor.flush())
+            self._compressor = None
+        if not self._file.closed:
+            self._file.flush()
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def tell(self) -> int:
+        """Size of compressed data written so far"""
+        return self._file.tell()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._file.close()
+
+
+def open_output(
+    path: Path,
+    compress: Optional[str] = None,
+    append: bool = False,
+    text: bool = False,
+    buffering: int = -1,
+) -> Union[io.BufferedWriter, io.TextIOWrapper, CompressedFile]:
+    """Open file to write exported data, compressed if compress is given
+    Args:
+        path: Path to file, it is overwritten
+        compress: Compression, see COMPRESSIONS, or None
+        append: Continue the existing file instead of overwriting it
+        text: Open file in text mode with UTF-8 encoding
+        buffering: Size of the file buffer
+    """
+    if not compress:
+        mode = ("a" if append else "w") + ("" if text else "b")
+        return open(  # pylint: disable=consider-using-with
+            path, mode, buffering=buffering, encoding="utf-8" if text else None
+        )
+
+    file = CompressedFile(path, compress, append=append, buffering=buffering)
+    return io.TextIOWrapper(file, encoding="utf-8") if text else file
@@ -0,0 +1,172 @@
+"""Buffered CSV writer for time series"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from drift_cli.export_impl.compression import CompressedFile
+
+
+def summary_sidecar(path: Path) -> Path:
+    """JSON sidecar with the summary of a compressed file,
+    e.g. topic.csv.json for topic.csv.gz"""
+    return Path(f"{Path(path).with_suffix('')}.json")
+
+
+def write_summary_sidecar(
+    path: Path,
+    topic: str,
+    count: int,
+    first_timestamp: int,
+    last_timestamp: int,
+    **info: Any,
+):  # pylint: disable=too-many-arguments
+    """Write summary of a compressed file into its JSON sidecar,
+    info is added to it, e.g. period_ms and stats of aggregated time series"""
+    with open(summary_sidecar(path), "w", encoding="utf-8") as sidecar:
+        json.dump(
+            {
+                "topic": topic,
+                "count": count,
+                "first_timestamp": first_timestamp,
+                "last_timestamp": last_timestamp,
+                **info,
+            },
+            sidecar,
+        )
+
+
+class TimeseriesCsvWriter:
+    """Write blocks of time series into a CSV file
+
+    The file keeps a summary line on top. It is reserved when the file is created
+    and written in close(), because the summary is known only at the end.
+    A compressed file can't be rewritten, so its summary goes to a JSON sidecar,
+    see summary_sidecar(). The file handle is kept open for the whole topic,
+    blocks are formatted in batch and written in large chunks.
+    With timestamps, the first column of a block is a timestamp in milliseconds
+    and it is written as an integer.
+    """
+
+    SUMMARY_SIZE = 256
+
+    def __init__(
+        self,
+        path: Path,
+        precision: int = 5,
+        chunk_size: int = 1 << 20,
+        append: bool = False,
+        compress: Optional[str] = None,
+        timestamps: bool = False,
+    ):  # pylint: disable=too-many-arguments
+        """
+        Args:
+            path: Path to CSV file, it is overwritten
+            precision: Number of digits after the decimal point
+            chunk_size: Size of formatted text to buffer before writing it to the file
+            append: Continue the existing file instead of overwriting it
+            compress: Compress the file on the fly, see compression.COMPRESSIONS
+            timestamps: First column of blocks is a timestamp
+        """
+        self._path = Path(path)
+        self._compressed = bool(compress)
+        if compress:
+            self._file = CompressedFile(path, compress, append=append)
+        elif append:
+            self._file = open(path, "r+b")  # pylint: disable=consider-using-with
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")  # pylint: disable=consider-using-with
+            self._file.write(b" " * self.SUMMARY_SIZE + b"\n")
+        self._precision = precision
+        self._timestamps = timestamps
+        self._chunk_size = chunk_size
+        self._chunks: List[str] = []
+        self._buffered = 0
+        self._row_formats: Dict[int, str] = {}
+
+    def _row_format(self, columns: int) -> str:
+        if columns not in self._row_formats:
+            formats = [f"%.{self._precision}f"] * columns
+            if self._timestamps:
+                formats[0] = "%d"
+            self._row_formats[columns] = ",".join(formats) + "\n"
+        return self._row_formats[columns]
+
+    def write(self, block: np.ndarray):
+        """Write block of samples, one row per line like np.savetxt does"""
+        if block.size == 0:
+            return
+
+        rows = len(block)
+        columns = block.size // rows
+        text = (self._row_format(columns) * rows) % tuple(block.ravel().tolist())
+
+        self._chunks.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self._chunk_size:
+            self._write_chunks()
+
+    def _write_chunks(self):
+        if self._chunks:
+            self._file.write("".join(self._chunks).encode("ascii"))
+            self._chunks.clear()
+            self._buffered = 0
+
+    def flush(self):
+        """Write buffered text to the file"""
+        self._write_chunks()
+        self._file.flush()
+
+    def sync(self):
+        """Flush buffered text and the file to disk"""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def size(self) -> int:
+        """Size of flushed data in the file"""
+        return self._file.tell()
+
+    def close(
+        self,
+        topic: str,
+        count: int,
+        first_timestamp: int,
+        last_timestamp: int,
+        **info: Any,
+    ):  # pylint: disable=too-many-arguments
+        """Flush data, write summary line and close the file
+
+        Values of info are appended to the summary line, lists are joined with |.
+        """
+        summary = ",".join(
+            [topic, str(count), str(first_timestamp), str(last_timestamp)]
+            + [
+                "|".join(value) if isinstance(value, list) else str(value)
+                for value in info.values()
+            ]
+        )
+        if self._compressed:
+            try:
+                self.flush()
+            finally:
+                self._file.close()
+            write_summary_sidecar(
+                self._path, topic, count, first_timestamp, last_timestamp, **info
+            )
+            return
+
+        try:
+            self.flush()
+            if len(summary) > self.SUMMARY_SIZE:
+                raise ValueError(
+                    f"Summary is longer than {self.SUMMARY_SIZE} characters"
+                )
+            self._file.seek(0)
+            self._file.write(summary.encode("utf-8"))
+        finally:
+            self._file.close()
@@ -0,0 +1,119 @@
+"""Local folder of exported packages as a source of export"""
+
+import bisect
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from drift_client import DriftDataPackage
+
+from drift_cli.export_impl.archive import ArchiveReader, is_archive
+from drift_cli.export_impl.compression import (
+    SUFFIXES,
+    decompress_bytes,
+    suffix,
+)
+
+_PACKAGE_SUFFIXES: Dict[str, Optional[str]] = {".dp": None}
+_PACKAGE_SUFFIXES.update({f".dp{ext}": compress for compress, ext in SUFFIXES.items()})
+
+
+def _package_file(name: str) -> Optional[Tuple[int, Optional[str]]]:
+    """ID and compression of package file <id>.dp[.gz|.bz2|.xz], None for other files"""
+    stem, dot, ext = name.partition(".")
+    if not stem.isdigit() or dot + ext not in _PACKAGE_SUFFIXES:
+        return None
+    return int(stem), _PACKAGE_SUFFIXES[dot + ext]
+
+
+class LocalClient:
+    """Read packages exported by `export raw` from a local folder
+
+    Each subfolder is a topic with <id>.dp files, compressed ones written with
+    --compress or an archive written with --archive.
+    The client has get_topics() and walk() of DriftClient, so the exporters can
+    transcode exported data without reading it from the device again.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Destination folder of `export raw`
+        """
+        self._path = Path(path)
+        self._ids: Dict[str, List[int]] = {}
+        # compression of each package, a folder can mix plain and compressed files
+        self._compressions: Dict[str, Dict[int, Optional[str]]] = {}
+        self._archives: Dict[str, ArchiveReader] = {}
+        self._lock = threading.Lock()
+
+    def get_topics(self) -> List[str]:
+        """Names of subfolders, hidden ones are skipped"""
+        return sorted(
+            entry.name
+            for entry in os.scandir(self._path)
+            if entry.is_dir() and not entry.name.startswith(".")
+        )
+
+    def _scan(self, topic: str) -> List[int]:
+        """Sorted IDs of packages in topic folder, scanned once"""
+        with self._lock:
+            if topic not in self._ids:
+                folder = self._path / topic
+                if is_archive(folder):
+                    self._archives[topic] = ArchiveReader(folder)
+                    ids = self._archives[topic].ids()
+                else:
+                    files = [_package_file(entry.name) for entry in os.scandir(folder)]
+                    self._compressions[topic] = dict(
+                        file for file in files if file is not None
+                    )
+                    ids = sorted(self._compressions[topic])
+                self._ids[topic] = ids
+            return self._ids[topic]
+
+    def _read(self, topic: str, package_id: int) -> bytes:
+        if topic in self._archives:
+            return self._archives[topic].read(package_id)
+        compress = self._compressions[topic][package_id]
+        with open(
+            self._path / topic / f"{package_id}.dp{suffix(compress)}", "rb"
+        ) as file:
+            blob = file.read()
+        return decompress_bytes(blob, compress) if compress else blob
+
+    def walk(
+        self, topic: str, start: float, stop: float, **_kwargs
+    ) -> Iterator[DriftDataPackage]:
+        """Walk packages of topic with start <= timestamp < stop
+
+        The folder is scanned on the first next() call, so that it happens
+        in the thread which pulls packages.
+
+        Args:
+            topic: Topic name
+            start: Timestamp in seconds
+            stop: Timestamp in seconds
+        """
+        ids = self._scan(topic)
+        first = bisect.bisect_left(ids, start * 1000)
+        last = bisect.bisect_left(ids, stop * 1000)
+        for package_id in ids[first:last]:
+            yield DriftDataPackage(self._read(topic, package_id))
+
+    def time_range(self, topics: List[str]) -> Optional[Tuple[str, str]]:
+        """Start and stop in ISO format which cover all packages of topics,
+        None if there are no packages"""
+        ids = [self._scan(topic) for topic in topics]
+        ids = [topic_ids for topic_ids in ids if topic_ids]
+        if not ids:
+            return None
+
+        first = min(topic_ids[0] for topic_ids in ids) // 1000
+        last = max(topic_ids[-1] for topic_ids in ids) // 1000 + 1
+        return tuple(
+            datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+            for timestamp in (first, last)
+        )
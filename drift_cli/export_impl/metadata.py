@@ -0,0 +1,152 @@
+"""Metadata of packages as JSON"""
+
+import base64
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from drift_client import DriftDataPackage
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.message import Message
+
+from drift_cli.export_impl.compression import open_output
+
+_INT64_TYPES = (
+    FieldDescriptor.CPPTYPE_INT64,
+    FieldDescriptor.CPPTYPE_UINT64,
+)
+_WELL_KNOWN_TYPES = (
+    "google.protobuf.Timestamp",
+    "google.protobuf.Duration",
+    "google.protobuf.FieldMask",
+)
+_CONVERTERS: Dict[FieldDescriptor, Callable[[Any], Any]] = {}
+
+
+def _float_to_json(value: float) -> Any:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return value
+
+
+def _value_converter(field: FieldDescriptor) -> Callable[[Any], Any]:
+    if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        if field.message_type.full_name in _WELL_KNOWN_TYPES:
+            return lambda value: value.ToJsonString()
+        if field.message_type.full_name.startswith("google.protobuf."):
+            return lambda value: MessageToDict(value, preserving_proto_field_name=True)
+        return message_to_dict
+    if field.cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        names = {
+            number: value.name
+            for number, value in field.enum_type.values_by_number.items()
+        }
+        return lambda value: names.get(value, value)
+    if field.cpp_type in _INT64_TYPES:
+        return str
+    if field.cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        # the shortest representation which is parsed into the same float32
+        return lambda value: _float_to_json(float(str(np.float32(value))))
+    if field.cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return _float_to_json
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return lambda value: base64.b64encode(value).decode("utf-8")
+    return lambda value: value
+
+
+def _map_converter(entry: Descriptor) -> Callable[[Any], Any]:
+    convert = _converter(entry.fields_by_name["value"])
+
+    def _key(key: Any) -> str:
+        return str(key).lower() if isinstance(key, bool) else str(key)
+
+    return lambda value: {_key(k): convert(v) for k, v in value.items()}
+
+
+def _repeated_converter(field: FieldDescriptor) -> Callable[[Any], Any]:
+    convert = _value_converter(field)
+    return lambda value: [convert(v) for v in value]
+
+
+def _converter(field: FieldDescriptor) -> Callable[[Any], Any]:
+    """Converter of field value into JSON object, created once per field"""
+    if field not in _CONVERTERS:
+        if field.message_type and field.message_type.GetOptions().map_entry:
+            _CONVERTERS[field] = _map_converter(field.message_type)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            _CONVERTERS[field] = _repeated_converter(field)
+        else:
+            _CONVERTERS[field] = _value_converter(field)
+    return _CONVERTERS[field]
+
+
+def message_to_dict(message: Message) -> Dict[str, Any]:
+    """Convert protobuf message into dict as
+    MessageToDict(message, preserving_proto_field_name=True) does,
+    but with converters of fields cached by their descriptors"""
+    return {
+        field.name: _converter(field)(value) for field, value in message.ListFields()
+    }
+
+
+def package_metadata(pkg: DriftDataPackage) -> Dict[str, Any]:
+    """Metadata of package with its ID, status, timestamps and labels"""
+    meta = {
+        "id": pkg.package_id,
+        "status": pkg.status_code,
+        "published_time": pkg.publish_timestamp,
+        "source_timestamp": pkg.source_timestamp,
+        "labels": pkg.labels,
+    }
+    meta.update(message_to_dict(pkg.meta))
+    return meta
+
+
+class MetadataJsonlWriter:
+    """Write metadata of packages into a JSONL file, one compact line per package"""
+
+    def __init__(
+        self,
+        path: Path,
+        chunk_size: int = 1 << 20,
+        append: bool = False,
+        compress: Optional[str] = None,
+    ):
+        """
+        Args:
+            path: Path to JSONL file, it is overwritten
+            chunk_size: Size of the file buffer
+            append: Continue the existing file instead of overwriting it
+            compress: Compress the file on the fly, see compression.COMPRESSIONS
+        """
+        self._file = open_output(path, compress, append=append, buffering=chunk_size)
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def write(self, pkg: DriftDataPackage):
+        """Append metadata of package"""
+        self._file.write(self._encoder.encode(package_metadata(pkg)).encode("utf-8"))
+        self._file.write(b"\n")
+
+    def flush(self):
+        """Write buffered data to the file"""
+        self._file.flush()
+
+    def sync(self):
+        """Flush data to disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def size(self) -> int:
+        """Size of flushed data in the file"""
+        return self._file.tell()
+
+    def close(self):
+        """Close the file"""
+        self._file.close()
@@ -0,0 +1,129 @@
+"""Binary writer for time series"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+class TimeseriesNpyWriter:
+    """Write blocks of time series into a .npy file as one contiguous array,
+    float32 by default
+
+    The shape is known only at the end, so the header is reserved when the file is
+    created and written in close(). The summary goes to a JSON sidecar
+    <path>.json. The file can be opened with np.load(path, mmap_mode="r").
+    """
+
+    HEADER_SIZE = 128
+    DTYPE = np.dtype("<f4")
+
+    def __init__(
+        self,
+        path: Path,
+        chunk_size: int = 1 << 20,
+        columns: Optional[Tuple[int, ...]] = None,
+        dtype: str = DTYPE.str,
+    ):
+        """
+        Args:
+            path: Path to .npy file, it is overwritten
+            chunk_size: Size of the file buffer
+            columns: Shape of a sample, if it is given the existing file is continued
+            dtype: Type of values, e.g. <f8 keeps timestamps in milliseconds exact
+        """
+        self._path = Path(path)
+        self._dtype = np.dtype(dtype)
+        self._columns = None if columns is None else tuple(columns)
+        if self._columns is None:
+            self._file = open(  # pylint: disable=consider-using-with
+                path, "wb", buffering=chunk_size
+            )
+            self._file.write(b" " * self.HEADER_SIZE)
+        else:
+            self._file = open(  # pylint: disable=consider-using-with
+                path, "r+b", buffering=chunk_size
+            )
+            self._file.seek(0, os.SEEK_END)
+
+        sample_size = self._dtype.itemsize * int(np.prod(self._columns or ()))
+        self._rows = (self._file.tell() - self.HEADER_SIZE) // sample_size
+
+    def write(self, block: np.ndarray):
+        """Append block of samples"""
+        block = np.ascontiguousarray(block, dtype=self._dtype)
+        if self._columns is None:
+            self._columns = block.shape[1:]
+        elif block.shape[1:] != self._columns:
+            raise ValueError(
+                f"Block has shape {block.shape}, expected (N, {self._columns})"
+            )
+
+        self._file.write(block.data)
+        self._rows += len(block)
+
+    @property
+    def columns(self) -> Optional[Tuple[int, ...]]:
+        """Shape of a sample, None if nothing is written"""
+        return self._columns
+
+    def flush(self):
+        """Write buffered data to the file"""
+        self._file.flush()
+
+    def sync(self):
+        """Flush data to disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def size(self) -> int:
+        """Size of flushed data in the file"""
+        return self._file.tell()
+
+    def _header(self) -> bytes:
+        shape = (self._rows,) + (self._columns or ())
+        header = repr(
+            {"descr": self._dtype.str, "fortran_order": False, "shape": shape}
+        )
+        size = self.HEADER_SIZE - len(NPY_MAGIC) - 2
+        if len(header) + 1 > size:
+            raise ValueError(f"Shape {shape} doesn't fit into the header")
+        return (
+            NPY_MAGIC
+            + size.to_bytes(2, "little")
+            + header.ljust(size - 1).encode("latin1")
+            + b"\n"
+        )
+
+    def close(
+        self,
+        topic: str,
+        count: int,
+        first_timestamp: int,
+        last_timestamp: int,
+        **info: Any,
+    ):  # pylint: disable=too-many-arguments
+        """Write header, summary sidecar and close the file,
+        info is added to the sidecar"""
+        try:
+            self._file.seek(0)
+            self._file.write(self._header())
+        finally:
+            self._file.close()
+
+        with open(f"{self._path}.json", "w", encoding="utf-8") as sidecar:
+            json.dump(
+                {
+                    "topic": topic,
+                    "count": count,
+                    "first_timestamp": first_timestamp,
+                    "last_timestamp": last_timestamp,
+                    **info,
+                },
+                sidecar,
+            )
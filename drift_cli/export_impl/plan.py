@@ -0,0 +1,163 @@
+"""Estimate size and duration of export"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Optional
+
+from drift_client import DriftClient
+from drift_client.error import DriftClientError
+from pydantic import BaseModel
+from rich.console import Console
+from rich.table import Table
+
+from drift_cli.utils.consoles import error_console
+from drift_cli.utils.helpers import split_window, to_timestamp
+from drift_cli.utils.humanize import pretty_size, pretty_time_interval
+
+
+class TopicPlan(BaseModel):
+    """Estimate of a topic"""
+
+    topic: str
+    packages: int = 0
+    size: int = 0
+    duration: float = 0.0
+    speed: float = 0.0
+    sampled: int = 0
+    exact: bool = True
+
+
+def _sample_window(client, topic: str, start: float, stop: float, limit: int):
+    """Read first packages of window, return count estimate, sizes and wall time"""
+    started = time.perf_counter()
+    it = client.walk(topic, start, stop)
+    try:
+        packages = list(islice(it, limit))
+    finally:
+        if hasattr(it, "close"):
+            it.close()
+    elapsed = time.perf_counter() - started
+
+    sizes = [len(pkg.blob) for pkg in packages]
+    if len(packages) < limit or len(packages) < 2:
+        return len(packages), sizes, elapsed, True
+
+    # packages are spread evenly from the first sampled one to the end of the window
+    first, last = packages[0].package_id, packages[-1].package_id
+    if last == first:
+        return len(packages), sizes, elapsed, False
+    count = (len(packages) - 1) / (last - first) * (stop * 1000 - first)
+    return max(len(packages), round(count)), sizes, elapsed, False
+
+
+def sample_topic(
+    client: DriftClient, topic: str, start: str, stop: str, **kwargs
+) -> TopicPlan:
+    """Estimate number of packages, size and duration of export of a topic
+
+    The time range is split into windows, a few packages are read at the start
+    of each window and extrapolated to the rest of it.
+
+    Args:
+        client: Drift client
+        topic: Topic name
+        start: Start time point in ISO format
+        stop: Stop time point in ISO format
+    Keyword Args:
+        samples (int): Number of windows to sample
+        sample_size (int): Maximal number of packages to read in a window
+    """
+    plan = TopicPlan(topic=topic)
+    read_size = 0
+    read_time = 0.0
+    for window_start, window_stop in split_window(
+        to_timestamp(start), to_timestamp(stop), kwargs.get("samples", 5)
+    ):
+        count, sizes, elapsed, exact = _sample_window(
+            client, topic, window_start, window_stop, kwargs.get("sample_size", 10)
+        )
+        plan.packages += count
+        plan.sampled += len(sizes)
+        plan.exact = plan.exact and exact
+        read_size += sum(sizes)
+        read_time += elapsed
+
+    if plan.sampled > 0:
+        plan.size = round(plan.packages * read_size / plan.sampled)
+    if read_size > 0 and read_time > 0:
+        plan.speed = read_size / read_time
+        plan.duration = plan.size / plan.speed
+    return plan
+
+
+async def plan_export(
+    client: DriftClient, topics: List[str], parallel: int, **kwargs
+) -> List[TopicPlan]:
+    """Sample topics in parallel and return their estimates sorted by size
+
+    Topics are walked in threads while the event loop of the client is running,
+    so the client can schedule its requests in the loop from these threads.
+
+    Args:
+        client: Drift client
+        topics: Topic names
+        parallel: Number of topics sampled in parallel
+    Keyword Args:
+        start (str): Start time point in ISO format
+        stop (str): Stop time point in ISO format
+        samples (int): Number of windows to sample in each topic
+        sample_size (int): Maximal number of packages to read in a window
+    """
+
+    def _sample(topic: str) -> Optional[TopicPlan]:
+        try:
+            return sample_topic(client, topic, **kwargs)
+        except DriftClientError as err:
+            error_console.print(f"[ERROR] Failed to sample {topic}: {err}")
+            return None
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max(1, min(parallel, len(topics)))) as pool:
+        plans = await asyncio.gather(
+            *[loop.run_in_executor(pool, _sample, topic) for topic in topics]
+        )
+    plans = [plan for plan in plans if plan is not None]
+    return sorted(plans, key=lambda plan: plan.size, reverse=True)
+
+
+def total_duration(plans: List[TopicPlan], parallel: int) -> float:
+    """Expected duration of export if topics are exported in parallel"""
+    durations = [plan.duration for plan in plans]
+    if not durations:
+        return 0.0
+    return max(max(durations), sum(durations) / parallel)
+
+
+def print_plan(plans: List[TopicPlan], parallel: int, console: Console):
+    """Print table of topics, estimates are marked with ~"""
+    table = Table(title="Export plan")
+    for column in ("Topic", "Packages", "Size", "Speed", "Duration"):
+        table.add_column(column, justify="left" if column == "Topic" else "right")
+
+    for plan in plans:
+        mark = "" if plan.exact else "~"
+        table.add_row(
+            plan.topic,
+            f"{mark}{plan.packages}",
+            f"{mark}{pretty_size(plan.size)}",
+            f"{pretty_size(plan.speed)}/s",
+            pretty_time_interval(plan.duration),
+        )
+
+    mark = "" if all(plan.exact for plan in plans) else "~"
+    table.add_section()
+    table.add_row(
+        "Total",
+        f"{mark}{sum(plan.packages for plan in plans)}",
+        f"{mark}{pretty_size(sum(plan.size for plan in plans))}",
+        "",
+        pretty_time_interval(total_duration(plans, parallel)),
+    )
+    console.print(table)
@@ -3,36 +3,98 @@
 import asyncio
 import csv
 import json
-from collections import OrderedDict
-from concurrent.futures import ThreadPoolExecutor, Executor
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from functools import partial
+from multiprocessing import get_context
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, List, Sequence, Tuple, Dict, Union
 
-import numpy as np
 from drift_client import DriftClient, DriftDataPackage
 from drift_client.error import DriftClientError
 from drift_protocol.common import StatusCode
 from drift_protocol.meta import MetaInfo
-from google.protobuf.json_format import MessageToDict
 from rich.progress import Progress
 from wavelet_buffer import WaveletBuffer
 from wavelet_buffer.img import RgbJpeg, HslJpeg, GrayJpeg
 
+from drift_cli.export_impl.aggregate import WindowAggregator
+from drift_cli.export_impl.archive import ArchiveWriter
+from drift_cli.export_impl.checkpoint import TopicCheckpoint
+from drift_cli.export_impl.compression import open_output, suffix
+from drift_cli.export_impl.csv_writer import (
+    TimeseriesCsvWriter,
+    write_summary_sidecar,
+)
+from drift_cli.export_impl.metadata import MetadataJsonlWriter, package_metadata
+from drift_cli.export_impl.npy_writer import TimeseriesNpyWriter
+from drift_cli.export_impl.stream import STDOUT, FrameWriter
+from drift_cli.export_impl.writer import Writer
 from drift_cli.utils.helpers import read_topic, filter_topics, to_timestamp
+from drift_cli.utils.humanize import pretty_size
+from drift_cli.utils.limiter import (
+    AUTO_MAX_PARALLEL,
+    AdaptiveLimiter,
+    TokenBucket,
+    make_limiter,
+)
+from drift_cli.utils.profiling import record, stage
+from drift_cli.utils.progress import make_progress
+
+
+class _MetadataExporter:
+    """Export metadata of packages as a JSON file per package
+    or as lines of DEST/TOPIC.meta.jsonl"""
+
+    def __init__(self, dest: str, topic: str, checkpoint: TopicCheckpoint, **kwargs):
+        self._writer: Writer = kwargs["writer"]
+        self._topic = topic
+        self._compress = kwargs.get("compress")
+        self._folder = Path(dest) / topic
+        self._path = Path(dest) / f"{topic}.meta.jsonl{suffix(self._compress)}"
+        self._checkpoint = checkpoint
+        self._enabled = kwargs.get("with_metadata", False)
+        self._jsonl = kwargs.get("metadata_format", "json") == "jsonl"
+        self._sink = None
+
+    async def export(self, pkg: DriftDataPackage):
+        """Export metadata of package"""
+        if not self._enabled:
+            return
+
+        if not self._jsonl:
+            with stage("metadata", self._topic):
+                meta = json.dumps(package_metadata(pkg), indent=2, sort_keys=False)
+            await self._writer.write_file(
+                self._topic,
+                self._folder / f"{pkg.package_id}.json{suffix(self._compress)}",
+                meta.encode("utf-8"),
+                self._compress,
+            )
+            return
 
+        if self._sink is None:
+            self._sink = await self._writer.call(
+                self._topic,
+                partial(
+                    MetadataJsonlWriter,
+                    self._path,
+                    append=self._checkpoint.resumed and self._checkpoint.count > 0,
+                    compress=self._compress,
+                ),
+            )
+        await self._writer.submit(self._topic, self._sink.write, pkg, target=self._sink)
 
-def _export_metadata_to_json(path: Path, pkg: DriftDataPackage):
-    with open(f"{path}/{pkg.package_id}.json", "w") as f:
-        meta = {
-            "id": pkg.package_id,
-            "status": pkg.status_code,
-            "published_time": pkg.publish_timestamp,
-            "source_timestamp": pkg.source_timestamp,
-            "labels": pkg.labels,
-        }
-        meta.update(MessageToDict(pkg.meta, preserving_proto_field_name=True))
+    def outputs(self) -> Dict[Path, int]:
+        """Size of JSONL file for checkpoint, call it after the writer is synced"""
+        return {self._path: self._sink.size} if self._sink else {}
 
-        json.dump(meta, f, indent=2, sort_keys=False)
+    async def close(self):
+        """Close JSONL file"""
+        if self._sink:
+            await self._writer.call(self._topic, self._sink.close)
 
 
 def _tokenize(mask: str) -> List[Tuple[str, int]]:
@@ -52,38 +114,94 @@ def _tokenize(mask: str) -> List[Tuple[str, int]]:
     return tokens
 
 
-def extract_jpeg_images_from_buffer(
-    buffer: WaveletBuffer, layout: str, scale_factor: int
-) -> List[bytes]:
-    """takes a wavelet buffer and returns possibly multiple jpegs"""
+_ENCODERS: Dict[str, object] = {}
+
+
+def _encoder(img_mask: str):
+    """JPEG encoder for the image type, created once per process"""
+    if img_mask not in _ENCODERS:
+        if img_mask == "HSL":
+            _ENCODERS[img_mask] = HslJpeg()
+        elif img_mask == "RGB":
+            _ENCODERS[img_mask] = RgbJpeg()
+        elif img_mask == "G":
+            _ENCODERS[img_mask] = GrayJpeg()
+        else:
+            return None
+    return _ENCODERS[img_mask]
+
+
+def parse_pyramid(scale_factors: str) -> List[int]:
+    """Parse comma separated scale factors of --pyramid, sorted and unique"""
+    try:
+        scales = sorted({int(scale) for scale in scale_factors.split(",")})
+    except ValueError as err:
+        raise ValueError(
+            f"Invalid scale factors '{scale_factors}', use e.g. 0,2,3"
+        ) from err
+    if scales[0] < 0:
+        raise ValueError("Scale factors must not be negative")
+    return scales
+
+
+def extract_jpeg_pyramid(
+    buffer: WaveletBuffer, layout: str, scale_factors: Sequence[int]
+) -> List[List[bytes]]:
+    """takes a wavelet buffer and returns possibly multiple jpegs for each scale factor
+
+    The buffer is decoded once for all scale factors. Each channel slice is composed
+    once for each distinct scale factor, a larger scale factor skips the last steps
+    of the reconstruction, so small images cost little compared to the full one.
+    """
     if buffer.parameters.signal_number < len(layout):
         raise RuntimeError(
             f'Wrong channel number in layout "{layout} '
             f"should >= {buffer.parameters.signal_number}"
         )
 
-    scale_factor = min(scale_factor, buffer.parameters.decomposition_steps)
+    steps = buffer.parameters.decomposition_steps
+    scale_factors = [min(scale_factor, steps) for scale_factor in scale_factors]
 
-    images = []
+    pyramid: List[List[bytes]] = [[] for _ in scale_factors]
     for img_mask, offset in _tokenize(layout):
-        ch_slice = buffer[offset : offset + len(img_mask)].compose(
-            scale_factor=scale_factor
-        )
+        view = buffer[offset : offset + len(img_mask)]
+        encoder = _encoder(img_mask)
+        if encoder is None:
+            raise RuntimeError(f"Wrong channel layout {img_mask} in mask {layout}")
 
-        if img_mask == "HSL":
-            img = HslJpeg().encode(ch_slice)
+        encoded: Dict[int, bytes] = {}
+        for images, scale_factor in zip(pyramid, scale_factors):
+            if scale_factor not in encoded:
+                encoded[scale_factor] = encoder.encode(
+                    view.compose(scale_factor=scale_factor)
+                )
+            images.append(encoded[scale_factor])
+    return pyramid
 
-        elif img_mask == "RGB":
-            img = RgbJpeg().encode(ch_slice)
 
-        elif img_mask == "G":
-            img = GrayJpeg().encode(ch_slice)
+def extract_jpeg_images_from_buffer(
+    buffer: WaveletBuffer, layout: str, scale_factor: int
+) -> List[bytes]:
+    """takes a wavelet buffer and returns possibly multiple jpegs"""
+    return extract_jpeg_pyramid(buffer, layout, [scale_factor])[0]
 
-        else:
-            raise RuntimeError(f"Wrong channel layout {img_mask} in mask {layout}")
 
-        images.append(img)
-    return images
+def _transcode_jpeg(
+    blob: bytes, layout: str, scale_factors: Sequence[int]
+) -> Tuple[List[List[bytes]], Dict[str, float]]:
+    """Decode package and encode its images in a worker process
+    Returns:
+        images of each scale factor and timing of transcoding for profiling.record()
+    """
+    started, cpu = time.perf_counter(), time.process_time()
+    package = DriftDataPackage(blob)
+    images = extract_jpeg_pyramid(package.as_buffer(), layout, scale_factors)
+    return images, {
+        "wall": time.perf_counter() - started,
+        "cpu": time.process_time() - cpu,
+        "started": started,
+        "pid": os.getpid(),
+    }
 
 
 async def _export_topic(
@@ -95,13 +213,86 @@ async def _export_topic(
     sem,
     **kwargs,
 ):
-    async for package, task in read_topic(pool, client, topic, progress, sem, **kwargs):
-        Path.mkdir(Path(dest) / topic, exist_ok=True, parents=True)
-        with open(Path(dest) / topic / f"{package.package_id}.dp", "wb") as file:
-            file.write(package.blob)
+    path = Path(dest) / topic
+    writer: Writer = kwargs["writer"]
+    ordered = kwargs.get("resume", False)
+    # the checkpoint reads its file and truncates the outputs if it is resumed
+    checkpoint = await writer.call(
+        topic,
+        partial(
+            TopicCheckpoint,
+            dest,
+            topic,
+            _mode("archive" if kwargs.get("archive", False) else "raw", **kwargs),
+            resume=kwargs.get("resume", False),
+            enabled=ordered or kwargs.get("shards", 1) == 1,
+        ),
+    )
+    metadata = _MetadataExporter(dest, topic, checkpoint, **kwargs)
+    archive = None
+    created = False
+
+    def _save():
+        outputs = metadata.outputs()
+        if archive:
+            outputs[archive.index_path] = archive.index_size
+        checkpoint.save(outputs, writer.durable)
+
+    async def _save_checkpoint():
+        await writer.sync(topic)
+        await writer.call(topic, _save)
 
-        if kwargs.get("with_metadata", False):
-            _export_metadata_to_json(Path(dest) / topic, package)
+    try:
+        async for package, task in read_topic(
+            pool,
+            client,
+            topic,
+            progress,
+            sem,
+            ordered=ordered,
+            resume_from=checkpoint.package_id,
+            **kwargs,
+        ):
+            if kwargs.get("archive", False):
+                if archive is None:
+                    archive = await writer.call(
+                        topic,
+                        ArchiveWriter,
+                        path,
+                        kwargs["segment_size"],
+                        checkpoint.resumed,
+                    )
+                await writer.submit(
+                    topic,
+                    archive.append,
+                    package.package_id,
+                    package.blob,
+                    target=archive,
+                )
+            else:
+                if not created:
+                    await writer.submit(
+                        topic, partial(path.mkdir, exist_ok=True, parents=True)
+                    )
+                    created = True
+                compress = kwargs.get("compress")
+                await writer.write_file(
+                    topic,
+                    path / f"{package.package_id}.dp{suffix(compress)}",
+                    package.blob,
+                    compress,
+                )
+
+            await metadata.export(package)
+
+            checkpoint.update(package)
+            if checkpoint.due():
+                await _save_checkpoint()
+    finally:
+        await _save_checkpoint()
+        await metadata.close()
+        if archive:
+            await writer.call(topic, archive.close)
 
 
 async def _export_jpeg(
@@ -113,40 +304,129 @@ async def _export_jpeg(
     sem,
     **kwargs,
 ):
-    async for package, task in read_topic(pool, client, topic, progress, sem, **kwargs):
-        if package.status_code != StatusCode.GOOD:
-            progress.console.print(
-                f"Can't extract picture from  {topic}/{package.package_id}.dp: {StatusCode.Name(package.status_code)}"
-            )
-            continue
+    loop = asyncio.get_running_loop()
+    path = Path(dest) / topic
+    writer: Writer = kwargs["writer"]
+    jpeg_pool = kwargs["jpeg_pool"]
+    ordered = kwargs.get("resume", False)
+    pyramid = kwargs.get("pyramid")
+    if pyramid:
+        mode = f"jpeg:pyramid{','.join(str(scale) for scale in pyramid)}"
+        scale_factors = list(pyramid)
+        folders = [path / f"scale_{scale}" for scale in pyramid]
+    else:
+        scale_factors = [kwargs.get("jpeg_scale", 0)]
+        mode = f"jpeg:scale{scale_factors[0]}" if scale_factors[0] else "jpeg"
+        folders = [path]
+    checkpoint = await writer.call(
+        topic,
+        partial(
+            TopicCheckpoint,
+            dest,
+            topic,
+            _mode(mode, **kwargs),
+            resume=kwargs.get("resume", False),
+            enabled=ordered or kwargs.get("shards", 1) == 1,
+        ),
+    )
+    metadata = _MetadataExporter(dest, topic, checkpoint, **kwargs)
+    pending = deque()
+    created = False
+
+    def _save():
+        checkpoint.save(metadata.outputs(), writer.durable)
+
+    async def _save_checkpoint():
+        await writer.sync(topic)
+        await writer.call(topic, _save)
+
+    async def _save_oldest():
+        package, future = pending.popleft()
+        pyramid_images, timing = await future
+        record("jpeg", topic, **timing)
+        for folder, images in zip(folders, pyramid_images):
+            for i, img in enumerate(images):
+                name = (
+                    f"{package.package_id}_{i}.jpeg"
+                    if len(images) > 1
+                    else f"{package.package_id}.jpeg"
+                )
+                await writer.write_file(topic, folder / name, img)
 
-        meta = package.meta
+        await metadata.export(package)
+        checkpoint.update(package)
+        if checkpoint.due():
+            await _save_checkpoint()
 
-        if meta.type != MetaInfo.IMAGE:
-            progress.update(
-                task,
-                description=f"[SKIPPED] Topic {topic} is not an image",
-                completed=True,
-            )
-            break
+    try:
+        async for package, task in read_topic(
+            pool,
+            client,
+            topic,
+            progress,
+            sem,
+            ordered=ordered,
+            resume_from=checkpoint.package_id,
+            **kwargs,
+        ):
+            if package.status_code != StatusCode.GOOD:
+                progress.console.print(
+                    f"Can't extract picture from  {topic}/{package.package_id}.dp: {StatusCode.Name(package.status_code)}"
+                )
+                continue
 
-        Path.mkdir(Path(dest) / topic, exist_ok=True, parents=True)
-        if package.meta.HasField("image_info"):
-            layout = package.meta.image_info.channel_layout
-        else:
-            layout = "RGB"
-        images = extract_jpeg_images_from_buffer(package.as_buffer(), layout, 0)
-        for i, img in enumerate(images):
-            name = (
-                f"{package.package_id}_{i}.jpeg"
-                if len(images) > 1
-                else f"{package.package_id}.jpeg"
+            meta = package.meta
+
+            if meta.type != MetaInfo.IMAGE:
+                progress.update(
+                    task,
+                    description=f"[SKIPPED] Topic {topic} is not an image",
+                    completed=True,
+                )
+                break
+
+            if not created:
+                for folder in folders:
+                    await writer.submit(
+                        topic, partial(folder.mkdir, exist_ok=True, parents=True)
+                    )
+                created = True
+            if package.meta.HasField("image_info"):
+                layout = package.meta.image_info.channel_layout
+            else:
+                layout = "RGB"
+
+            # keep all workers busy even if there is only one topic,
+            # but save images in order of packages for the checkpoint
+            pending.append(
+                (
+                    package,
+                    loop.run_in_executor(
+                        jpeg_pool,
+                        _transcode_jpeg,
+                        package.blob,
+                        layout,
+                        scale_factors,
+                    ),
+                )
             )
-            with open(Path(dest) / topic / name, "wb") as file:
-                file.write(img)
+            while len(pending) >= kwargs["workers"] or (
+                pending and pending[0][1].done()
+            ):
+                await _save_oldest()
+
+        while pending:
+            await _save_oldest()
+    finally:
+        await _save_checkpoint()
+        await metadata.close()
 
-        if kwargs.get("with_metadata", False):
-            _export_metadata_to_json(Path(dest) / topic, package)
+
+async def _replay(probed: List, packages: AsyncIterator) -> AsyncIterator:
+    for item in probed:
+        yield item
+    async for item in packages:
+        yield item
 
 
 async def _export_csv(
@@ -158,39 +438,70 @@ async def _export_csv(
     sem,
     **kwargs,
 ):
-    Path.mkdir(Path(dest), exist_ok=True, parents=True)
+    writer: Writer = kwargs["writer"]
+    resume = kwargs.get("resume", False)
+    await writer.call(topic, partial(Path(dest).mkdir, exist_ok=True, parents=True))
+    checkpoints = {
+        MetaInfo.TIME_SERIES: await writer.call(
+            topic,
+            partial(
+                TopicCheckpoint, dest, topic, _timeseries_mode(**kwargs), resume=resume
+            ),
+        ),
+        MetaInfo.TYPED_DATA: await writer.call(
+            topic,
+            partial(
+                TopicCheckpoint,
+                dest,
+                topic,
+                _mode("typed_csv", **kwargs),
+                resume=resume,
+            ),
+        ),
+    }
+    resumed = [kind for kind, checkpoint in checkpoints.items() if checkpoint.resumed]
+    packages = read_topic(
+        pool,
+        client,
+        topic,
+        progress,
+        sem,
+        resume_from=checkpoints[resumed[0]].package_id if resumed else 0,
+        **kwargs,
+    )
     try:
-        it = client.walk(
-            topic, to_timestamp(kwargs["start"]), to_timestamp(kwargs["stop"])
-        )
-
-        def _next():
-            try:
-                return next(it)
-            except StopIteration:
-                return None
-
-        good = False
-
-        while True:
-            pkg = await asyncio.get_running_loop().run_in_executor(pool, _next)
-            if pkg is None:
-                break
-            if pkg.status_code == 0:
-                good = True
-                break
-
-        if not good:
-            progress.console.print(f"[ERROR] No good packages found in {topic}")
-            return
-
-        if pkg is None or pkg.meta.type == MetaInfo.TIME_SERIES:
+        if resumed:
+            kind = resumed[0]
+        else:
+            # the type of the topic is known from its first good package,
+            # the packages read so far are replayed to the exporter
+            probed = []
+            async for package, task in packages:
+                probed.append((package, task))
+                if package.status_code == 0:
+                    break
+            else:
+                progress.console.print(f"[ERROR] No good packages found in {topic}")
+                return
+
+            kind = probed[-1][0].meta.type
+            packages = _replay(probed, packages)
+
+        if kind == MetaInfo.TIME_SERIES:
             await _export_csv_timeseries(
-                pool, client, topic, dest, progress, sem, **kwargs
+                topic, dest, progress, packages, checkpoints[kind], **kwargs
             )
-        elif pkg.meta.type == MetaInfo.TYPED_DATA:
+        elif kind == MetaInfo.TYPED_DATA and kwargs.get("npy", False):
+            progress.console.print(
+                f"[ERROR] {topic} is typed data, --npy supports only time series"
+            )
+        elif kind == MetaInfo.TYPED_DATA and kwargs.get("aggregate"):
+            progress.console.print(
+                f"[ERROR] {topic} is typed data, --aggregate supports only time series"
+            )
+        elif kind == MetaInfo.TYPED_DATA:
             await _export_csv_typed_data(
-                pool, client, topic, dest, progress, sem, **kwargs
+                topic, dest, progress, packages, checkpoints[kind], **kwargs
             )
         else:
             progress.console.print(
@@ -198,173 +509,411 @@ async def _export_csv(
             )
     except DriftClientError as err:
         progress.console.print(f"[ERROR] {err}")
+    finally:
+        await packages.aclose()
 
 
-async def _export_csv_timeseries(
+def _mode(mode: str, **kwargs) -> str:
+    """Mode of checkpoint, a compressed export can't continue a plain one"""
+    compress = kwargs.get("compress")
+    return f"{mode}:{compress}" if compress else mode
+
+
+async def _export_stream(
     pool: Executor,
     client: DriftClient,
     topic: str,
-    dest: str,
+    _dest: str,
     progress: Progress,
     sem,
-    scale,
     **kwargs,
 ):
-    filename = Path(dest) / f"{topic}.csv"
-    started = False
-    first_timestamp = 0
-    last_timestamp = 0
-    count = 0
+    writer: Writer = kwargs["writer"]
+    sink: FrameWriter = kwargs["sink"]
+    name = f"{kwargs['source']}/{topic}" if kwargs.get("source") else topic
+    typed = kwargs.get("csv", False)
     async for package, task in read_topic(pool, client, topic, progress, sem, **kwargs):
-        meta = package.meta
-        if meta.type != MetaInfo.TIME_SERIES:
-            progress.update(
-                task,
-                description=f"[SKIPPED] Topic {topic} is not a time series",
-                completed=True,
-            )
-            break
-
-        if not started:
-            with open(Path(dest) / f"{topic}.csv", "w") as file:
-                file.write(" " * 256 + "\n")
-            started = True
-            first_timestamp = meta.time_series_info.start_timestamp.ToMilliseconds()
-        else:
-            if last_timestamp != meta.time_series_info.start_timestamp.ToMilliseconds():
-                progress.update(
-                    task,
-                    description=f"[ERROR] Topic {topic} has gaps",
-                    completed=True,
-                )
-                break
+        if not typed:
+            await writer.submit(STDOUT, sink.write_package, name, package)
+            continue
 
         if package.status_code != 0:
+            continue
+        if package.meta.type != MetaInfo.TYPED_DATA:
             progress.update(
                 task,
-                description=f"[ERROR] Topic {topic} has a bad package",
+                description=f"[SKIPPED] Topic {name} is not typed data",
                 completed=True,
             )
             break
 
-        last_timestamp = package.meta.time_series_info.stop_timestamp.ToMilliseconds()
-        with open(filename, "a") as file:
-            np.savetxt(
-                file, package.as_np(scale_factor=scale), delimiter=",", fmt="%.5f"
-            )
-
-        count += 1
-
-    if started:
-        with open(filename, "r+") as file:
-            file.seek(0)
-            file.write(
-                ",".join(
-                    [
-                        topic,
-                        str(count),
-                        str(first_timestamp),
-                        str(last_timestamp),
-                    ]
-                )
-            )
+        row = {"topic": name, "timestamp": package.package_id}
+        with stage("decode", topic):
+            row.update(package.as_typed_data())
+        await writer.submit(STDOUT, sink.write_row, row)
+
+
+def _timeseries_mode(**kwargs) -> str:
+    """Mode of checkpoint, an aggregated export can't continue a full-rate one"""
+    mode = "npy" if kwargs.get("npy", False) else "csv"
+    if kwargs.get("aggregate"):
+        mode += f":{kwargs['aggregate']}ms:{','.join(kwargs['stats'])}"
+    return _mode(mode, **kwargs)
+
+
+def _timeseries_writer(filename: Path, checkpoint: TopicCheckpoint, **kwargs):
+    resumed = checkpoint.resumed and checkpoint.count > 0
+    aggregated = bool(kwargs.get("aggregate"))
+    if kwargs.get("npy", False):
+        # float32 can't hold timestamps of windows in milliseconds
+        return TimeseriesNpyWriter(
+            filename,
+            columns=checkpoint.state["columns"] if resumed else None,
+            dtype="<f8" if aggregated else TimeseriesNpyWriter.DTYPE.str,
+        )
+    return TimeseriesCsvWriter(
+        filename,
+        precision=kwargs.get("precision", 5),
+        append=resumed,
+        compress=kwargs.get("compress"),
+        timestamps=aggregated,
+    )
 
 
-async def _export_csv_typed_data(
-    pool: Executor,
-    client: DriftClient,
+async def _export_csv_timeseries(
     topic: str,
     dest: str,
     progress: Progress,
-    sem,
+    packages: AsyncIterator,
+    checkpoint: TopicCheckpoint,
+    scale,
     **kwargs,
 ):
-    filename = Path(dest) / f"{topic}.csv"
-    csv_writer = None
-    first_timestamp = 0
-    last_timestamp = 0
-    count = 0
-    with open(Path(dest) / f"{topic}.csv", "w") as file:
-        async for package, task in read_topic(
-            pool, client, topic, progress, sem, **kwargs
-        ):
+    mode = "npy" if kwargs.get("npy", False) else "csv"
+    filename = Path(dest) / f"{topic}.{mode}{suffix(kwargs.get('compress'))}"
+    writer: Writer = kwargs["writer"]
+    first_timestamp = checkpoint.state.get("first_timestamp", 0)
+    last_timestamp = checkpoint.state.get("last_timestamp", 0)
+    stream = None
+    if checkpoint.count > 0:
+        stream = await writer.call(
+            topic, partial(_timeseries_writer, filename, checkpoint, **kwargs)
+        )
+    aggregator = None
+    if kwargs.get("aggregate"):
+        aggregator = WindowAggregator(
+            kwargs["aggregate"],
+            kwargs["stats"],
+            state=checkpoint.state.get("aggregate"),
+        )
 
-            if package.status_code != 0:
-                continue
+    def _save():
+        checkpoint.save(
+            {filename: stream.size},
+            writer.durable,
+            first_timestamp=first_timestamp,
+            last_timestamp=last_timestamp,
+            columns=getattr(stream, "columns", None),
+            aggregate=aggregator.state() if aggregator else None,
+        )
+
+    async def _save_checkpoint():
+        await writer.sync(topic)
+        await writer.call(topic, _save)
 
+    try:
+        async for package, task in packages:
             meta = package.meta
-            if meta.type != MetaInfo.TYPED_DATA:
+            if meta.type != MetaInfo.TIME_SERIES:
                 progress.update(
                     task,
-                    description=f"[SKIPPED] Topic {topic} is not typed data",
+                    description=f"[SKIPPED] Topic {topic} is not a time series",
                     completed=True,
                 )
                 break
 
-            fields = {"timestamp": package.package_id}
+            if stream is None:
+                stream = await writer.call(
+                    topic, partial(_timeseries_writer, filename, checkpoint, **kwargs)
+                )
+                first_timestamp = meta.time_series_info.start_timestamp.ToMilliseconds()
+            else:
+                if (
+                    last_timestamp
+                    != meta.time_series_info.start_timestamp.ToMilliseconds()
+                ):
+                    progress.update(
+                        task,
+                        description=f"[ERROR] Topic {topic} has gaps",
+                        completed=True,
+                    )
+                    break
 
-            if csv_writer is None:
-                file.write(" " * 256 + "\n")
-                first_timestamp = package.package_id
-                csv_writer = csv.DictWriter(
-                    file,
-                    fieldnames=list(fields.keys())
-                    + list(sorted(package.as_typed_data().keys())),
+            if package.status_code != 0:
+                progress.update(
+                    task,
+                    description=f"[ERROR] Topic {topic} has a bad package",
+                    completed=True,
                 )
-                csv_writer.writeheader()
+                break
 
-            fields.update(package.as_typed_data())  # Use | when dropping python 3.8
-            csv_writer.writerow(fields)
+            last_timestamp = meta.time_series_info.stop_timestamp.ToMilliseconds()
+            with stage("decode", topic):
+                block = package.as_np(scale_factor=scale)
+            if aggregator is not None:
+                with stage("aggregate", topic):
+                    block = aggregator.add(
+                        block,
+                        meta.time_series_info.start_timestamp.ToMilliseconds(),
+                        last_timestamp,
+                    )
+            await writer.submit(topic, stream.write, block, target=stream)
+
+            checkpoint.update(package)
+            if checkpoint.due():
+                await _save_checkpoint()
+    finally:
+        if stream:
+            # the last window isn't complete at the checkpoint,
+            # it is in the state of the aggregator and written after it
+            await _save_checkpoint()
+            if aggregator is not None:
+                await writer.submit(topic, stream.write, aggregator.flush())
+            info = {}
+            if aggregator is not None:
+                info = {"period_ms": kwargs["aggregate"], "stats": kwargs["stats"]}
+            await writer.call(
+                topic,
+                partial(
+                    stream.close,
+                    topic,
+                    checkpoint.count,
+                    first_timestamp,
+                    last_timestamp,
+                    **info,
+                ),
+            )
 
-            count += 1
 
-    if csv_writer:
-        with open(filename, "r+") as file:
-            file.seek(0)
-            file.write(
-                ",".join(
-                    [
-                        topic,
-                        str(count),
-                        str(first_timestamp),
-                        str(last_timestamp),
-                    ]
-                )
+async def _export_csv_typed_data(
+    topic: str,
+    dest: str,
+    progress: Progress,
+    packages: AsyncIterator,
+    checkpoint: TopicCheckpoint,
+    **kwargs,
+):
+    compress = kwargs.get("compress")
+    filename = Path(dest) / f"{topic}.csv{suffix(compress)}"
+    writer: Writer = kwargs["writer"]
+    first_timestamp = checkpoint.state.get("first_timestamp", 0)
+    fieldnames = checkpoint.state.get("fieldnames")
+    last_timestamp = 0
+    csv_writer = None
+    file = await writer.call(
+        topic,
+        partial(open_output, filename, compress, append=bool(fieldnames), text=True),
+    )
+    try:
+        if fieldnames:
+            csv_writer = csv.DictWriter(file, fieldnames=fieldnames)
+
+        def _save():
+            checkpoint.save(
+                {filename: os.fstat(file.fileno()).st_size},
+                writer.durable,
+                first_timestamp=first_timestamp,
+                fieldnames=fieldnames,
             )
 
+        async def _save_checkpoint():
+            await writer.sync(topic)
+            await writer.call(topic, _save)
+
+        try:
+            async for package, task in packages:
+                if package.status_code != 0:
+                    continue
+
+                meta = package.meta
+                if meta.type != MetaInfo.TYPED_DATA:
+                    progress.update(
+                        task,
+                        description=f"[SKIPPED] Topic {topic} is not typed data",
+                        completed=True,
+                    )
+                    break
+
+                fields = {"timestamp": package.package_id}
+
+                if csv_writer is None:
+                    first_timestamp = package.package_id
+                    fieldnames = list(fields.keys()) + list(
+                        sorted(package.as_typed_data().keys())
+                    )
+                    csv_writer = csv.DictWriter(file, fieldnames=fieldnames)
+                    if not compress:
+                        # a compressed file can't be rewritten, see below
+                        await writer.submit(topic, file.write, " " * 256 + "\n")
+                    await writer.submit(topic, csv_writer.writeheader)
+
+                with stage("decode", topic):
+                    data = package.as_typed_data()
+                fields.update(data)  # Use | when dropping python 3.8
+                await writer.submit(topic, csv_writer.writerow, fields, target=file)
+
+                checkpoint.update(package)
+                if checkpoint.due():
+                    await _save_checkpoint()
+        finally:
+            if csv_writer:
+                await _save_checkpoint()
+    finally:
+        # closing a compressed file flushes the compressor
+        await writer.call(topic, file.close)
+
+    if csv_writer and compress:
+        await writer.call(
+            topic,
+            write_summary_sidecar,
+            filename,
+            topic,
+            checkpoint.count,
+            first_timestamp,
+            last_timestamp,
+        )
+    elif csv_writer:
+        summary = ",".join(
+            [topic, str(checkpoint.count), str(first_timestamp), str(last_timestamp)]
+        )
+        await writer.call(topic, _write_summary, filename, summary)
+
+
+def _show_limit(progress):
+    """Show adjustments of --parallel auto in progress"""
+    task = None
+
+    def _update(limiter: AdaptiveLimiter):
+        nonlocal task
+        if task is None:
+            task = progress.add_task("", total=None)
+        progress.update(
+            task,
+            description=f"Parallel: {limiter.limit} topics "
+            f"(speed {pretty_size(limiter.throughput)}/s)",
+            parallel=limiter.limit,
+            speed=limiter.throughput,
+        )
+
+    return _update
+
+
+def _write_summary(filename: Path, summary: str):
+    with open(filename, "r+") as file:
+        file.seek(0)
+        file.write(summary)
+
 
-async def export_raw(client: DriftClient, dest: str, parallel: int, **kwargs):
+async def export_raw(
+    client: Union[DriftClient, Dict[str, DriftClient]],
+    dest: str,
+    parallel: Union[int, str],
+    **kwargs,
+):  # pylint: disable=too-many-locals
     """Export data from Drift instance to DST folder
     Args:
-        client: Drift client
-        dest: Path to a folder
-        parallel: Number of parallel tasks
+        client: Drift client or clients by alias names, the data of each alias
+            is exported into DST/ALIAS, all of them share the parallel limit
+        dest: Path to a folder or "-" to stream packages to stdout as frames,
+            typed data with csv as NDJSON rows, see stream.FrameWriter
+        parallel: Number of topics exported in parallel or "auto" to adjust it
+            to throughput and errors
     KArgs:
         start: Export records with timestamps newer than this time point in ISO format
         stop: Export records  with timestamps older than this time point in ISO format
         csv: Export data as CSV instead of raw data
-        topics: Export only these topics, separated by comma. You can use * as a wildcard
+        npy: Export time series as .npy files instead of raw data
+        topics: Export only these topics, names, globs or regular expressions with re:
+        exclude: Skip these topics, names, globs or regular expressions with re:
         with_meta: Export meta information in JSON format
+        metadata_format: json - a JSON file per package, jsonl - a JSONL file per topic
+        archive: Export raw data into segment files with an index
+        segment_size: Size of segment file in archive
+        precision: Number of digits after the decimal point in CSV
+        aggregate: Length of window in milliseconds to reduce time series to statistics
+        stats: Statistics of each window, see aggregate.STATS
+        prefetch: Number of packages to read ahead for each topic
+        shards: Number of time windows to read each topic in parallel
+        workers: Number of processes to transcode JPEG images
+        jpeg_scale: Scale factor of JPEG images, each step halves their size
+        pyramid: Scale factors of JPEG images to export at once into TOPIC/scale_N
+        resume: Continue export of each topic from its checkpoint
+        fsync: fsync policy of written files: none, batch or always
+        compress: Compress raw data, CSV and metadata files: gzip, bz2 or xz
+        max_bandwidth: Maximal total throughput of all topics in bytes per second
+        progress_mode: rich - progress bars, plain - text lines, json - JSON lines,
+            none - only messages
     """
-    sem = asyncio.Semaphore(parallel)
-    with Progress() as progress:
-        with ThreadPoolExecutor() as pool:
-            topics = filter_topics(client.get_topics(), kwargs.pop("topics", []))
-            task = _export_csv if kwargs.get("csv", False) else _export_topic
+    kwargs["workers"] = kwargs.get("workers") or os.cpu_count()
+    max_bandwidth = kwargs.pop("max_bandwidth", None)
+    kwargs["bandwidth"] = TokenBucket(max_bandwidth) if max_bandwidth else None
+    sources = client if isinstance(client, dict) else {"": client}
+    include, exclude = kwargs.pop("topics", []), kwargs.pop("exclude", [])
+    streamed = dest == STDOUT
+    with make_progress(
+        kwargs.pop("progress_mode", "rich"), stderr=streamed
+    ) as progress:
+        jobs = []
+        for alias, source in sources.items():
+            topics = filter_topics(source.get_topics(), include, exclude)
+            jobs += [(alias, source, topic, topics) for topic in topics]
+
+        sem = make_limiter(
+            parallel,
+            maximum=min(AUTO_MAX_PARALLEL, len(jobs)),
+            on_update=_show_limit(progress),
+        )
+        parallel = max(1, min(sem.maximum, len(jobs)))
+        with ThreadPoolExecutor(thread_name_prefix="walk") as pool, ProcessPoolExecutor(
+            # forking the process with running reader and writer threads
+            # can copy their locks in a locked state
+            kwargs["workers"],
+            mp_context=get_context("spawn"),
+        ) as jpeg_pool, Writer(
+            # a single lane writes the stream, its bounded queue slows down
+            # reading of the topics if the pipe is slow
+            lanes=1 if streamed else parallel,
+            fsync=kwargs.pop("fsync", "none"),
+        ) as writer:
+            task = (
+                _export_csv
+                if kwargs.get("csv", False) or kwargs.get("npy", False)
+                else _export_topic
+            )
             task = _export_jpeg if kwargs.get("jpeg", False) else task
+            task = _export_stream if streamed else task
+            sink = FrameWriter() if streamed else None
 
             tasks = [
                 task(
                     pool,
-                    client,
+                    source,
                     topic,
-                    dest,
+                    str(Path(dest) / alias) if alias else dest,
                     progress,
                     sem,
                     topics=topics,
-                    parallel=min(parallel, len(topics)),
+                    parallel=parallel,
+                    jpeg_pool=jpeg_pool,
+                    writer=writer.scoped(alias),
+                    source=alias,
+                    sink=sink,
                     **kwargs,
                 )
-                for topic in topics
+                for alias, source, topic, topics in jobs
             ]
-            await asyncio.gather(*tasks)
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                if sink is not None:
+                    await writer.call(STDOUT, sink.flush)
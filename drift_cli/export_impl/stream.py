@@ -0,0 +1,88 @@
+"""Stream of exported packages to stdout"""
+
+import json
+import struct
+import sys
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from drift_client import DriftDataPackage
+
+STDOUT = "-"
+_HEADER = struct.Struct("<IQiH")
+
+
+class FrameWriter:
+    """Write packages as length-prefixed frames or typed data as NDJSON rows
+    into a binary stream
+
+    A frame is uint32 size of the rest of the frame, uint64 package ID,
+    int32 status code, uint16 size of the topic name, the topic name in UTF-8
+    and the blob of the package. The integers are little-endian.
+    Frames and rows are buffered and written in large chunks. The writer isn't
+    thread-safe, it should be called from one writer thread.
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None, chunk_size: int = 1 << 20):
+        """
+        Args:
+            stream: Binary stream, stdout by default
+            chunk_size: Size of data to buffer before writing it to the stream
+        """
+        self._stream = stream if stream is not None else sys.stdout.buffer
+        self._chunk_size = chunk_size
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self._encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+    def _append(self, *chunks: bytes):
+        for chunk in chunks:
+            self._chunks.append(chunk)
+            self._buffered += len(chunk)
+        if self._buffered >= self._chunk_size:
+            self._write_chunks()
+
+    def _write_chunks(self):
+        if self._chunks:
+            self._stream.write(b"".join(self._chunks))
+            self._chunks.clear()
+            self._buffered = 0
+
+    def write_package(self, topic: str, pkg: DriftDataPackage):
+        """Write package as a frame"""
+        name = topic.encode("utf-8")
+        blob = pkg.blob
+        header = _HEADER.pack(
+            _HEADER.size - 4 + len(name) + len(blob),
+            pkg.package_id,
+            pkg.status_code,
+            len(name),
+        )
+        self._append(header, name, blob)
+
+    def write_row(self, row: Dict[str, Any]):
+        """Write row as a line of JSON"""
+        self._append(self._encoder.encode(row).encode("utf-8"), b"\n")
+
+    def flush(self):
+        """Write buffered data to the stream"""
+        self._write_chunks()
+        self._stream.flush()
+
+
+def read_frames(stream: BinaryIO) -> Iterator[Tuple[str, int, int, bytes]]:
+    """Read frames written by FrameWriter
+    Yields:
+        topic, package ID, status code and blob
+    """
+    while True:
+        header = stream.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise EOFError("Stream ends in the middle of a frame")
+
+        size, package_id, status, name_size = _HEADER.unpack(header)
+        body = stream.read(size - _HEADER.size + 4)
+        if len(body) < size - _HEADER.size + 4:
+            raise EOFError("Stream ends in the middle of a frame")
+        yield body[:name_size].decode("utf-8"), package_id, status, body[name_size:]
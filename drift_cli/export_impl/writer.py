@@ -0,0 +1,244 @@
+"""Dedicated threads for file I/O of exporters"""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from drift_cli.export_impl.compression import compress_bytes
+from drift_cli.utils.profiling import stage
+
+FSYNC_POLICIES = ("none", "batch", "always")
+
+
+class _Lane:
+    """Thread which executes file operations in order of submission"""
+
+    def __init__(self, queue_size: int, name: str):
+        self.slots = asyncio.Semaphore(queue_size)
+        self.queue = SimpleQueue()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            loop, future, key, func, args = item
+            try:
+                with stage("write", key):
+                    result = func(*args)
+            except BaseException as err:  # pylint: disable=broad-except
+                if future is None:
+                    self.error = self.error or err
+                else:
+                    loop.call_soon_threadsafe(_set_exception, future, err)
+            else:
+                if future is not None:
+                    loop.call_soon_threadsafe(_set_result, future, result)
+            loop.call_soon_threadsafe(self.slots.release)
+
+    def raise_error(self):
+        """Raise the first error of an operation which nobody waits for"""
+        if self.error is not None:
+            err, self.error = self.error, None
+            raise err
+
+
+def _set_result(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, err: BaseException):
+    if not future.done():
+        future.set_exception(err)
+
+
+class Writer:
+    """Execute file operations of exporters on dedicated threads
+
+    Each key (a topic) is bound to a lane, a thread with its own queue,
+    so operations of a topic are executed in order, and a slow disk doesn't block
+    the event loop. The queue is bounded: submit() waits while the lane is busy,
+    which slows down the reading of the topic instead of buffering it in memory.
+
+    fsync policy:
+        none: leave it to the OS, the fastest one
+        batch: fsync written files on sync(), e.g. before a checkpoint is saved
+        always: fsync each file after it is written
+    """
+
+    def __init__(self, lanes: int = 4, queue_size: int = 64, fsync: str = "none"):
+        """
+        Args:
+            lanes: Number of threads
+            queue_size: Number of operations which may wait in the queue of a lane
+            fsync: fsync policy, none, batch or always
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+
+        self.fsync = fsync
+        self._lanes = [_Lane(queue_size, f"writer-{i}") for i in range(max(lanes, 1))]
+        self._lane_by_key: Dict[Hashable, _Lane] = {}
+        self._dirty: Dict[Hashable, List[Any]] = {}
+
+    @property
+    def durable(self) -> bool:
+        """Files are flushed to disk before checkpoints are saved"""
+        return self.fsync != "none"
+
+    def _lane(self, key: Hashable) -> _Lane:
+        if key not in self._lane_by_key:
+            self._lane_by_key[key] = self._lanes[
+                len(self._lane_by_key) % len(self._lanes)
+            ]
+        return self._lane_by_key[key]
+
+    async def _put(self, key: Hashable, future, func: Callable, args):
+        lane = self._lane(key)
+        lane.raise_error()
+        await lane.slots.acquire()
+        lane.queue.put((asyncio.get_running_loop(), future, key, func, args))
+
+    async def submit(
+        self, key: Hashable, func: Callable, *args, target: Any = None
+    ) -> None:
+        """Queue operation without waiting for its result
+
+        An error of the operation is raised by the next submit() or sync() of the lane.
+
+        Args:
+            key: Key of the lane, e.g. topic name
+            func: Function to call in the thread
+            args: Arguments of the function
+            target: Path or file-like object which the operation writes to,
+                it is synced according to the fsync policy
+        """
+        if target is None:
+            await self._put(key, None, func, args)
+        else:
+            await self._put(key, None, self._write, (key, target, func, args))
+
+    async def call(self, key: Hashable, func: Callable, *args) -> Any:
+        """Execute operation after the queued ones and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._put(key, future, func, args)
+        return await future
+
+    async def write_file(
+        self, key: Hashable, path: Path, data: bytes, compress: Optional[str] = None
+    ):
+        """Queue writing of data into a new file, it is compressed in the thread
+        if compress is given, see compression.COMPRESSIONS"""
+        await self.submit(key, _write_file, path, data, compress, target=path)
+
+    async def sync(self, key: Hashable):
+        """Wait for queued operations of the key, flush its files and fsync them
+        according to the policy. After that, it is safe to save a checkpoint"""
+        await self.call(key, self._sync, key)
+        self._lane(key).raise_error()
+
+    def _write(self, key: Hashable, target: Any, func: Callable, args):
+        result = func(*args)
+        if self.fsync == "always":
+            _fsync(target)
+        elif self.fsync == "batch" or not isinstance(target, (str, Path)):
+            dirty = self._dirty.setdefault(key, [])
+            if not dirty or dirty[-1] is not target:
+                dirty.append(target)
+        return result
+
+    def _sync(self, key: Hashable):
+        dirty = self._dirty.pop(key, [])
+        seen = set()
+        for target in dirty:
+            if id(target) in seen:
+                continue
+            seen.add(id(target))
+            if self.fsync == "none":
+                target.flush()
+            else:
+                _fsync(target)
+
+    def scoped(self, scope: str) -> Union["Writer", "ScopedWriter"]:
+        """Writer which prefixes keys with scope, e.g. an alias,
+        so that topics of different sources with the same name get their own keys"""
+        return ScopedWriter(self, scope) if scope else self
+
+    def close(self):
+        """Stop threads after they execute queued operations"""
+        for lane in self._lanes:
+            lane.queue.put(None)
+        for lane in self._lanes:
+            lane.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScopedWriter:
+    """Writer of a source, see Writer.scoped()"""
+
+    def __init__(self, writer: Writer, scope: str):
+        self._writer = writer
+        self._scope = scope
+
+    @property
+    def durable(self) -> bool:
+        """Files are flushed to disk before checkpoints are saved"""
+        return self._writer.durable
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self._scope}/{key}"
+
+    async def submit(
+        self, key: Hashable, func: Callable, *args, target: Any = None
+    ) -> None:
+        """See Writer.submit()"""
+        await self._writer.submit(self._key(key), func, *args, target=target)
+
+    async def call(self, key: Hashable, func: Callable, *args) -> Any:
+        """See Writer.call()"""
+        return await self._writer.call(self._key(key), func, *args)
+
+    async def write_file(
+        self, key: Hashable, path: Path, data: bytes, compress: Optional[str] = None
+    ):
+        """See Writer.write_file()"""
+        await self._writer.write_file(self._key(key), path, data, compress)
+
+    async def sync(self, key: Hashable):
+        """See Writer.sync()"""
+        await self._writer.sync(self._key(key))
+
+
+def _write_file(path: Path, data: bytes, compress: Optional[str] = None):
+    if compress:
+        data = compress_bytes(data, compress)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def _fsync(target: Any):
+    """Flush file-like object and its file or a file by path to disk"""
+    if isinstance(target, (str, Path)):
+        fd = os.open(target, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    elif hasattr(target, "sync"):
+        target.sync()
+    else:
+        target.flush()
+        os.fsync(target.fileno())
@@ -4,3 +4,4 @@ from rich.console import Console
 
 error_console = Console(stderr=True, style="bold red")
 console = Console()
+stderr_console = Console(stderr=True)
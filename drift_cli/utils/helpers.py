@@ -1,37 +1,32 @@
 """Helper functions"""
 
 import asyncio
+import math
 import signal
+import struct
+import tempfile
+import threading
 import time
-from asyncio import Semaphore, Queue
+from asyncio import Queue
 from concurrent.futures import Executor
 from datetime import datetime
-from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Iterator, AsyncIterator, Optional
 
-from click import Abort
-from drift_client import DriftClient
+from drift_client import DriftClient, DriftDataPackage
 from drift_client.error import DriftClientError
 from rich.progress import Progress
 
-from drift_cli.config import read_config, Alias
 from drift_cli.utils.consoles import error_console
 from drift_cli.utils.humanize import pretty_size
+from drift_cli.utils.limiter import Limiter, TokenBucket
+from drift_cli.utils import tracing
+from drift_cli.utils.profiling import profiled
+from drift_cli.utils.progress import REFRESH_RATE, SpeedMeter
+from drift_cli.utils.selector import TopicSelector
 
 signal_queue = Queue()
 
 
-def get_alias(config_path: Path, name: str) -> Alias:
-    """Helper method to parse alias from config"""
-    conf = read_config(config_path)
-
-    if name not in conf.aliases:
-        error_console.print(f"Alias '{name}' doesn't exist")
-        raise Abort()
-    alias_: Alias = conf.aliases[name]
-    return alias_
-
-
 def parse_path(path) -> Tuple[str, str]:
     """Parse path ALIAS/RESOURCE"""
     args = path.split("/")
@@ -51,25 +46,308 @@ def to_timestamp(date: str) -> float:
     return datetime.fromisoformat(date.replace("Z", "+00:00")).timestamp()
 
 
+async def walk_ahead(
+    pool: Executor, it: Iterator[DriftDataPackage], prefetch: int
+) -> AsyncIterator[DriftDataPackage]:
+    """Pull packages from a blocking iterator in the pool
+    Args:
+        pool: Executor to run blocking calls
+        it: Iterator of packages, e.g. from client.walk
+        prefetch: Number of packages to read ahead of the consumer,
+            0 - read the next package only when the consumer asks for it
+    Yields:
+        DriftDataPackage: Package from the iterator
+    Raises:
+        DriftClientError: if failed to fetch data
+    """
+    loop = asyncio.get_running_loop()
+
+    def _next():
+        try:
+            return next(it)
+        except StopIteration:
+            return None
+
+    if prefetch <= 0:
+        while True:
+            drift_pkg = await loop.run_in_executor(pool, _next)
+            if drift_pkg is None:
+                return
+            yield drift_pkg
+
+    queue = Queue(maxsize=prefetch)
+
+    async def _fetch():
+        try:
+            while True:
+                drift_pkg = await loop.run_in_executor(pool, _next)
+                await queue.put(drift_pkg)
+                if drift_pkg is None:
+                    return
+        except Exception as err:  # pylint: disable=broad-except
+            await queue.put(err)
+
+    fetcher = asyncio.create_task(_fetch())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        fetcher.cancel()
+
+
+def split_window(start: float, stop: float, shards: int) -> List[Tuple[float, float]]:
+    """Split time window into sub-windows with boundaries on whole seconds,
+    because the storage truncates the query to seconds
+    Args:
+        start: Start timestamp in seconds
+        stop: Stop timestamp in seconds
+        shards: Number of sub-windows
+    Returns:
+        List of (start, stop) tuples, there might be fewer than shards if the window is short
+    """
+    first = math.ceil(start)
+    last = math.floor(stop)
+    shards = max(1, min(shards, last - first + 1))
+    step = (last - first) / shards
+    bounds = sorted({float(first + round(step * i)) for i in range(1, shards)})
+    bounds = [start] + [bound for bound in bounds if start < bound < stop] + [stop]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class _Spool:  # pylint: disable=too-many-instance-attributes
+    """Temporary file with packages of a window which isn't consumed yet
+
+    The file is written and read in the executor, so that the disk I/O
+    doesn't block the event loop.
+    """
+
+    HEADER = struct.Struct("<I")
+
+    def __init__(self, pool: Executor):
+        self._pool = pool
+        self._file = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+        self._lock = threading.Lock()  # write and read can run in different threads
+        self._write_pos = 0
+        self._read_pos = 0
+        self._written = asyncio.Event()
+        self._done = False
+        self._error: Optional[Exception] = None
+
+    def _write(self, pos: int, blob: bytes) -> int:
+        with self._lock:
+            self._file.seek(pos)
+            self._file.write(self.HEADER.pack(len(blob)))
+            self._file.write(blob)
+            return self._file.tell()
+
+    def _read(self, pos: int) -> Tuple[bytes, int]:
+        with self._lock:
+            self._file.seek(pos)
+            (size,) = self.HEADER.unpack(self._file.read(self.HEADER.size))
+            return self._file.read(size), self._file.tell()
+
+    async def push(self, blob: bytes):
+        """Append package blob to the spool"""
+        self._write_pos = await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._write, self._write_pos, blob
+        )
+        self._written.set()
+
+    def finish(self, error: Optional[Exception] = None):
+        """Mark the spool as complete"""
+        self._done = True
+        self._error = error
+        self._written.set()
+
+    async def pop(self) -> Optional[DriftDataPackage]:
+        """Wait for the next package, None if the spool is complete"""
+        while self._read_pos >= self._write_pos:
+            if self._done:
+                if self._error:
+                    raise self._error
+                return None
+            self._written.clear()
+            await self._written.wait()
+
+        blob, self._read_pos = await asyncio.get_running_loop().run_in_executor(
+            self._pool, self._read, self._read_pos
+        )
+        return DriftDataPackage(blob)
+
+    def close(self):
+        """Remove the temporary file"""
+        with self._lock:
+            self._file.close()
+
+
+async def _walk_window(
+    pool: Executor,
+    client: DriftClient,
+    topic: str,
+    window: Tuple[float, float],
+    **kwargs,
+) -> AsyncIterator[DriftDataPackage]:
+    prefetch = kwargs.pop("prefetch", 0)
+    bounded = kwargs.pop("bounded", False)
+    start, stop = window
+    packages = walk_ahead(
+        pool,
+        profiled(client.walk(topic, start=start, stop=stop, **kwargs), "walk", topic),
+        prefetch,
+    )
+    try:
+        async for drift_pkg in packages:
+            if bounded and drift_pkg.package_id / 1000 >= stop:
+                # the package belongs to the next window
+                continue
+            yield drift_pkg
+    finally:
+        await packages.aclose()
+
+
+async def _merge(streams: List[AsyncIterator]) -> AsyncIterator[Tuple[int, object]]:
+    """Merge streams in order of arrival"""
+    queue = Queue(maxsize=len(streams))
+
+    async def _pump(index: int, stream: AsyncIterator):
+        try:
+            async for item in stream:
+                await queue.put((index, item))
+            await queue.put(None)
+        except Exception as err:  # pylint: disable=broad-except
+            await queue.put(err)
+        finally:
+            await stream.aclose()
+
+    tasks = [asyncio.create_task(_pump(i, stream)) for i, stream in enumerate(streams)]
+    running = len(tasks)
+    try:
+        while running > 0:
+            item = await queue.get()
+            if item is None:
+                running -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _merge_ordered(
+    pool: Executor,
+    streams: List[AsyncIterator],
+) -> AsyncIterator[Tuple[int, object]]:
+    """Merge streams one after another, reading the next streams concurrently
+    into temporary files so that the memory usage stays bounded"""
+    spools = [_Spool(pool) for _ in streams[1:]]
+
+    async def _pump(stream: AsyncIterator, spool: _Spool):
+        try:
+            async for drift_pkg in stream:
+                await spool.push(drift_pkg.blob)
+            spool.finish()
+        except Exception as err:  # pylint: disable=broad-except
+            spool.finish(err)
+        finally:
+            await stream.aclose()
+
+    tasks = [
+        asyncio.create_task(_pump(stream, spool))
+        for stream, spool in zip(streams[1:], spools)
+    ]
+    try:
+        async for drift_pkg in streams[0]:
+            yield 0, drift_pkg
+
+        for index, spool in enumerate(spools, start=1):
+            while True:
+                drift_pkg = await spool.pop()
+                if drift_pkg is None:
+                    break
+                yield index, drift_pkg
+    finally:
+        await streams[0].aclose()
+        for task in tasks:
+            task.cancel()
+        for spool in spools:
+            spool.close()
+
+
+async def walk_windows(
+    pool: Executor,
+    client: DriftClient,
+    topic: str,
+    windows: List[Tuple[float, float]],
+    ordered: bool,
+    **kwargs,
+) -> AsyncIterator[Tuple[int, DriftDataPackage]]:
+    """Walk time windows of a topic concurrently
+    Args:
+        pool: Executor to run blocking calls
+        client: Drift client
+        topic: Topic name
+        windows: List of (start, stop) windows, see split_window
+        ordered: Keep timestamp order of packages, otherwise
+            the packages are yielded as soon as they are fetched
+    Keyword Args:
+        prefetch (int): Number of packages to read ahead in each window
+        ttl (int): Time to live for the query
+    Yields:
+        Tuple[int, DriftDataPackage]: Index of window and package from it
+    Raises:
+        DriftClientError: if failed to fetch data
+    """
+    streams = [
+        _walk_window(
+            pool, client, topic, window, bounded=i < len(windows) - 1, **kwargs
+        )
+        for i, window in enumerate(windows)
+    ]
+    if ordered and len(streams) > 1:
+        merged = _merge_ordered(pool, streams)
+    else:
+        merged = _merge(streams)
+
+    try:
+        async for index, drift_pkg in merged:
+            yield index, drift_pkg
+    finally:
+        await merged.aclose()
+
+
 async def read_topic(
     pool: Executor,
     client: DriftClient,
     topic: str,
     progress: Progress,
-    sem: Semaphore,
+    sem: Limiter,
     **kwargs,
-):  # pylint: disable=too-many-locals
+):  # pylint: disable=too-many-locals, too-many-statements
     """Read records from entry and show progress
     Args:
         client: Drift client
         topic: Topic name
         progress (Progress): Progress bar to show progress
-        sem (Semaphore): Semaphore to limit parallelism
+        sem (Limiter): Limiter of parallelism, it gets throughput and errors
     Keyword Args:
         start (Optional[datetime]): Start time point
         stop (Optional[datetime]): Stop time point
         timeout (int): Timeout for read operation
         parallel (int): Number of parallel tasks
+        prefetch (int): Number of packages to read ahead while the consumer
+            exports the previous ones
+        shards (int): Number of time windows to walk concurrently
+        ordered (bool): Keep timestamp order of packages if shards > 1
+        resume_from (int): Skip packages with this ID or older
+        bandwidth (TokenBucket): Bandwidth limit shared by topics
+        source (str): Alias of the client shown with the topic name
     Yields:
         Record: Record from entry
     """
@@ -77,16 +355,47 @@ async def read_topic(
     start = to_timestamp(kwargs["start"])
     stop = to_timestamp(kwargs["stop"])
     parallel = kwargs.pop("parallel", 1)
-
-    last_time = start
-    task = progress.add_task(f"Topic '{topic}' waiting", total=stop - start)
+    prefetch = kwargs.pop("prefetch", 0)
+    resume_from = kwargs.pop("resume_from", 0)
+    start = max(start, resume_from / 1000)
+    windows = split_window(start, stop, kwargs.pop("shards", 1))
+    ordered = kwargs.pop("ordered", True)
+    bandwidth: Optional[TokenBucket] = kwargs.pop("bandwidth", None)
+    source = kwargs.pop("source", "")
+    name = f"{source}/{topic}" if source else topic
+
+    last_time = [window[0] for window in windows]
+    task = progress.add_task(f"Topic '{name}' waiting", total=stop - start)
+    if start >= stop:
+        progress.update(
+            task, description=f"Topic '{name}' is up to date", total=1, completed=True
+        )
+        return
 
     exported_size = 0
     count = 0
-    stats = []
-    speed = 0
+    advance = 0.0
+    updated_at = 0.0
+    meter = SpeedMeter()
+
+    def _update(**kwargs):
+        speed = meter.speed()
+        progress.update(
+            task,
+            description=f"Topic '{name}' "
+            f"(copied {count} packages ({pretty_size(exported_size)}), "
+            f"speed {pretty_size(speed)}/s)",
+            topic=name,
+            packages=count,
+            size=exported_size,
+            speed=speed,
+            **kwargs,
+        )
 
+    tracing.begin("wait", name)
     async with sem:
+        tracing.end("wait", name)
+        tracing.begin("export", name)
         loop = asyncio.get_running_loop()
 
         def stop_signal():
@@ -100,73 +409,68 @@ async def read_topic(
                 "Signals are not supported on this platform. No graceful shutdown possible."
             )
 
-        it = client.walk(topic, start=start, stop=stop, ttl=180 * parallel)
-
-        def _next():
-            try:
-                return next(it)
-            except StopIteration:
-                return None
-
-        while True:
-            try:
-                drift_pkg = await loop.run_in_executor(pool, _next)
-                if drift_pkg is None:
-                    break
-            except DriftClientError as err:
-                progress.update(task, description=f"[ERROR] {err}", refresh=True)
-                return
-
-            if signal_queue.qsize() > 0:
-                # stop signal received
-                progress.update(
-                    task,
-                    description=f"Topic '{topic}' "
-                    f"(copied {count} packages ({pretty_size(exported_size)}), stopped",
-                    refresh=True,
-                )
-                return
-
-            pkg_size = len(drift_pkg.blob)
-            timestamp = float(drift_pkg.package_id) / 1000
-            exported_size += pkg_size
-            stats.append((pkg_size, time.time()))
-            if len(stats) > 10 * parallel:
-                stats.pop(0)
-
-            if len(stats) > 1:
-                speed = sum(s[0] for s in stats) / (stats[-1][1] - stats[0][1])
-
-            count += 1
-            progress.update(
-                task,
-                description=f"Topic '{topic}' "
-                f"(copied {count} packages ({pretty_size(exported_size)}), "
-                f"speed {pretty_size(speed)}/s)",
-                advance=timestamp - last_time,
-                refresh=True,
-            )
-
-            yield drift_pkg, task
-            last_time = timestamp
-
-        progress.update(task, total=1, completed=True)
-
-
-def filter_topics(topics: List[str], names: List[str]) -> List[str]:
-    """Filter entries by names"""
-    if not names or len(names) == 0:
-        return topics
-
-    if len(names) == 1 and names[0] == "":
-        return topics
-
-    def _filter(topic: str) -> bool:
-        for name in names:
-            if name == topic:
-                return True
-            if name.endswith("*") and topic.startswith(name[:-1]):
-                return True
-        return False
-
-    return list(filter(_filter, topics))
+        packages = walk_windows(
+            pool,
+            client,
+            topic,
+            windows,
+            ordered,
+            prefetch=prefetch,
+            ttl=180 * parallel,
+        )
+        try:
+            async for index, drift_pkg in packages:
+                if drift_pkg.package_id <= resume_from:
+                    # the storage query has precision of seconds
+                    continue
+
+                if signal_queue.qsize() > 0:
+                    # stop signal received
+                    progress.update(
+                        task,
+                        description=f"Topic '{name}' "
+                        f"(copied {count} packages ({pretty_size(exported_size)}), stopped",
+                        refresh=True,
+                    )
+                    return
+
+                pkg_size = len(drift_pkg.blob)
+                timestamp = float(drift_pkg.package_id) / 1000
+                exported_size += pkg_size
+                meter.add(pkg_size)
+                sem.add(pkg_size)
+                if bandwidth is not None:
+                    await bandwidth.consume(pkg_size)
+                count += 1
+
+                # formatting and rendering the progress for each small package
+                # takes more time than exporting it
+                advance += timestamp - last_time[index]
+                if time.monotonic() - updated_at >= 1 / REFRESH_RATE:
+                    _update(advance=advance)
+                    advance = 0.0
+                    updated_at = time.monotonic()
+
+                yield drift_pkg, task
+                last_time[index] = timestamp
+        except DriftClientError as err:
+            sem.error()
+            progress.update(task, description=f"[ERROR] {err}", refresh=True)
+            return
+        finally:
+            await packages.aclose()
+            tracing.end("export", name)
+
+        _update(total=1, completed=True)
+
+
+def filter_topics(
+    topics: List[str], names: List[str], exclude: Optional[List[str]] = None
+) -> List[str]:
+    """Filter entries by names, globs or regular expressions, see TopicSelector
+    Args:
+        topics: Topic names
+        names: Patterns of topics to select, empty to select all of them
+        exclude: Patterns of topics to skip
+    """
+    return TopicSelector(names or [], exclude or []).select(topics)
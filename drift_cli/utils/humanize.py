@@ -87,3 +87,19 @@ def parse_ci_size(size: Optional[str]) -> Optional[int]:
         return int(size.replace("B", ""))
 
     raise ValueError(f"Failed to parse {size}")
+
+
+INTERVAL_UNITS = {"ms": 0.001, "s": 1, "m": MINUTE, "h": HOUR, "d": DAY}
+
+
+def parse_time_interval(interval: Optional[str]) -> Optional[float]:
+    """Parse time interval like 500ms, 1s, 5m, 1h or 1d and return seconds"""
+    if interval is None:
+        return None
+
+    interval = interval.strip().lower()
+    for unit in sorted(INTERVAL_UNITS, key=len, reverse=True):
+        if interval.endswith(unit):
+            return float(interval[: -len(unit)]) * INTERVAL_UNITS[unit]
+
+    raise ValueError(f"Failed to parse {interval}")
@@ -0,0 +1,232 @@
+"""Limit number of topics exported concurrently and their bandwidth"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+AUTO = "auto"
+AUTO_MAX_PARALLEL = 32
+
+
+class Limiter:
+    """Limit number of concurrent tasks like asyncio.Semaphore,
+    but the limit can be changed at runtime
+
+    If the limit decreases, the active tasks aren't interrupted,
+    new tasks wait until the number of active ones drops below the limit.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximal number of active tasks
+        """
+        self._limit = limit
+        self.maximum = limit
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Maximal number of active tasks"""
+        return self._limit
+
+    @property
+    def active(self) -> int:
+        """Number of active tasks"""
+        return self._active
+
+    def _set_limit(self, limit: int):
+        self._limit = limit
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._active < self._limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was given, but the task didn't get it
+                self.release()
+            raise
+
+    def release(self):
+        """Free a slot"""
+        self._active -= 1
+        self._wake()
+
+    def add(self, size: int):
+        """Report transferred bytes, a fixed limit ignores them"""
+
+    def error(self):
+        """Report failed task, a fixed limit ignores it"""
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class AdaptiveLimiter(Limiter):  # pylint: disable=too-many-instance-attributes
+    """Limit which follows throughput and errors of the tasks with AIMD
+
+    Each interval the limiter compares the throughput with the previous interval.
+    If all the slots were busy and the throughput didn't drop, it adds a slot
+    (additive increase). If a task failed or the throughput dropped
+    with all the slots busy, the limit is multiplied by the backoff factor
+    (multiplicative decrease).
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = AUTO_MAX_PARALLEL,
+        interval: float = 5.0,
+        backoff: float = 0.5,
+        tolerance: float = 0.1,
+        on_update: Optional[Callable[["AdaptiveLimiter"], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            initial: Limit at the start
+            minimum: Minimal limit
+            maximum: Maximal limit
+            interval: Time between adjustments in seconds
+            backoff: Factor of multiplicative decrease
+            tolerance: Relative drop of throughput which isn't taken as congestion
+            on_update: Called after each adjustment
+            clock: Source of time
+        """
+        super().__init__(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.throughput = 0.0
+        self._interval = interval
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._on_update = on_update
+        self._clock = clock
+        self._checked_at = clock()
+        self._size = 0
+        self._errors = 0
+        self._saturated = False
+
+    async def acquire(self):
+        if self._active + 1 >= self._limit:
+            self._saturated = True
+        await super().acquire()
+        self._tick()
+
+    def add(self, size: int):
+        self._size += size
+        self._tick()
+
+    def error(self):
+        self._errors += 1
+        self._tick()
+
+    def _tick(self):
+        now = self._clock()
+        elapsed = now - self._checked_at
+        if elapsed < self._interval:
+            return
+
+        throughput = self._size / elapsed
+        saturated = self._saturated or self._active >= self._limit
+        limit = self._limit
+        if self._errors > 0 or (
+            saturated and throughput < self.throughput * (1 - self._tolerance)
+        ):
+            limit = max(self.minimum, int(limit * self._backoff))
+        elif saturated:
+            limit = min(self.maximum, limit + 1)
+
+        self.throughput = throughput
+        self._checked_at = now
+        self._size = 0
+        self._errors = 0
+        self._saturated = False
+        self._set_limit(limit)
+        if self._on_update is not None:
+            self._on_update(self)
+
+
+class TokenBucket:
+    """Token bucket which limits total throughput of several consumers
+
+    Tokens are bytes, they are added at the rate up to the burst size.
+    A consumer takes the tokens of a package, even if there are not enough of them,
+    and waits until the debt is paid off. So a large package doesn't block
+    the bucket forever, and idle consumers leave their share to busy ones.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate: Bytes per second
+            burst: Maximal number of tokens, the rate by default
+            clock: Source of time
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self._rate = rate
+        self._burst = float(rate if burst is None else burst)
+        self._clock = clock
+        self._tokens = self._burst
+        self._updated = clock()
+
+    @property
+    def rate(self) -> float:
+        """Bytes per second"""
+        return self._rate
+
+    def reserve(self, size: int) -> float:
+        """Take tokens and return time in seconds to wait for them"""
+        now = self._clock()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+        self._tokens -= size
+        return max(0.0, -self._tokens / self._rate)
+
+    async def consume(self, size: int):
+        """Wait until size bytes can be transferred"""
+        delay = self.reserve(size)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def make_limiter(parallel, maximum: int = AUTO_MAX_PARALLEL, **kwargs) -> Limiter:
+    """Create limiter for --parallel option
+    Args:
+        parallel: Number of concurrent tasks or "auto"
+        maximum: Maximal limit in auto mode
+    Keyword Args:
+        on_update: Called after each adjustment in auto mode
+    """
+    if parallel == AUTO:
+        return AdaptiveLimiter(maximum=maximum, **kwargs)
+    return Limiter(int(parallel))
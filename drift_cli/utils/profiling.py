@@ -0,0 +1,152 @@
+"""Per-stage profiling of export"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from drift_cli.utils import tracing
+
+
+class Profiler:
+    """Collect wall and CPU time of export stages for each topic
+
+    A stage is a synchronous piece of work, e.g. pulling a package from client.walk
+    or writing it to a file. CPU time is measured for the thread which runs it.
+    Stages are measured with stage() of the module once the profiler is set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], List[float]] = {}
+        self._started = time.perf_counter()
+
+    def record(self, name: str, topic: str, wall: float, cpu: float):
+        """Add time of a stage measured somewhere else, e.g. in a worker process"""
+        with self._lock:
+            stats = self._stats.setdefault((topic, name), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu
+
+    def report(self) -> Dict[str, Any]:
+        """Collected statistics"""
+        with self._lock:
+            stages = [
+                {
+                    "topic": topic,
+                    "stage": name,
+                    "calls": calls,
+                    "wall": wall,
+                    "cpu": cpu,
+                }
+                for (topic, name), (calls, wall, cpu) in sorted(self._stats.items())
+            ]
+        return {"elapsed": time.perf_counter() - self._started, "stages": stages}
+
+    def print_summary(self, console: Console):
+        """Print table of stages"""
+        report = self.report()
+        table = Table(title=f"Profile of {report['elapsed']:.3f} s")
+        for column in ("Topic", "Stage", "Calls", "Wall, s", "CPU, s"):
+            table.add_column(column, justify="left" if "," not in column else "right")
+        for stats in report["stages"]:
+            table.add_row(
+                stats["topic"],
+                stats["stage"],
+                str(stats["calls"]),
+                f"{stats['wall']:.3f}",
+                f"{stats['cpu']:.3f}",
+            )
+        console.print(table)
+
+    def save(self, path: Path):
+        """Write report as JSON"""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=2)
+
+
+_PROFILER: Optional[Profiler] = None
+_NO_STAGE = nullcontext()
+
+
+def set_profiler(profiler: Optional[Profiler]):
+    """Enable profiling of stages, None disables it"""
+    global _PROFILER  # pylint: disable=global-statement
+    _PROFILER = profiler
+
+
+def _enabled() -> bool:
+    return _PROFILER is not None or tracing.TRACER is not None
+
+
+@contextmanager
+def _stage(name: str, topic: str):
+    begin, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if _PROFILER is not None:
+            _PROFILER.record(name, topic, end - begin, time.thread_time() - cpu)
+        if tracing.TRACER is not None:
+            tracing.TRACER.complete(name, topic, begin * 1e6, end * 1e6)
+
+
+def stage(name: str, topic: str = ""):
+    """Context manager which measures a stage of export
+    if profiling or tracing is enabled"""
+    if not _enabled():
+        return _NO_STAGE
+    return _stage(name, topic)
+
+
+def record(  # pylint: disable=too-many-arguments
+    name: str,
+    topic: str,
+    wall: float,
+    cpu: float,
+    started: Optional[float] = None,
+    pid: Optional[int] = None,
+):
+    """Add time of a stage measured somewhere else, e.g. in a worker process
+    Args:
+        name: Name of stage
+        topic: Topic name
+        wall: Wall time in seconds
+        cpu: CPU time in seconds
+        started: perf_counter() at the begin of the stage, needed for tracing
+        pid: Process which ran the stage
+    """
+    if _PROFILER is not None:
+        _PROFILER.record(name, topic, wall, cpu)
+    if tracing.TRACER is not None and started is not None:
+        tracing.TRACER.complete(
+            name, topic, started * 1e6, (started + wall) * 1e6, pid=pid, tid=pid
+        )
+
+
+def profiled(it: Iterator, name: str, topic: str) -> Iterator:
+    """Measure each next() of iterator as a stage if profiling or tracing is enabled"""
+    if not _enabled():
+        return it
+
+    def _wrap():
+        try:
+            while True:
+                with stage(name, topic):
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            if hasattr(it, "close"):
+                it.close()
+
+    return _wrap()
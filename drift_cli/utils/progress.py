@@ -0,0 +1,172 @@
+"""Progress reporting"""
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+from rich.console import Console
+from rich.progress import Progress
+
+from drift_cli.utils.consoles import stderr_console
+
+REFRESH_RATE = 4  # updates per second
+PROGRESS_MODES = ("rich", "plain", "json", "none")
+
+
+class SpeedMeter:
+    """Throughput over a sliding time window
+
+    The window is split into buckets. A sample is added to the current bucket,
+    and the buckets which slide out of the window are subtracted from the total,
+    so both add() and speed() take constant time.
+    """
+
+    def __init__(
+        self,
+        window: float = 5.0,
+        buckets: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            window: Length of the window in seconds
+            buckets: Number of buckets in the window
+            clock: Source of time
+        """
+        self._window = window
+        self._width = window / buckets
+        self._buckets = [0] * buckets
+        self._clock = clock
+        self._total = 0
+        self._current: Optional[int] = None
+        self._started = 0.0
+
+    def _slide(self, now: float):
+        number = int(now // self._width)
+        if self._current is None:
+            self._current = number
+            self._started = now
+            return
+
+        for step in range(1, min(number - self._current, len(self._buckets)) + 1):
+            index = (self._current + step) % len(self._buckets)
+            self._total -= self._buckets[index]
+            self._buckets[index] = 0
+        self._current = max(self._current, number)
+
+    def add(self, size: int):
+        """Add number of transferred bytes"""
+        self._slide(self._clock())
+        self._buckets[self._current % len(self._buckets)] += size
+        self._total += size
+
+    def speed(self) -> float:
+        """Bytes per second in the window"""
+        now = self._clock()
+        self._slide(now)
+        elapsed = min(self._window, now - self._started)
+        return self._total / elapsed if elapsed > 0 else 0.0
+
+
+class _Task:  # pylint: disable=too-few-public-methods
+    def __init__(self, description: str, total: float):
+        self.description = description
+        self.total = total
+        self.completed = 0.0
+        self.fields: Dict[str, Any] = {}
+        self.printed_at = float("-inf")
+
+
+class LineProgress:
+    """Progress for non-interactive runs, e.g. cron jobs
+
+    It has the same interface as rich.progress.Progress, which the exporters use,
+    but prints task updates as lines of text or JSON objects, not more often than
+    once in the interval. Updates which don't advance a task, e.g. errors, are
+    printed immediately.
+    """
+
+    def __init__(
+        self,
+        fmt: str = "plain",
+        interval: float = 10.0,
+        console: Optional[Console] = None,
+    ):
+        """
+        Args:
+            fmt: plain - text lines, json - JSON lines, none - only messages
+            interval: Minimal interval between updates of a task in seconds
+            console: Console to print to
+        """
+        self.console = console or Console(highlight=False, soft_wrap=True)
+        self._fmt = fmt
+        self._interval = interval
+        self._tasks: Dict[int, _Task] = {}
+
+    def add_task(self, description: str, total: float = 100.0, **fields) -> int:
+        """Add task"""
+        task_id = len(self._tasks)
+        self._tasks[task_id] = _Task(description, total)
+        self._tasks[task_id].fields.update(fields)
+        return task_id
+
+    def update(  # pylint: disable=too-many-arguments
+        self,
+        task_id: int,
+        total: Optional[float] = None,
+        completed: Optional[float] = None,
+        advance: Optional[float] = None,
+        description: Optional[str] = None,
+        refresh: bool = False,
+        **fields,
+    ):
+        """Update task and print it if it's time"""
+        task = self._tasks[task_id]
+        if total is not None:
+            task.total = total
+        if completed is not None:
+            task.completed = float(completed)
+        if advance is not None:
+            task.completed += advance
+        if description is not None:
+            task.description = description
+        task.fields.update(fields)
+
+        now = time.monotonic()
+        if refresh or advance is None or now - task.printed_at >= self._interval:
+            task.printed_at = now
+            self._print(task)
+
+    def _print(self, task: _Task):
+        if self._fmt == "plain":
+            self.console.out(task.description, highlight=False)
+        elif self._fmt == "json":
+            line = {
+                "description": task.description,
+                "completed": task.completed,
+                "total": task.total,
+            }
+            line.update(task.fields)
+            self.console.out(json.dumps(line), highlight=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def make_progress(mode: str = "rich", stderr: bool = False):
+    """Create progress reporter
+    Args:
+        mode: rich - progress bars, plain - text lines, json - JSON lines,
+            none - only messages
+        stderr: Print to stderr, e.g. if the data goes to stdout
+    """
+    if mode == "rich":
+        return Progress(
+            refresh_per_second=REFRESH_RATE,
+            console=stderr_console if stderr else None,
+        )
+    console = Console(stderr=True, highlight=False, soft_wrap=True) if stderr else None
+    return LineProgress(mode, console=console)
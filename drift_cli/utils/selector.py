@@ -0,0 +1,105 @@
+"""Select topics by names, globs and regular expressions"""
+
+import fnmatch
+import re
+from typing import Dict, Iterable, List, Optional, Pattern
+
+REGEX_PREFIX = "re:"
+_MAGIC = re.compile(r"[*?\[]")
+
+
+class _Bucket:  # pylint: disable=too-few-public-methods
+    """Patterns which start with the same literal prefix"""
+
+    def __init__(self):
+        self.any = False  # prefix* matches any suffix
+        self.rests: List[str] = []
+        self.regex: Optional[Pattern] = None
+
+
+class _Matcher:
+    """Patterns compiled into a set of names and buckets indexed by literal prefix
+
+    A topic is checked against the set and the buckets of its prefixes only,
+    so it takes as many lookups as there are distinct lengths of prefixes,
+    not as many as there are patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._names = set()
+        buckets: Dict[str, _Bucket] = {}
+        for pattern in patterns:
+            if pattern.startswith(REGEX_PREFIX):
+                regex = pattern[len(REGEX_PREFIX) :]
+                re.compile(regex)  # raise re.error with the pattern in the message
+                buckets.setdefault("", _Bucket()).rests.append(f"(?:{regex})\\Z")
+                continue
+
+            magic = _MAGIC.search(pattern)
+            if magic is None:
+                self._names.add(pattern)
+                continue
+
+            prefix, rest = pattern[: magic.start()], pattern[magic.start() :]
+            bucket = buckets.setdefault(prefix, _Bucket())
+            if rest == "*":
+                bucket.any = True
+            else:
+                bucket.rests.append(fnmatch.translate(rest))
+
+        for bucket in buckets.values():
+            if bucket.rests and not bucket.any:
+                bucket.regex = re.compile("|".join(bucket.rests))
+        self._buckets = {
+            prefix: bucket
+            for prefix, bucket in buckets.items()
+            if bucket.any or bucket.regex
+        }
+        self._lengths = sorted({len(prefix) for prefix in self._buckets})
+
+    def __bool__(self) -> bool:
+        return bool(self._names or self._buckets)
+
+    def match(self, topic: str) -> bool:
+        """Check if any pattern matches the whole topic name"""
+        if topic in self._names:
+            return True
+        for length in self._lengths:
+            if length > len(topic):
+                break
+            bucket = self._buckets.get(topic[:length])
+            if bucket is not None and (
+                bucket.any or bucket.regex.match(topic, length) is not None
+            ):
+                return True
+        return False
+
+
+class TopicSelector:
+    """Select topics which match any include pattern and no exclude pattern
+
+    A pattern is an exact name, a glob with *, ? and [...] or a regular expression
+    with "re:" prefix, e.g. "re:sensor-\\d+". Globs and regular expressions must
+    match the whole topic name. No include patterns select all topics.
+    """
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        """
+        Args:
+            include: Patterns of topics to select
+            exclude: Patterns of topics to skip
+        Raises:
+            re.error: if a regular expression is invalid
+        """
+        self._include = _Matcher(pattern for pattern in include if pattern)
+        self._exclude = _Matcher(pattern for pattern in exclude if pattern)
+
+    def match(self, topic: str) -> bool:
+        """Check if topic is selected"""
+        if self._include and not self._include.match(topic):
+            return False
+        return not self._exclude.match(topic)
+
+    def select(self, topics: Iterable[str]) -> List[str]:
+        """Selected topics in the original order"""
+        return [topic for topic in topics if self.match(topic)]
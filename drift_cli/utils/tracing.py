@@ -0,0 +1,132 @@
+"""Trace of export in Chrome trace event format"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _now() -> float:
+    """Timestamp in microseconds, perf_counter is CLOCK_MONOTONIC on Linux,
+    so timestamps of worker processes can be compared"""
+    return time.perf_counter() * 1e6
+
+
+class Tracer:
+    """Record events of export which can be opened in chrome://tracing or Perfetto
+
+    Synchronous stages are complete events on the thread which runs them.
+    Waits and activity of topics in the event loop are async events,
+    with a track for each topic.
+    """
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[Tuple[int, int], str] = {}
+        self._topics: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _thread(self, pid: int, tid: int, name: str):
+        if (pid, tid) not in self._threads:
+            with self._lock:
+                self._threads[(pid, tid)] = name
+
+    def complete(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        topic: str,
+        started: float,
+        stopped: float,
+        pid: Optional[int] = None,
+        tid: Optional[int] = None,
+    ):
+        """Add complete event of a stage
+        Args:
+            name: Name of stage
+            topic: Topic name
+            started: Begin of stage in microseconds
+            stopped: End of stage in microseconds
+            pid: Process ID, the current process by default
+            tid: Thread ID, the current thread by default
+        """
+        if pid is None:
+            pid, tid = os.getpid(), threading.get_ident()
+            self._thread(pid, tid, threading.current_thread().name)
+        else:
+            self._thread(pid, tid, f"worker {pid}")
+        self._events.append(
+            {
+                "name": name,
+                "cat": "stage",
+                "ph": "X",
+                "ts": started,
+                "dur": stopped - started,
+                "pid": pid,
+                "tid": tid,
+                "args": {"topic": topic},
+            }
+        )
+
+    def _async(self, phase: str, name: str, topic: str):
+        with self._lock:
+            track = self._topics.setdefault(topic, len(self._topics) + 1)
+        self._events.append(
+            {
+                "name": name,
+                "cat": "topic",
+                "ph": phase,
+                "id": track,
+                "ts": _now(),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"topic": topic},
+            }
+        )
+
+    def begin(self, name: str, topic: str):
+        """Begin async event of topic, e.g. waiting for semaphore"""
+        self._async("b", name, topic)
+
+    def end(self, name: str, topic: str):
+        """End async event of topic"""
+        self._async("e", name, topic)
+
+    def save(self, path: Path):
+        """Write trace as JSON"""
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for (pid, tid), name in self._threads.items()
+        ]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"traceEvents": metadata + self._events, "displayTimeUnit": "ms"}, file
+            )
+
+
+TRACER: Optional[Tracer] = None
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """Enable tracing, None disables it"""
+    global TRACER  # pylint: disable=global-statement
+    TRACER = tracer
+
+
+def begin(name: str, topic: str):
+    """Begin async event of topic if tracing is enabled"""
+    if TRACER is not None:
+        TRACER.begin(name, topic)
+
+
+def end(name: str, topic: str):
+    """End async event of topic if tracing is enabled"""
+    if TRACER is not None:
+        TRACER.end(name, topic)
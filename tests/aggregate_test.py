@@ -0,0 +1,106 @@
+"""Unit tests for window aggregation"""
+
+import json
+
+import numpy as np
+import pytest
+
+from drift_cli.export_impl.aggregate import WindowAggregator, parse_stats
+
+
+def _reference(samples: np.ndarray, times: np.ndarray, period: int) -> np.ndarray:
+    windows = (times - times[0]) // period
+    rows = []
+    for window in range(int(windows[-1]) + 1):
+        values = samples[windows == window]
+        if len(values) == 0:
+            rows.append([np.nan] * 4)
+            continue
+        rows.append(
+            [
+                values.min(),
+                values.max(),
+                values.mean(),
+                np.sqrt(np.mean(values * values)),
+            ]
+        )
+    return np.array(rows)
+
+
+def _blocks(count: int, size: int, step: int):
+    rng = np.random.default_rng(42)
+    for i in range(count):
+        yield rng.normal(size=size), i * step, (i + 1) * step
+
+
+def test__aggregate_blocks():
+    """Should compute statistics of windows which span several blocks"""
+    aggregator = WindowAggregator(700, ["min", "max", "mean", "rms"])
+    blocks = list(_blocks(10, 10, 1000))
+    rows = [aggregator.add(*block) for block in blocks] + [aggregator.flush()]
+
+    samples = np.concatenate([block[0] for block in blocks])
+    times = np.arange(len(samples)) * 100
+    rows = np.vstack(rows)
+    assert np.allclose(rows[:, 1:], _reference(samples, times, 700))
+    assert rows[:, 0].tolist() == [window * 700 for window in range(len(rows))]
+
+
+def test__aggregate_columns():
+    """Should keep columns of samples, grouped by statistics, after the timestamp"""
+    aggregator = WindowAggregator(1000, ["min", "max"])
+    block = np.array([[1.0, 10.0], [2.0, 20.0], [3.0, 30.0], [4.0, 40.0]])
+
+    assert aggregator.add(block, 5000, 7000).tolist() == [
+        [5000.0, 1.0, 10.0, 2.0, 20.0]
+    ]
+    assert aggregator.flush().tolist() == [[6000.0, 3.0, 30.0, 4.0, 40.0]]
+
+
+def test__aggregate_gaps():
+    """Should fill statistics of windows without samples with NaN"""
+    aggregator = WindowAggregator(100, ["mean"])
+    rows = aggregator.add(np.array([1.0, 2.0, 3.0]), 0, 900)
+
+    assert rows.shape == (4, 2)
+    assert rows[:, 0].tolist() == [0, 100, 200, 300]
+    assert rows[0, 1] == 1.0
+    assert np.isnan(rows[1:3, 1]).all()
+    assert rows[3, 1] == 2.0
+
+    rows = aggregator.flush()
+    assert rows.shape == (3, 2)
+    assert rows[:, 0].tolist() == [400, 500, 600]
+    assert np.isnan(rows[:2, 1]).all()
+    assert rows[2, 1] == 3.0
+
+
+def test__aggregate_std():
+    """Should compute standard deviation"""
+    aggregator = WindowAggregator(1000, ["std"])
+    aggregator.add(np.array([1.0, 3.0, 1.0, 3.0]), 0, 1000)
+    assert aggregator.flush()[0, 1] == pytest.approx(1.0)
+
+
+def test__aggregate_state():
+    """Should continue aggregation from the state"""
+    blocks = list(_blocks(6, 8, 1000))
+    full = WindowAggregator(300, ["min", "max", "mean"])
+    expected = np.vstack([full.add(*block) for block in blocks] + [full.flush()])
+
+    first = WindowAggregator(300, ["min", "max", "mean"])
+    rows = [first.add(*block) for block in blocks[:3]]
+    state = json.loads(json.dumps(first.state()))
+
+    second = WindowAggregator(300, ["min", "max", "mean"], state=state)
+    rows += [second.add(*block) for block in blocks[3:]] + [second.flush()]
+    assert np.allclose(np.vstack(rows), expected)
+
+
+def test__parse_stats():
+    """Should parse list of statistics"""
+    assert parse_stats("min, MAX,rms") == ["min", "max", "rms"]
+    with pytest.raises(ValueError, match="Unknown statistics 'median'"):
+        parse_stats("min,median")
+    with pytest.raises(ValueError):
+        parse_stats("")
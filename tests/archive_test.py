@@ -0,0 +1,78 @@
+"""Unit tests for archive of packages"""
+
+import shutil
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+
+from drift_cli.export_impl.archive import ArchiveReader, ArchiveWriter, is_archive
+
+
+@pytest.fixture(name="archive_path")
+def _make_archive_path() -> Path:
+    path = Path(gettempdir()) / "drift_archive"
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def test__write_read(archive_path):
+    """Should read packages back by ID"""
+    writer = ArchiveWriter(archive_path)
+    writer.append(2, b"second")
+    writer.append(1, b"first")
+    writer.close()
+
+    assert is_archive(archive_path)
+    reader = ArchiveReader(archive_path)
+    assert reader.ids() == [1, 2]
+    assert reader.read(1) == b"first"
+    assert reader.read(2) == b"second"
+    assert list(reader) == [(1, b"first"), (2, b"second")]
+
+
+def test__segments(archive_path):
+    """Should start a new segment when the current one is full"""
+    writer = ArchiveWriter(archive_path, segment_size=10)
+    for package_id in range(5):
+        writer.append(package_id, bytes([package_id]) * 6)
+    writer.close()
+
+    assert len(list(archive_path.glob("segment_*.dpa"))) == 5
+    reader = ArchiveReader(archive_path)
+    assert reader.read(3) == b"\x03" * 6
+
+
+def test__append_to_existing(archive_path):
+    """Should continue existing archive"""
+    writer = ArchiveWriter(archive_path)
+    writer.append(1, b"first")
+    writer.close()
+
+    writer = ArchiveWriter(archive_path, append=True)
+    writer.append(2, b"second")
+    writer.close()
+
+    assert list(ArchiveReader(archive_path)) == [(1, b"first"), (2, b"second")]
+
+
+def test__overwrite_existing(archive_path):
+    """Should remove index and segments of existing archive if not appending"""
+    writer = ArchiveWriter(archive_path, segment_size=10)
+    for package_id in range(3):
+        writer.append(package_id, bytes([package_id]) * 6)
+    writer.close()
+
+    writer = ArchiveWriter(archive_path)
+    writer.append(5, b"fifth")
+    writer.close()
+
+    assert len(list(archive_path.glob("segment_*.dpa"))) == 1
+    assert list(ArchiveReader(archive_path)) == [(5, b"fifth")]
+
+
+def test__read_not_existing(archive_path):
+    """Should raise error if package is not in archive"""
+    ArchiveWriter(archive_path).close()
+    with pytest.raises(RuntimeError, match="Package 1 not found"):
+        ArchiveReader(archive_path).read(1)
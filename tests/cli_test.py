@@ -0,0 +1,51 @@
+"""Tests of CLI startup"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["numpy", "wavelet_buffer", "drift_client", "google.protobuf"]
+STARTUP_BUDGET = 1.0  # seconds to import drift_cli.cli, it takes ~0.2 s
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from drift_cli.cli import cli
+elapsed = time.perf_counter() - started
+try:
+    cli(sys.argv[1:], obj={})
+except SystemExit:
+    pass
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _run(*args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *args],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("args", [["alias", "ls"], ["--version"]])
+def test__no_heavy_imports(args, conf):
+    """Should not import dependencies of export for alias commands"""
+    modules = _run("-c", str(conf), *args)["modules"]
+    assert [name for name in HEAVY_MODULES if name in modules] == []
+
+
+def test__startup_time(conf):
+    """Should import CLI fast"""
+    _run("-c", str(conf), "alias", "ls")  # warm up bytecode cache
+    assert _run("-c", str(conf), "alias", "ls")["elapsed"] < STARTUP_BUDGET
+
+
+def test__export_imported_on_call(conf):
+    """Should import export commands when they are called"""
+    modules = _run("-c", str(conf), "export", "--help")["modules"]
+    assert "drift_cli.export" in modules
@@ -0,0 +1,85 @@
+"""Unit tests for streaming compression"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+
+from drift_cli.export_impl.compression import (
+    COMPRESSIONS,
+    CompressedFile,
+    compress_bytes,
+    decompress_bytes,
+    open_output,
+    suffix,
+)
+
+OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+@pytest.fixture(name="path")
+def _make_path() -> Path:
+    path = Path(gettempdir()) / "drift_compressed"
+    yield path
+    path.unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("compress", COMPRESSIONS)
+def test__compress_bytes(compress):
+    """Should compress data which the standard module decompresses"""
+    data = b"1.00000,2.00000\n" * 1000
+    compressed = compress_bytes(data, compress)
+    assert len(compressed) < len(data) / 10
+    assert decompress_bytes(compressed, compress) == data
+    assert OPENERS[compress](io.BytesIO(compressed)).read() == data
+
+
+def test__suffix():
+    """Should return suffix of compression"""
+    assert suffix(None) == ""
+    assert suffix("gzip") == ".gz"
+    assert suffix("xz") == ".xz"
+
+
+def test__unknown_compression(path):
+    """Should check compression before the file is created"""
+    with pytest.raises(ValueError, match="Unknown compression 'zip'"):
+        CompressedFile(path, "zip")
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("compress", COMPRESSIONS)
+def test__streams_at_flush(path, compress):
+    """Should keep the file valid at its flushed size,
+    so that a checkpoint can truncate it and append new streams"""
+    file = CompressedFile(path, compress)
+    file.write(b"first\n")
+    file.flush()
+    size = file.tell()
+    file.write(b"lost\n")
+    file.close()
+
+    os.truncate(path, size)
+    assert decompress_bytes(path.read_bytes(), compress) == b"first\n"
+
+    with CompressedFile(path, compress, append=True) as file:
+        file.write(b"second\n")
+    with OPENERS[compress](path) as file:
+        assert file.read() == b"first\nsecond\n"
+
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test__open_output_text(path, compress):
+    """Should open text file, compressed or not"""
+    with open_output(path, compress, text=True) as file:
+        file.write("line\n")
+    with open_output(path, compress, append=True, text=True) as file:
+        file.write("next\n")
+
+    data = path.read_bytes()
+    assert (decompress_bytes(data, compress) if compress else data) == b"line\nnext\n"
@@ -0,0 +1,79 @@
+"""Unit tests for CSV writer"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from tempfile import gettempdir
+
+import numpy as np
+import pytest
+
+from drift_cli.export_impl.csv_writer import TimeseriesCsvWriter, summary_sidecar
+
+
+@pytest.fixture(name="csv_path")
+def _make_csv_path() -> Path:
+    path = Path(gettempdir()) / "drift_writer.csv"
+    yield path
+    path.unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("shape", [(100,), (100, 3)])
+def test__write_as_savetxt(csv_path, shape):
+    """Should write the same rows as np.savetxt"""
+    blocks = [np.random.rand(*shape).astype(np.float32) for _ in range(3)]
+    expected = io.StringIO()
+    for block in blocks:
+        np.savetxt(expected, block, delimiter=",", fmt="%.5f")
+
+    writer = TimeseriesCsvWriter(csv_path, chunk_size=1024)
+    for block in blocks:
+        writer.write(block)
+    writer.close("topic", 3, 1, 2)
+
+    with open(csv_path, encoding="utf-8") as file:
+        assert file.readline().strip() == "topic,3,1,2"
+        assert file.read() == expected.getvalue()
+
+
+def test__precision(csv_path):
+    """Should format values with given precision"""
+    writer = TimeseriesCsvWriter(csv_path, precision=2)
+    writer.write(np.array([0.123, 1.0]))
+    writer.close("topic", 1, 1, 2)
+
+    with open(csv_path, encoding="utf-8") as file:
+        assert file.read().split("\n")[1:] == ["0.12", "1.00", ""]
+
+
+def test__compressed(csv_path):
+    """Should compress the file and write its summary to a sidecar"""
+    path = csv_path.with_suffix(".csv.gz")
+    try:
+        writer = TimeseriesCsvWriter(path, precision=1, compress="gzip")
+        writer.write(np.array([1.0, 2.0]))
+        writer.flush()
+        writer.write(np.array([3.0]))
+        writer.close("topic", 2, 1, 3)
+
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            assert file.read() == "1.0\n2.0\n3.0\n"
+        with open(summary_sidecar(path), encoding="utf-8") as sidecar:
+            assert json.load(sidecar) == {
+                "topic": "topic",
+                "count": 2,
+                "first_timestamp": 1,
+                "last_timestamp": 3,
+            }
+        assert summary_sidecar(path) == csv_path.with_suffix(".csv.json")
+    finally:
+        path.unlink(missing_ok=True)
+        summary_sidecar(path).unlink(missing_ok=True)
+
+
+def test__too_long_summary(csv_path):
+    """Should not overwrite data with too long summary"""
+    writer = TimeseriesCsvWriter(csv_path)
+    with pytest.raises(ValueError):
+        writer.close("x" * 257, 1, 1, 2)
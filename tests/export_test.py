@@ -1,17 +1,24 @@
 """Export data from SRC bucket to DST bucket"""
 
+import bz2
+import gzip
+import io
 import json
+import lzma
 
-# pylint: disable=too-many-arguments
+# pylint: disable=too-many-arguments, too-many-lines
 import shutil
+import threading
 from pathlib import Path
 from tempfile import gettempdir
+from types import SimpleNamespace
 from typing import List
 
 import numpy as np
 import pytest
 from drift_bytes import OutputBuffer, Variant
 from drift_client import DriftClient, DriftDataPackage
+from drift_client.error import DriftClientError
 from drift_protocol.common import (
     DriftPackage,
     DataPayload,
@@ -22,6 +29,17 @@ from google.protobuf.any_pb2 import Any  # pylint: disable=no-name-in-module
 from wavelet_buffer import WaveletBuffer, WaveletType, denoise
 from wavelet_buffer.img import WaveletImage, codecs
 
+from drift_cli.export_impl.archive import INDEX_RECORD, ArchiveReader
+from drift_cli.export_impl.checkpoint import TopicCheckpoint
+from drift_cli.export_impl.compression import open_output
+from drift_cli.export_impl.raw import (
+    extract_jpeg_images_from_buffer,
+    extract_jpeg_pyramid,
+)
+from drift_cli.export_impl.stream import read_frames
+from drift_cli.utils.helpers import _Spool
+from drift_cli.utils.limiter import TokenBucket
+
 
 @pytest.fixture(name="topics")
 def _make_topics():
@@ -69,6 +87,37 @@ def _make_packages():
     return packages
 
 
+@pytest.fixture(name="day_timeseries")
+def _make_day_timeseries() -> List[DriftDataPackage]:
+    """Make a package every 4 hours of 2022-01-01 with value of its index"""
+    packages = []
+    step = 4 * 3600 * 1000
+    for i in range(6):
+        buffer = WaveletBuffer(
+            signal_shape=[4],
+            signal_number=1,
+            decomposition_steps=1,
+            wavelet_type=WaveletType.DB1,
+        )
+        buffer.decompose(np.full(4, i, dtype=np.float32), denoise.Null())
+
+        payload = DataPayload()
+        payload.data = buffer.serialize(compression_level=0)
+        msg = Any()
+        msg.Pack(payload)
+
+        pkg = DriftPackage()
+        pkg.id = 1640995200_000 + i * step
+        pkg.status = 0
+        pkg.data.append(msg)
+        pkg.meta.type = MetaInfo.TIME_SERIES
+        pkg.meta.time_series_info.start_timestamp.FromMilliseconds(pkg.id)
+        pkg.meta.time_series_info.stop_timestamp.FromMilliseconds(pkg.id + step)
+
+        packages.append(DriftDataPackage(pkg.SerializeToString()))
+    return packages
+
+
 @pytest.fixture(name="image_pkgs")
 def _make_image_pkgs() -> List[DriftPackage]:
     packages = []
@@ -212,251 +261,1352 @@ def test__export_raw_data(runner, client, conf, export_path, topics, timeseries)
     assert client.walk.call_args_list[0][1]["ttl"] == 360
 
 
+@pytest.fixture(name="set_aliases")
+def _set_aliases(runner, conf, address):
+    for name in ("device-1", "device-2", "other"):
+        runner(f"-c {conf} alias add {name}", input=f"{address}\npassword\ndata\n")
+
+
+@pytest.mark.usefixtures("set_aliases")
+@pytest.mark.parametrize("sources", ["device-1 device-2/panda", "'device-*'"])
+def test__export_raw_data_aliases(
+    runner, client, conf, export_path, topics, timeseries, sources
+):
+    """Should export several aliases into their folders at once"""
+    client.walk.side_effect = [Iterator(timeseries) for _ in range(4)]
+    result = runner(
+        f"-c {conf} -p 3 export raw {sources} {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z"
+    )
+    assert result.exit_code == 0
+    for alias in ("device-1", "device-2"):
+        for topic in topics:
+            assert f"Topic '{alias}/{topic}' (copied 2 packages" in result.output
+            assert (export_path / alias / topic / "1.dp").exists()
+            assert (export_path / alias / topic / "2.dp").exists()
+
+    assert not (export_path / "other").exists()
+    assert client.walk.call_count == 4
+    assert client.walk.call_args_list[0][1]["ttl"] == 540
+
+
+@pytest.mark.usefixtures("set_aliases", "client")
+def test__export_raw_data_aliases_no_match(runner, conf, export_path):
+    """Should fail if a pattern matches no aliases"""
+    result = runner(
+        f"-c {conf} export raw device-1 'test-*' {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z"
+    )
+    assert result.exit_code == 1
+    assert "Error: no aliases match 'test-*'" in result.output
+
+
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_with_metadata(
+def test__export_raw_data_parallel_auto(
     runner, client, conf, export_path, topics, timeseries
 ):
-    """Test export raw data with metadata"""
+    """Should adjust number of parallel topics at runtime"""
     client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
     result = runner(
-        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 "
-        f"--stop 2022-01-02 --with-metadata"
+        f"-c {conf} -p auto export raw test {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z"
     )
-    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
-    assert f"Topic '{topics[1]}' (copied 2 packages (943 B)" in result.output
-
     assert result.exit_code == 0
-    assert (export_path / topics[0] / "1.json").exists()
-    assert (export_path / topics[0] / "2.json").exists()
-    assert (export_path / topics[1] / "1.json").exists()
-    assert (export_path / topics[1] / "2.json").exists()
-
-    with open(export_path / topics[0] / "1.json", encoding="utf-8") as file:
-        metadata = json.load(file)
-        assert metadata == {
-            "id": 1,
-            "labels": {},
-            "published_time": 0.0,
-            "source_timestamp": 0.0,
-            "status": 0,
-            "time_series_info": {
-                "start_timestamp": "1970-01-01T00:00:00.001Z",
-                "stop_timestamp": "1970-01-01T00:00:00.002Z",
-            },
-        }
+    assert (export_path / topics[0] / "2.dp").exists()
+    assert (export_path / topics[1] / "2.dp").exists()
+    assert client.walk.call_args_list[0][1]["ttl"] == 360
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_as_csv(runner, client, conf, export_path, topics, timeseries):
-    """Test export raw data as csv"""
-    client.walk.side_effect = [
-        Iterator(timeseries),
-        Iterator(timeseries),
-        Iterator(timeseries),
-        Iterator(timeseries),
-    ]
+@pytest.mark.parametrize("parallel", ["0", "many"])
+def test__export_raw_data_parallel_invalid(runner, conf, export_path, parallel):
+    """Should accept only positive number or auto"""
     result = runner(
-        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --csv"
+        f"-c {conf} -p {parallel} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02"
     )
+    assert result.exit_code == 2
+    assert "Invalid value for '--parallel'" in result.output
 
-    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
-    assert f"Topic '{topics[1]}' (copied 2 packages (943 B)" in result.output
 
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_max_bandwidth(
+    mocker, runner, client, conf, export_path, topics, timeseries
+):
+    """Should pass all packages through shared token bucket"""
+    consume = mocker.spy(TokenBucket, "consume")
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --max-bandwidth 1MB"
+    )
     assert result.exit_code == 0
+    assert (export_path / topics[1] / "2.dp").exists()
 
-    assert (export_path / f"{topics[0]}.csv").exists()
-    assert (export_path / f"{topics[1]}.csv").exists()
-
-    with open(export_path / f"{topics[0]}.csv", encoding="utf-8") as file:
-        assert file.readline().strip() == "topic1,2,1,3"  # topic, count, start, stop
+    assert consume.call_count == 4
+    assert len({id(call.args[0]) for call in consume.call_args_list}) == 1
+    assert consume.call_args_list[0].args[0].rate == 1_000_000
 
 
-@pytest.mark.usefixtures("set_alias", "client")
-def test__export_raw_data_start_stop_required(runner, conf, export_path):
-    """Test export raw data start stop required"""
-    result = runner(f"-c {conf} -p 1 export raw test {export_path}")
-    assert "Error: --start and --stop are required" in result.output
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_max_bandwidth_zero(runner, client, conf, export_path):
+    """Should check bandwidth"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --max-bandwidth 0MB"
+    )
     assert result.exit_code == 1
+    assert "Error: --max-bandwidth must be positive" in result.output
+    assert client.walk.call_count == 0
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_image(runner, client, conf, export_path):
-    """Should skip no image"""
-    pkg = DriftPackage()
-    pkg.status = 0
-    pkg.meta.type = MetaInfo.IMAGE
+def test__export_raw_data_max_bandwidth_invalid(runner, client, conf, export_path):
+    """Should report bandwidth which can't be parsed"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --max-bandwidth 20XB"
+    )
+    assert result.exit_code == 1
+    assert "Error: --max-bandwidth must be a size, e.g. 20MB" in result.output
+    assert client.walk.call_count == 0
 
-    client.walk.side_effect = [
-        Iterator([DriftDataPackage(pkg.SerializeToString())])
-    ] * 2
 
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_check_options_first(mocker, runner, conf, export_path):
+    """Should check options before connecting to the device"""
+    kls = mocker.patch(
+        "drift_cli.export.DriftClient", side_effect=ConnectionError("unreachable")
+    )
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --csv"
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --csv --jpeg"
     )
-    assert "[ERROR] topic1 is not a time series or typed data" in result.output
+    assert result.exit_code == 1
+    assert "Error: --csv and --jpeg are mutually exclusive" in result.output
+    assert not kls.called
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_topics(runner, client, conf, export_path, topics, timeseries):
-    """Should export only selected topics"""
-    client.walk.side_effect = [Iterator(timeseries)] * len(topics)
+@pytest.mark.parametrize("fsync, synced", [("none", False), ("batch", True)])
+@pytest.mark.parametrize("mode", ["", "--archive", "--csv"])
+def test__export_raw_data_fsync(
+    mocker, runner, client, conf, export_path, timeseries, mode, fsync, synced
+):
+    """Should flush written files to disk according to fsync policy"""
+    os_fsync = mocker.patch("drift_cli.export_impl.writer.os.fsync")
+    client.walk.side_effect = [Iterator(timeseries) for _ in range(4)]
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--topics {topics[0]}"
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 {mode} --fsync {fsync}"
     )
-
-    assert f"'{topics[1]}'" not in result.output
     assert result.exit_code == 0
-
-    assert (export_path / topics[0] / "1.dp").exists()
-    assert (export_path / topics[0] / "2.dp").exists()
-    assert not (export_path / topics[1] / "1.dp").exists()
-    assert not (export_path / topics[1] / "2.dp").exists()
+    assert os_fsync.called == synced
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_topics_jpeg(
-    runner, client, conf, export_path, topics, images
+def test__export_raw_data_progress_plain(
+    runner, client, conf, export_path, topics, timeseries
 ):
-    """Should exctract jpeg from wavelet buffers"""
-    client.walk.side_effect = [
-        Iterator(images),
-        Iterator(images),
-        Iterator(images),
-        Iterator(images),
-    ]
+    """Should print progress as text lines"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--jpeg"
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --progress plain"
     )
-
-    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
     assert result.exit_code == 0
-
-    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
-    img.import_from_file(
-        str(export_path / topics[0] / "1.jpeg"), denoise.Null(), codecs.RgbJpeg()
-    )
-    img.import_from_file(
-        str(export_path / topics[1] / "2.jpeg"), denoise.Null(), codecs.RgbJpeg()
-    )
+    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
+    assert f"Topic '{topics[1]}' (copied 2 packages (943 B)" in result.output
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_data_topics_jpeg_with_metadata(
-    runner, client, conf, export_path, topics, images
+def test__export_raw_data_progress_json(
+    runner, client, conf, export_path, topics, timeseries
 ):
-    """Should exctract jpeg from wavelet buffers with metadata"""
-    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    """Should print progress as JSON lines"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--jpeg "
-        f"--with-metadata"
+        f"-c {conf} -p 1 export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --progress json"
     )
-
-    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
     assert result.exit_code == 0
 
-    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
-    img.import_from_file(
-        str(export_path / topics[0] / "1.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert lines[-1]["topic"] == topics[1]
+    assert lines[-1]["packages"] == 2
+    assert lines[-1]["size"] == 943
+    assert lines[-1]["completed"] == lines[-1]["total"] == 1
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_progress_none(runner, client, conf, export_path, timeseries):
+    """Should print nothing"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --progress none"
     )
-    img.import_from_file(
-        str(export_path / topics[1] / "2.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    assert result.exit_code == 0
+    assert result.output == ""
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_profile(runner, client, conf, export_path, timeseries):
+    """Should write report with stages of each topic and cProfile stats"""
+    client.walk.side_effect = [Iterator(timeseries) for _ in range(2)]
+    report_path = Path(gettempdir()) / "drift_profile.json"
+    stats_path = Path(gettempdir()) / "drift_profile.prof"
+    result = runner(
+        f"-c {conf} --profile {report_path} --cprofile {stats_path} "
+        f"export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --csv"
     )
+    assert result.exit_code == 0
 
-    assert (export_path / topics[0] / "1.json").exists()
-    assert (export_path / topics[1] / "1.json").exists()
+    report = json.loads(report_path.read_text())
+    stages = {(s["topic"], s["stage"]): s["calls"] for s in report["stages"]}
+    assert stages[("topic1", "walk")] == 3
+    assert stages[("topic1", "decode")] == 2
+    assert ("topic2", "write") in stages
+    assert stats_path.stat().st_size > 0
 
-    with open(export_path / topics[0] / "1.json", encoding="utf-8") as file:
-        metadata = json.load(file)
-        assert metadata == {
-            "id": 1,
-            "labels": {},
-            "image_info": {"channel_layout": "RGB", "height": "100", "width": "100"},
-            "published_time": 0.0,
-            "source_timestamp": 0.0,
-            "status": 0,
-            "type": "IMAGE",
-        }
+    report_path.unlink()
+    stats_path.unlink()
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_jpeg_skip_bad_packages(runner, client, conf, export_path, topics):
-    """Should skip bad packages and continue"""
-    bad_package = DriftPackage()
-    bad_package.id = 1
-    bad_package.status = StatusCode.BAD
+def test__export_raw_data_trace(runner, client, conf, export_path, topics, images):
+    """Should write trace with waits, walks, transcoding and writes of each topic"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    trace_path = Path(gettempdir()) / "drift_trace.json"
+    result = runner(
+        f"-c {conf} -p 1 --trace {trace_path} export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --jpeg --workers 1"
+    )
+    assert result.exit_code == 0
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    trace_path.unlink()
+    names = {(e["name"], e["ph"], e["args"].get("topic")) for e in events}
+    for topic in topics:
+        assert ("wait", "b", topic) in names
+        assert ("export", "e", topic) in names
+        assert ("walk", "X", topic) in names
+        assert ("jpeg", "X", topic) in names
+        assert ("write", "X", topic) in names
+
+    thread_names = [e["args"]["name"] for e in events if e["ph"] == "M"]
+    assert any(name.startswith("walk") for name in thread_names)
+    assert any(name.startswith("writer") for name in thread_names)
 
-    client.walk.side_effect = [
-        Iterator([DriftDataPackage(bad_package.SerializeToString())] * 2),
-        Iterator([DriftDataPackage(bad_package.SerializeToString())] * 2),
-    ]
 
+@pytest.mark.usefixtures("set_alias")
+@pytest.mark.parametrize("prefetch", [0, 1, 16])
+def test__export_raw_data_prefetch(
+    runner, client, conf, export_path, topics, timeseries, prefetch
+):
+    """Should export the same packages with any read-ahead depth"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--jpeg"
+        f"-c {conf} -p 2 export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --prefetch {prefetch}"
     )
-
-    assert "Can't extract picture from  topic1/1.dp" in result.output
-    assert "Can't extract picture from  topic2/1.dp" in result.output
+    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
     assert result.exit_code == 0
 
-    assert not (export_path / topics[0] / "1.jpeg").exists()
-    assert not (export_path / topics[1] / "1.jpeg").exists()
+    for topic in topics:
+        assert (export_path / topic / "1.dp").read_bytes() == timeseries[0].blob
+        assert (export_path / topic / "2.dp").read_bytes() == timeseries[1].blob
+
+
+class FailingIterator(Iterator):  # pylint: disable=too-few-public-methods
+    """Helper class to mock iterator which fails after all items"""
+
+    def __next__(self):
+        if self.items:
+            return self.items.pop(0)
+        raise DriftClientError("Connection lost")
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_jpeg_stacked_image(
-    runner, client, conf, export_path, topics, image_pkgs
+def test__export_raw_data_prefetch_error(
+    runner, client, conf, export_path, topics, timeseries
 ):
-    """Should export stacked image as few jpeg files"""
-    for pkg in image_pkgs:
-        pkg.meta.image_info.channel_layout = "GGG"
-
-    images = [DriftDataPackage(pkg.SerializeToString()) for pkg in image_pkgs]
-    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    """Should show error from read-ahead and keep fetched packages"""
+    client.walk.side_effect = [FailingIterator(timeseries), FailingIterator(timeseries)]
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--jpeg"
+        f"-c {conf} -p 2 export raw test {export_path} "
+        f"--start 2022-01-01 --stop 2022-01-02 --prefetch 4"
     )
+    assert "[ERROR] Connection lost" in result.output
+    assert result.exit_code == 0
+    assert (export_path / topics[0] / "2.dp").exists()
+    assert (export_path / topics[1] / "2.dp").exists()
 
-    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
 
-    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
-    img.import_from_file(
-        str(export_path / topics[0] / "1_0.jpeg"), denoise.Null(), codecs.GrayJpeg()
-    )
-    img.import_from_file(
-        str(export_path / topics[0] / "1_1.jpeg"), denoise.Null(), codecs.GrayJpeg()
-    )
-    img.import_from_file(
-        str(export_path / topics[0] / "1_2.jpeg"), denoise.Null(), codecs.GrayJpeg()
-    )
+def _walk_by_window(packages):
+    def _walk(_topic, start, stop, **_kwargs):
+        return Iterator(
+            [pkg for pkg in packages if start <= pkg.package_id / 1000 < stop]
+        )
+
+    return _walk
 
 
 @pytest.mark.usefixtures("set_alias")
-def test__export_raw_typed_data(runner, client, conf, export_path, topics, typed_data):
-    """Should export typed data"""
-    client.walk.side_effect = [
-        Iterator(typed_data),
-        Iterator(typed_data),
-        Iterator(typed_data),
-        Iterator(typed_data),
-    ]
+def test__export_raw_data_shards(
+    runner, client, conf, export_path, topics, day_timeseries
+):
+    """Should walk each topic in several time windows"""
+    client.walk.side_effect = _walk_by_window(day_timeseries)
     result = runner(
-        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
-        f"--csv"
+        f"-c {conf} -p 2 export raw test {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z --shards 3"
     )
-
-    assert f"Topic '{topics[0]}' (copied 2 packages (380 B)" in result.output
     assert result.exit_code == 0
+    assert f"Topic '{topics[0]}' (copied 6 packages" in result.output
 
-    assert (export_path / f"{topics[0]}.csv").exists()
-    assert (export_path / f"{topics[1]}.csv").exists()
+    assert client.walk.call_count == 6
+    windows = [
+        (call[1]["start"], call[1]["stop"]) for call in client.walk.call_args_list
+    ]
+    assert sorted(set(windows)) == [
+        (1640995200.0, 1641024000.0),
+        (1641024000.0, 1641052800.0),
+        (1641052800.0, 1641081600.0),
+    ]
 
-    with open(export_path / f"{topics[0]}.csv", encoding="utf-8") as file:
+    for pkg in day_timeseries:
+        for topic in topics:
+            assert (export_path / topic / f"{pkg.package_id}.dp").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_shards_ordered(
+    mocker, runner, client, conf, export_path, day_timeseries
+):
+    """Should spool next windows in executor threads and keep timestamp order"""
+    threads = []
+    spool_write = _Spool._write  # pylint: disable=protected-access
+
+    def _write(spool, pos, blob):
+        threads.append(threading.current_thread())
+        return spool_write(spool, pos, blob)
+
+    mocker.patch.object(_Spool, "_write", _write)
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --shards 3 --archive --resume"
+    )
+    assert result.exit_code == 0
+
+    assert threads and threading.main_thread() not in threads
+    index = (export_path / "topic1" / "index.dpi").read_bytes()
+    assert [record[0] for record in INDEX_RECORD.iter_unpack(index)] == [
+        pkg.package_id for pkg in day_timeseries
+    ]
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_shards_as_csv(
+    runner, client, conf, export_path, topics, day_timeseries
+):
+    """Should stitch windows of time series in timestamp order"""
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z --shards 3 --csv"
+    )
+    assert result.exit_code == 0
+    assert "has gaps" not in result.output
+    assert client.walk.call_count == 6
+
+    with open(export_path / f"{topics[0]}.csv", encoding="utf-8") as file:
+        assert file.readline().strip() == "topic1,6,1640995200000,1641081600000"
+        values = [float(line) for line in file.readlines()]
+        assert values == [float(i) for i in range(6) for _ in range(4)]
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_resume(runner, client, conf, export_path, day_timeseries):
+    """Should continue export from checkpoint"""
+    client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z --topics topic1"
+    )
+    assert result.exit_code == 0
+
+    with open(export_path / ".checkpoints" / "topic1.json", encoding="utf-8") as file:
+        checkpoint = json.load(file)
+        assert checkpoint["mode"] == "raw"
+        assert checkpoint["package_id"] == day_timeseries[2].package_id
+        assert checkpoint["count"] == 3
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} "
+        f"--start 2022-01-01T00:00:00Z --stop 2022-01-02T00:00:00Z --topics topic1 --resume"
+    )
+    assert result.exit_code == 0
+    assert "Topic 'topic1' (copied 3 packages" in result.output
+    assert client.walk.call_args[1]["start"] == day_timeseries[2].package_id / 1000
+
+    with open(export_path / ".checkpoints" / "topic1.json", encoding="utf-8") as file:
+        assert json.load(file)["count"] == 6
+    for pkg in day_timeseries:
+        assert (export_path / "topic1" / f"{pkg.package_id}.dp").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_remove_stale_checkpoint(
+    runner, client, conf, export_path, day_timeseries
+):
+    """Should remove checkpoint of the previous run if the new one can't save it"""
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1"
+    )
+    assert (export_path / ".checkpoints" / "topic1.json").exists()
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --shards 3"
+    )
+    assert result.exit_code == 0
+    assert not (export_path / ".checkpoints" / "topic1.json").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_resume_archive(
+    runner, client, conf, export_path, day_timeseries
+):
+    """Should continue archive from checkpoint"""
+    client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --archive"
+    )
+    with open(export_path / "topic1" / "index.dpi", "ab") as file:
+        file.write(b"garbage")
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --archive --resume"
+    )
+    assert result.exit_code == 0
+
+    reader = ArchiveReader(export_path / "topic1")
+    assert list(reader) == [(pkg.package_id, pkg.blob) for pkg in day_timeseries]
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_archive_twice(
+    runner, client, conf, export_path, day_timeseries
+):
+    """Should overwrite archive of the previous run without --resume"""
+    for _ in range(2):
+        client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+        result = runner(
+            f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+            f"--stop 2022-01-02T00:00:00Z --topics topic1 --archive"
+        )
+        assert result.exit_code == 0
+
+    reader = ArchiveReader(export_path / "topic1")
+    assert reader.ids() == [pkg.package_id for pkg in day_timeseries[:3]]
+    assert (export_path / "topic1" / "index.dpi").stat().st_size == 3 * 24
+
+
+@pytest.mark.usefixtures("set_alias")
+@pytest.mark.parametrize("mode", ["csv", "npy"])
+def test__export_raw_data_resume_timeseries(
+    runner, client, conf, export_path, day_timeseries, mode
+):
+    """Should append new data to time series after data of the previous run"""
+    client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --{mode}"
+    )
+
+    # data written after the last checkpoint must be dropped
+    with open(export_path / f"topic1.{mode}", "ab") as file:
+        file.write(b"garbage")
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --{mode} --resume"
+    )
+    assert result.exit_code == 0
+    assert "has gaps" not in result.output
+
+    if mode == "csv":
+        with open(export_path / "topic1.csv", encoding="utf-8") as file:
+            assert file.readline().strip() == "topic1,6,1640995200000,1641081600000"
+            data = np.array([float(line) for line in file.readlines()])
+    else:
+        data = np.load(export_path / "topic1.npy")
+    assert np.allclose(data, np.repeat(np.arange(6), 4), atol=1e-3)
+
+
+@pytest.mark.usefixtures("set_alias")
+@pytest.mark.parametrize("mode", ["csv", "npy"])
+def test__export_raw_data_aggregate(
+    runner, client, conf, export_path, day_timeseries, mode
+):
+    """Should write statistics of time windows instead of samples"""
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --{mode} "
+        f"--aggregate 8h --stats min,max,mean"
+    )
+    assert result.exit_code == 0
+
+    if mode == "csv":
+        with open(export_path / "topic1.csv", encoding="utf-8") as file:
+            assert file.readline().strip() == (
+                "topic1,6,1640995200000,1641081600000,28800000,min|max|mean"
+            )
+            assert file.readline().startswith("1640995200000,0.00000,")
+            file.seek(0)
+            data = np.loadtxt(file, delimiter=",", skiprows=1)
+    else:
+        data = np.load(export_path / "topic1.npy")
+        with open(export_path / "topic1.npy.json", encoding="utf-8") as file:
+            summary = json.load(file)
+        assert summary["period_ms"] == 28800000
+        assert summary["stats"] == ["min", "max", "mean"]
+    assert data[:, 0].tolist() == [1640995200000 + i * 28800000 for i in range(3)]
+    assert np.allclose(data[:, 1:], [[0, 1, 0.5], [2, 3, 2.5], [4, 5, 4.5]], atol=1e-3)
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_resume_aggregate(
+    runner, client, conf, export_path, day_timeseries
+):
+    """Should continue the window of the previous run"""
+    client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv --aggregate 8h --stats mean"
+    )
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv --aggregate 8h "
+        f"--stats mean --resume"
+    )
+    assert result.exit_code == 0
+
+    with open(export_path / "topic1.csv", encoding="utf-8") as file:
+        assert file.readline().strip() == (
+            "topic1,6,1640995200000,1641081600000,28800000,mean"
+        )
+        data = np.loadtxt(file, delimiter=",")
+    assert data[:, 0].tolist() == [1640995200000 + i * 28800000 for i in range(3)]
+    assert np.allclose(data[:, 1], [0.5, 2.5, 4.5], atol=1e-3)
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+@pytest.mark.parametrize(
+    "options, error",
+    [
+        ("--aggregate 1s", "--aggregate is supported only with --csv or --npy"),
+        ("--csv --aggregate 1x", "Failed to parse 1x"),
+        ("--csv --aggregate 0s", "--aggregate must be positive"),
+        ("--csv --aggregate infs", "Failed to parse infs"),
+        ("--csv --aggregate nanms", "Failed to parse nanms"),
+        ("--csv --aggregate 1e308d", "Failed to parse 1e308d"),
+        ("--csv --aggregate 1s --stats median", "Unknown statistics 'median'"),
+    ],
+)
+def test__export_raw_data_aggregate_invalid(runner, conf, export_path, options, error):
+    """Should check options of aggregation"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 {options}"
+    )
+    assert result.exit_code == 1
+    assert f"Error: {error}" in result.output
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_plan(runner, client, conf, topics, day_timeseries):
+    """Should print estimates of topics without exporting them"""
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export plan test --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --samples 3"
+    )
+    assert result.exit_code == 0
+    assert "Export plan" in result.output
+    for topic in topics:
+        assert f"{topic} │        6 │" in result.output
+    assert "Total  │       12 │" in result.output
+    assert client.walk.call_count == 6
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+def test__export_plan_start_stop_required(runner, conf):
+    """Should require time range"""
+    result = runner(f"-c {conf} export plan test")
+    assert "Error: --start and --stop are required" in result.output
+    assert result.exit_code == 1
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_compress(
+    runner, client, conf, export_path, topics, timeseries
+):
+    """Should compress raw data and metadata"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--with-metadata --metadata-format jsonl --compress gzip"
+    )
+    assert result.exit_code == 0
+
+    for topic in topics:
+        blob = gzip.decompress((export_path / topic / "1.dp.gz").read_bytes())
+        assert blob == timeseries[0].blob
+        assert not (export_path / topic / "1.dp").exists()
+        with gzip.open(export_path / f"{topic}.meta.jsonl.gz", "rt") as file:
+            assert [json.loads(line)["id"] for line in file] == [1, 2]
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_resume_compressed_csv(
+    runner, client, conf, export_path, day_timeseries
+):
+    """Should append compressed streams after the last checkpoint"""
+    client.walk.side_effect = _walk_by_window(day_timeseries[:3])
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv --compress xz"
+    )
+    with open(export_path / "topic1.csv.xz", "ab") as file:
+        file.write(b"garbage")
+
+    client.walk.side_effect = _walk_by_window(day_timeseries)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv --compress xz --resume"
+    )
+    assert result.exit_code == 0
+
+    with lzma.open(export_path / "topic1.csv.xz", "rt") as file:
+        data = np.array([float(line) for line in file.readlines()])
+    assert np.allclose(data, np.repeat(np.arange(6), 4), atol=1e-3)
+    with open(export_path / "topic1.csv.json", encoding="utf-8") as file:
+        assert json.load(file) == {
+            "topic": "topic1",
+            "count": 6,
+            "first_timestamp": 1640995200000,
+            "last_timestamp": 1641081600000,
+        }
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_compress_typed_data(
+    runner, client, conf, export_path, typed_data
+):
+    """Should compress typed data without the summary line"""
+    client.walk.side_effect = [Iterator(typed_data), Iterator(typed_data)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--csv --compress bz2"
+    )
+    assert result.exit_code == 0
+
+    with bz2.open(export_path / "topic1.csv.bz2", "rt") as file:
+        assert file.readline().strip() == "timestamp,bool,float,int,string"
+    with open(export_path / "topic1.csv.json", encoding="utf-8") as file:
+        assert json.load(file)["count"] == 2
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_typed_data_io_in_writer(
+    mocker, runner, client, conf, export_path, typed_data
+):
+    """Should open files and load checkpoints in writer threads"""
+    threads = []
+
+    def _in_thread(func):
+        def _call(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return func(*args, **kwargs)
+
+        return _call
+
+    mocker.patch("drift_cli.export_impl.raw.open_output", _in_thread(open_output))
+    mocker.patch(
+        "drift_cli.export_impl.raw.TopicCheckpoint", _in_thread(TopicCheckpoint)
+    )
+    client.walk.side_effect = [Iterator(typed_data), Iterator(typed_data)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--csv --compress gzip --resume"
+    )
+    assert result.exit_code == 0
+    assert len(threads) == 6  # two checkpoints and a file for each topic
+    assert threading.main_thread() not in threads
+    with gzip.open(export_path / "topic1.csv.gz", "rt") as file:
+        assert len(file.readlines()) == 3
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+@pytest.mark.parametrize("mode", ["--archive", "--npy"])
+def test__export_raw_data_compress_invalid(runner, conf, export_path, mode):
+    """Should reject --compress for files which are rewritten or indexed"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"{mode} --compress gzip"
+    )
+    assert result.exit_code == 1
+    assert "Error: --compress is not supported with --archive and --npy" in (
+        result.output
+    )
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_compress_fsync_always(runner, client, conf, export_path):
+    """Should reject --compress with --fsync always which flushes after each row"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--csv --compress gzip --fsync always"
+    )
+    assert result.exit_code == 1
+    assert "Error: --compress is not supported with --fsync always" in result.output
+    assert not client.walk.called
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_stdout(runner, client, conf, topics, timeseries):
+    """Should stream packages to stdout as frames and progress to stderr"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test - --start 2022-01-01 --stop 2022-01-02 "
+        f"--progress plain"
+    )
+    assert result.exit_code == 0
+    assert f"Topic '{topics[0]}' (copied 2 packages" in result.stderr
+
+    frames = list(read_frames(io.BytesIO(result.stdout_bytes)))
+    assert sorted((topic, package_id) for topic, package_id, _, _ in frames) == [
+        (topics[0], 1),
+        (topics[0], 2),
+        (topics[1], 1),
+        (topics[1], 2),
+    ]
+    assert frames[0][3] == timeseries[0].blob
+    assert not Path("-").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_stdout_typed_data(
+    runner, client, conf, typed_data, timeseries
+):
+    """Should stream typed data as NDJSON rows and skip other topics"""
+    client.walk.side_effect = [Iterator(typed_data), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test - --start 2022-01-01 --stop 2022-01-02 --csv"
+    )
+    assert result.exit_code == 0
+    assert "[SKIPPED] Topic topic2 is not typed data" in result.stderr
+
+    rows = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(rows) == 2
+    assert rows[0] == {
+        "topic": "topic1",
+        "timestamp": typed_data[0].package_id,
+        "bool": True,
+        "float": 1.0,
+        "int": 1,
+        "string": "string",
+    }
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+def test__export_raw_data_stdout_invalid(runner, conf):
+    """Should reject options which need files"""
+    result = runner(
+        f"-c {conf} export raw test - --start 2022-01-01 --stop 2022-01-02 "
+        f"--archive --resume"
+    )
+    assert result.exit_code == 1
+    assert "Error: --archive, --resume can't be used with DEST '-'" in result.output
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_resume_typed_data(
+    runner, client, conf, export_path, typed_data_pkgs
+):
+    """Should append new rows of typed data"""
+    for i, pkg in enumerate(typed_data_pkgs):
+        pkg.id = 1640995200_000 + i * 1000
+    packages = [DriftDataPackage(pkg.SerializeToString()) for pkg in typed_data_pkgs]
+
+    client.walk.side_effect = _walk_by_window(packages[:1])
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv"
+    )
+    client.walk.side_effect = _walk_by_window(packages)
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01T00:00:00Z "
+        f"--stop 2022-01-02T00:00:00Z --topics topic1 --csv --resume"
+    )
+    assert result.exit_code == 0
+
+    with open(export_path / "topic1.csv", encoding="utf-8") as file:
+        assert file.readline().strip() == "topic1,2,1640995200000,0"
+        assert file.readline().strip() == "timestamp,bool,float,int,string"
+        assert file.readline().strip() == "1640995200000,True,1.0,1,string"
+        assert file.readline().strip() == "1640995201000,True,1.0,1,string"
+        assert file.readline() == ""
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_with_metadata(
+    runner, client, conf, export_path, topics, timeseries
+):
+    """Test export raw data with metadata"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 --with-metadata"
+    )
+    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
+    assert f"Topic '{topics[1]}' (copied 2 packages (943 B)" in result.output
+
+    assert result.exit_code == 0
+    assert (export_path / topics[0] / "1.json").exists()
+    assert (export_path / topics[0] / "2.json").exists()
+    assert (export_path / topics[1] / "1.json").exists()
+    assert (export_path / topics[1] / "2.json").exists()
+
+    with open(export_path / topics[0] / "1.json", encoding="utf-8") as file:
+        metadata = json.load(file)
+        assert metadata == {
+            "id": 1,
+            "labels": {},
+            "published_time": 0.0,
+            "source_timestamp": 0.0,
+            "status": 0,
+            "time_series_info": {
+                "start_timestamp": "1970-01-01T00:00:00.001Z",
+                "stop_timestamp": "1970-01-01T00:00:00.002Z",
+            },
+        }
+
+
+@pytest.mark.usefixtures("set_alias")
+@pytest.mark.parametrize("mode", ["", "--archive"])
+def test__export_raw_data_with_metadata_jsonl(
+    runner, client, conf, export_path, topics, timeseries, mode
+):
+    """Should export metadata as one line per package"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 --with-metadata --metadata-format jsonl {mode}"
+    )
+    assert result.exit_code == 0
+    assert not (export_path / topics[0] / "1.json").exists()
+
+    with open(export_path / f"{topics[0]}.meta.jsonl", encoding="utf-8") as file:
+        lines = file.readlines()
+
+    assert len(lines) == 2
+    assert lines[0] == (
+        '{"id":1,"status":0,"published_time":0.0,"source_timestamp":0.0,"labels":{},'
+        '"time_series_info":{"start_timestamp":"1970-01-01T00:00:00.001Z",'
+        '"stop_timestamp":"1970-01-01T00:00:00.002Z"}}\n'
+    )
+    assert json.loads(lines[1])["id"] == 2
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_archive(
+    runner, client, conf, export_path, topics, timeseries
+):
+    """Should export raw data into archive and extract it back"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 --archive"
+    )
+    assert result.exit_code == 0
+    assert not (export_path / topics[0] / "1.dp").exists()
+    assert (export_path / topics[0] / "index.dpi").exists()
+
+    result = runner(
+        f"-c {conf} export extract {export_path / topics[0]} {export_path / 'out'} --ids 2"
+    )
+    assert result.exit_code == 0
+    assert (export_path / "out" / "2.dp").read_bytes() == timeseries[1].blob
+    assert not (export_path / "out" / "1.dp").exists()
+
+    result = runner(
+        f"-c {conf} export extract {export_path / topics[1]} {export_path / 'all'}"
+    )
+    assert result.exit_code == 0
+    assert (export_path / "all" / "1.dp").read_bytes() == timeseries[0].blob
+    assert (export_path / "all" / "2.dp").read_bytes() == timeseries[1].blob
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_as_csv(runner, client, conf, export_path, topics, timeseries):
+    """Test export raw data as csv"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --csv"
+    )
+
+    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
+    assert f"Topic '{topics[1]}' (copied 2 packages (943 B)" in result.output
+
+    assert result.exit_code == 0
+
+    assert (export_path / f"{topics[0]}.csv").exists()
+    assert (export_path / f"{topics[1]}.csv").exists()
+
+    with open(export_path / f"{topics[0]}.csv", encoding="utf-8") as file:
+        assert file.readline().strip() == "topic1,2,1,3"  # topic, count, start, stop
+
+    # the packages read to detect the type of topic aren't read again
+    assert client.walk.call_count == 2
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_as_npy(
+    runner, client, conf, export_path, topics, day_timeseries
+):
+    """Test export time series as npy"""
+    client.walk.side_effect = [Iterator(day_timeseries) for _ in range(2)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --npy"
+    )
+    assert result.exit_code == 0
+
+    data = np.load(export_path / f"{topics[0]}.npy", mmap_mode="r")
+    assert np.allclose(data, np.repeat(np.arange(6), 4), atol=1e-3)
+
+    with open(export_path / f"{topics[0]}.npy.json", encoding="utf-8") as file:
+        assert json.load(file) == {
+            "topic": "topic1",
+            "count": 6,
+            "first_timestamp": 1640995200000,
+            "last_timestamp": 1641081600000,
+        }
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_as_npy_typed_data(
+    runner, client, conf, export_path, typed_data
+):
+    """Should not export typed data as npy"""
+    client.walk.side_effect = [Iterator(typed_data), Iterator(typed_data)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --npy"
+    )
+    assert (
+        "[ERROR] topic1 is typed data, --npy supports only time series" in result.output
+    )
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+def test__export_raw_data_npy_and_csv(runner, conf, export_path):
+    """Should not mix --npy with --csv"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --npy --csv"
+    )
+    assert (
+        "Error: --npy can't be used with --csv, --jpeg or --with-metadata"
+        in result.output
+    )
+    assert result.exit_code == 1
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+def test__export_raw_data_start_stop_required(runner, conf, export_path):
+    """Test export raw data start stop required"""
+    result = runner(f"-c {conf} -p 1 export raw test {export_path}")
+    assert "Error: --start and --stop are required" in result.output
+    assert result.exit_code == 1
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_image(runner, client, conf, export_path):
+    """Should skip no image"""
+    pkg = DriftPackage()
+    pkg.id = 1
+    pkg.status = 0
+    pkg.meta.type = MetaInfo.IMAGE
+
+    client.walk.side_effect = [
+        Iterator([DriftDataPackage(pkg.SerializeToString())]) for _ in range(2)
+    ]
+
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 --csv"
+    )
+    assert "[ERROR] topic1 is not a time series or typed data" in result.output
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_topics(runner, client, conf, export_path, topics, timeseries):
+    """Should export only selected topics"""
+    client.walk.side_effect = [Iterator(timeseries)] * len(topics)
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--topics {topics[0]}"
+    )
+
+    assert f"'{topics[1]}'" not in result.output
+    assert result.exit_code == 0
+
+    assert (export_path / topics[0] / "1.dp").exists()
+    assert (export_path / topics[0] / "2.dp").exists()
+    assert not (export_path / topics[1] / "1.dp").exists()
+    assert not (export_path / topics[1] / "2.dp").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_exclude(
+    runner, client, conf, export_path, topics, timeseries
+):
+    """Should skip excluded topics"""
+    client.walk.side_effect = [Iterator(timeseries)]
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--topics 'topic*' --exclude 're:topic[2-9]'"
+    )
+    assert result.exit_code == 0
+    assert (export_path / topics[0] / "1.dp").exists()
+    assert not (export_path / topics[1]).exists()
+    assert client.walk.call_count == 1
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_topics_jpeg(
+    runner, client, conf, export_path, topics, images
+):
+    """Should exctract jpeg from wavelet buffers"""
+    client.walk.side_effect = [
+        Iterator(images),
+        Iterator(images),
+        Iterator(images),
+        Iterator(images),
+    ]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg"
+    )
+
+    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
+    assert result.exit_code == 0
+
+    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
+    img.import_from_file(
+        str(export_path / topics[0] / "1.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    )
+    img.import_from_file(
+        str(export_path / topics[1] / "2.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    )
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_jpeg_scale(runner, client, conf, export_path, topics, images):
+    """Should export images with lower resolution"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg --jpeg-scale 1 --workers 1"
+    )
+    assert result.exit_code == 0
+
+    img = WaveletImage([50, 50], 3, 1, WaveletType.DB1)
+    img.import_from_file(
+        str(export_path / topics[0] / "1.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    )
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_jpeg_pyramid(
+    runner, client, conf, export_path, topics, images
+):
+    """Should export images with several resolutions into scale folders"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg --pyramid 2,0,5 --workers 1"
+    )
+    assert result.exit_code == 0
+
+    # the buffer has 2 decomposition steps, so larger scale factors are limited
+    for scale, size in ((0, 100), (2, 25), (5, 25)):
+        for topic in topics:
+            assert (export_path / topic / f"scale_{scale}" / "2.jpeg").exists()
+        img = WaveletImage([size, size], 3, 1, WaveletType.DB1)
+        img.import_from_file(
+            str(export_path / topics[0] / f"scale_{scale}" / "1.jpeg"),
+            denoise.Null(),
+            codecs.RgbJpeg(),
+        )
+    assert not (export_path / topics[0] / "1.jpeg").exists()
+
+
+class _ComposeCounter:  # pylint: disable=too-few-public-methods
+    """Wavelet buffer which records scale factors of compose() calls"""
+
+    def __init__(self, buffer):
+        self.parameters = buffer.parameters
+        self.calls = []
+        self._buffer = buffer
+
+    def __getitem__(self, channels):
+        view = self._buffer[channels]
+
+        def _compose(scale_factor=0):
+            self.calls.append(scale_factor)
+            return view.compose(scale_factor=scale_factor)
+
+        return SimpleNamespace(compose=_compose)
+
+
+def test__extract_jpeg_pyramid(images):
+    """Should compose each channel slice once for each distinct scale factor"""
+    buffer = _ComposeCounter(images[0].as_buffer())
+    pyramid = extract_jpeg_pyramid(buffer, "RGB", [1, 0, 2, 5])
+
+    # the buffer has 2 decomposition steps, scale factor 5 is the same as 2
+    assert buffer.calls == [1, 0, 2]
+    assert pyramid[3] == pyramid[2]
+    for jpegs, scale_factor in zip(pyramid, [1, 0, 2]):
+        assert jpegs == extract_jpeg_images_from_buffer(
+            images[0].as_buffer(), "RGB", scale_factor
+        )
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+@pytest.mark.parametrize(
+    "options, error",
+    [
+        ("--pyramid 0,1", "Error: --jpeg-scale and --pyramid need --jpeg"),
+        ("--jpeg --pyramid 0,x", "Error: Invalid scale factors '0,x'"),
+        ("--jpeg --pyramid=-1,0", "Error: Scale factors must not be negative"),
+        (
+            "--jpeg --jpeg-scale 1 --pyramid 0,1",
+            "Error: --jpeg-scale and --pyramid are mutually exclusive",
+        ),
+    ],
+)
+def test__export_raw_data_pyramid_invalid(runner, conf, export_path, options, error):
+    """Should check options of images"""
+    result = runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"{options}"
+    )
+    assert result.exit_code == 1
+    assert error in result.output
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_topics_jpeg_one_worker(
+    runner, client, conf, export_path, topics, images
+):
+    """Should transcode all images with a single worker process"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    result = runner(
+        f"-c {conf} -p 2 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg --workers 1"
+    )
+
+    assert result.exit_code == 0
+    for topic in topics:
+        assert (export_path / topic / "1.jpeg").exists()
+        assert (export_path / topic / "2.jpeg").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_data_topics_jpeg_with_metadata(
+    runner, client, conf, export_path, topics, images
+):
+    """Should exctract jpeg from wavelet buffers with metadata"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg "
+        f"--with-metadata"
+    )
+
+    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
+    assert result.exit_code == 0
+
+    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
+    img.import_from_file(
+        str(export_path / topics[0] / "1.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    )
+    img.import_from_file(
+        str(export_path / topics[1] / "2.jpeg"), denoise.Null(), codecs.RgbJpeg()
+    )
+
+    assert (export_path / topics[0] / "1.json").exists()
+    assert (export_path / topics[1] / "1.json").exists()
+
+    with open(export_path / topics[0] / "1.json", encoding="utf-8") as file:
+        metadata = json.load(file)
+        assert metadata == {
+            "id": 1,
+            "labels": {},
+            "image_info": {"channel_layout": "RGB", "height": "100", "width": "100"},
+            "published_time": 0.0,
+            "source_timestamp": 0.0,
+            "status": 0,
+            "type": "IMAGE",
+        }
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_jpeg_skip_bad_packages(runner, client, conf, export_path, topics):
+    """Should skip bad packages and continue"""
+    bad_package = DriftPackage()
+    bad_package.id = 1
+    bad_package.status = StatusCode.BAD
+
+    client.walk.side_effect = [
+        Iterator([DriftDataPackage(bad_package.SerializeToString())] * 2),
+        Iterator([DriftDataPackage(bad_package.SerializeToString())] * 2),
+    ]
+
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg"
+    )
+
+    assert "Can't extract picture from  topic1/1.dp" in result.output
+    assert "Can't extract picture from  topic2/1.dp" in result.output
+    assert result.exit_code == 0
+
+    assert not (export_path / topics[0] / "1.jpeg").exists()
+    assert not (export_path / topics[1] / "1.jpeg").exists()
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_jpeg_stacked_image(
+    runner, client, conf, export_path, topics, image_pkgs
+):
+    """Should export stacked image as few jpeg files"""
+    for pkg in image_pkgs:
+        pkg.meta.image_info.channel_layout = "GGG"
+
+    images = [DriftDataPackage(pkg.SerializeToString()) for pkg in image_pkgs]
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--jpeg"
+    )
+
+    assert f"Topic '{topics[0]}' (copied 2 packages (241 KB)" in result.output
+
+    img = WaveletImage([100, 100], 3, 1, WaveletType.DB1)
+    img.import_from_file(
+        str(export_path / topics[0] / "1_0.jpeg"), denoise.Null(), codecs.GrayJpeg()
+    )
+    img.import_from_file(
+        str(export_path / topics[0] / "1_1.jpeg"), denoise.Null(), codecs.GrayJpeg()
+    )
+    img.import_from_file(
+        str(export_path / topics[0] / "1_2.jpeg"), denoise.Null(), codecs.GrayJpeg()
+    )
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_raw_typed_data(runner, client, conf, export_path, topics, typed_data):
+    """Should export typed data"""
+    client.walk.side_effect = [Iterator(typed_data), Iterator(typed_data)]
+    result = runner(
+        f"-c {conf} -p 1 export raw test {export_path} --start 2022-01-01 --stop 2022-01-02 "
+        f"--csv"
+    )
+
+    assert f"Topic '{topics[0]}' (copied 2 packages (380 B)" in result.output
+    assert result.exit_code == 0
+
+    assert (export_path / f"{topics[0]}.csv").exists()
+    assert (export_path / f"{topics[1]}.csv").exists()
+
+    with open(export_path / f"{topics[0]}.csv", encoding="utf-8") as file:
         assert file.readline().strip() == "topic1,2,1,0"
         assert file.readline().strip() == "timestamp,bool,float,int,string"
         assert file.readline().strip() == "1,True,1.0,1,string"
         assert file.readline().strip() == "2,True,1.0,1,string"
+
+
+@pytest.fixture(name="local_path")
+def _make_local_path() -> Path:
+    path = Path(gettempdir()) / "drift_local"
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.mark.usefixtures("set_alias")
+@pytest.mark.parametrize("mode", ["", "--archive"])
+def test__export_local_as_csv(
+    runner, client, conf, export_path, local_path, topics, timeseries, mode
+):
+    """Should transcode exported raw data into CSV without the device"""
+    client.walk.side_effect = [Iterator(timeseries), Iterator(timeseries)]
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 "
+        f"--stop 2022-01-02 {mode}"
+    )
+    client.walk.reset_mock()
+
+    result = runner(f"-c {conf} -p 2 export local {export_path} {local_path} --csv")
+    assert result.exit_code == 0
+    assert f"Topic '{topics[0]}' (copied 2 packages (943 B)" in result.output
+    assert not client.walk.called
+
+    for topic in topics:
+        with open(local_path / f"{topic}.csv", encoding="utf-8") as file:
+            assert file.readline().strip() == f"{topic},2,1,3"
+
+
+@pytest.mark.usefixtures("set_alias")
+def test__export_local_as_jpeg(
+    runner, client, conf, export_path, local_path, topics, images
+):
+    """Should transcode exported raw data into JPEG with metadata"""
+    client.walk.side_effect = [Iterator(images), Iterator(images)]
+    runner(
+        f"-c {conf} export raw test {export_path} --start 2022-01-01 --stop 2022-01-02"
+    )
+
+    result = runner(
+        f"-c {conf} export local {export_path} {local_path} --topics {topics[0]} "
+        f"--jpeg --with-metadata"
+    )
+    assert result.exit_code == 0
+    assert (local_path / topics[0] / "1.jpeg").exists()
+    assert (local_path / topics[0] / "2.json").exists()
+    assert not (local_path / topics[1]).exists()
+
+
+@pytest.mark.usefixtures("set_alias", "client")
+def test__export_local_empty(runner, conf, local_path, export_path):
+    """Should fail if there are no packages"""
+    (export_path / "topic").mkdir(parents=True)
+    result = runner(f"-c {conf} export local {export_path} {local_path} --csv")
+    assert f"Error: no packages found in {export_path}" in result.output
+    assert result.exit_code == 1
@@ -0,0 +1,205 @@
+"""Unit tests for limiter of parallel topics"""
+
+import asyncio
+
+import pytest
+
+from drift_cli.utils.limiter import AdaptiveLimiter, Limiter, TokenBucket, make_limiter
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """Fake clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test__limit_active_tasks():
+    """Should run not more tasks than the limit"""
+    limiter = Limiter(2)
+    active = []
+
+    async def _task():
+        async with limiter:
+            active.append(limiter.active)
+            await asyncio.sleep(0.01)
+
+    async def _run():
+        await asyncio.gather(*[_task() for _ in range(5)])
+
+    asyncio.run(_run())
+    assert max(active) == 2
+    assert limiter.active == 0
+
+
+def test__wake_waiters_on_increase():
+    """Should start waiting tasks when the limit increases"""
+    clock = Clock()
+    limiter = AdaptiveLimiter(initial=1, maximum=4, interval=1.0, clock=clock)
+    started = []
+
+    async def _task(number: int):
+        async with limiter:
+            started.append(number)
+            await asyncio.sleep(0.05)
+
+    async def _run():
+        tasks = [asyncio.create_task(_task(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert started == [0]
+
+        clock.now += 1.0
+        limiter.add(100)
+        await asyncio.sleep(0.01)
+        assert started == [0, 1]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(_run())
+    assert limiter.limit == 2
+
+
+def test__cancel_waiter():
+    """Should not lose slot when a waiting task is cancelled"""
+    limiter = Limiter(1)
+
+    async def _run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+    asyncio.run(_run())
+    assert limiter.active == 1
+
+
+def _saturate(limiter: AdaptiveLimiter):
+    async def _run():
+        while limiter.active < limiter.limit:
+            await limiter.acquire()
+
+    asyncio.run(_run())
+
+
+def test__additive_increase():
+    """Should add a slot each interval while all slots are busy
+    and the throughput grows"""
+    clock = Clock()
+    limiter = AdaptiveLimiter(initial=2, maximum=4, interval=5.0, clock=clock)
+
+    for step in range(1, 5):
+        _saturate(limiter)
+        clock.now += 5.0
+        limiter.add(1000 * step)
+    assert limiter.limit == 4
+    assert limiter.throughput == 800.0
+
+
+def test__no_increase_if_not_saturated():
+    """Should keep limit if there are free slots"""
+    clock = Clock()
+    limiter = AdaptiveLimiter(initial=2, interval=5.0, clock=clock)
+
+    clock.now += 5.0
+    limiter.add(1000)
+    assert limiter.limit == 2
+
+
+def test__multiplicative_decrease_on_error():
+    """Should halve limit if a task fails"""
+    clock = Clock()
+    limiter = AdaptiveLimiter(initial=8, maximum=8, interval=5.0, clock=clock)
+
+    clock.now += 5.0
+    limiter.error()
+    assert limiter.limit == 4
+
+    clock.now += 5.0
+    limiter.error()
+    clock.now += 5.0
+    limiter.error()
+    clock.now += 5.0
+    limiter.error()
+    assert limiter.limit == 1
+
+
+def test__multiplicative_decrease_on_throughput_drop():
+    """Should halve limit if the throughput drops with all slots busy"""
+    clock = Clock()
+    updates = []
+    limiter = AdaptiveLimiter(
+        initial=4,
+        interval=5.0,
+        clock=clock,
+        on_update=lambda limiter: updates.append(limiter.limit),
+    )
+    _saturate(limiter)
+
+    clock.now += 5.0
+    limiter.add(10_000)
+    _saturate(limiter)
+    clock.now += 5.0
+    limiter.add(5_000)
+    assert updates == [5, 2]
+
+
+def test__make_limiter():
+    """Should make fixed or adaptive limiter"""
+    assert type(make_limiter(10)) is Limiter  # pylint: disable=unidiomatic-typecheck
+    assert make_limiter(10).limit == 10
+
+    limiter = make_limiter("auto", maximum=3)
+    assert isinstance(limiter, AdaptiveLimiter)
+    assert limiter.maximum == 3
+
+
+def test__token_bucket():
+    """Should make consumers wait for tokens at the rate"""
+    clock = Clock()
+    bucket = TokenBucket(1000, clock=clock)
+
+    assert bucket.reserve(600) == 0.0
+    assert bucket.reserve(600) == pytest.approx(0.2)
+
+    clock.now += 0.2
+    assert bucket.reserve(500) == pytest.approx(0.5)
+
+
+def test__token_bucket_burst():
+    """Should not save more tokens than the burst size"""
+    clock = Clock()
+    bucket = TokenBucket(1000, burst=500, clock=clock)
+
+    clock.now += 10
+    assert bucket.reserve(500) == 0.0
+    assert bucket.reserve(500) == pytest.approx(0.5)
+
+
+def test__token_bucket_shared():
+    """Should limit total throughput of concurrent consumers"""
+    bucket = TokenBucket(100_000, burst=1)
+
+    async def _consume():
+        for _ in range(5):
+            await bucket.consume(2_000)
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(_consume(), _consume())
+        return loop.time() - started
+
+    assert asyncio.run(_run()) >= 0.19
+
+
+def test__token_bucket_rate():
+    """Should check rate"""
+    with pytest.raises(ValueError):
+        TokenBucket(0)
@@ -0,0 +1,84 @@
+"""Unit tests for local source of export"""
+
+import gzip
+import lzma
+import shutil
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+from drift_protocol.common import DriftPackage
+
+from drift_cli.export_impl.archive import ArchiveWriter
+from drift_cli.export_impl.local import LocalClient
+
+
+def _blob(package_id: int) -> bytes:
+    pkg = DriftPackage()
+    pkg.id = package_id
+    return pkg.SerializeToString()
+
+
+@pytest.fixture(name="folder")
+def _make_folder() -> Path:
+    path = Path(gettempdir()) / "drift_local_source"
+    (path / "files").mkdir(parents=True)
+    for package_id in (1000, 2500, 3000):
+        (path / "files" / f"{package_id}.dp").write_bytes(_blob(package_id))
+    (path / "files" / "1000.json").write_text("{}")
+    (path / "compressed").mkdir()
+    for package_id in (6000, 7000):
+        blob = gzip.compress(_blob(package_id))
+        (path / "compressed" / f"{package_id}.dp.gz").write_bytes(blob)
+    (path / "compressed" / "6000.json.gz").write_bytes(gzip.compress(b"{}"))
+    # runs with and without --compress into the same folder
+    (path / "mixed").mkdir()
+    (path / "mixed" / "8000.dp").write_bytes(_blob(8000))
+    (path / "mixed" / "9000.dp.xz").write_bytes(lzma.compress(_blob(9000)))
+
+    archive = ArchiveWriter(path / "archive")
+    for package_id in (4000, 5000):
+        archive.append(package_id, _blob(package_id))
+    archive.close()
+
+    (path / ".checkpoints").mkdir()
+    yield path
+    shutil.rmtree(path)
+
+
+def test__get_topics(folder):
+    """Should take subfolders as topics and skip hidden ones"""
+    assert LocalClient(folder).get_topics() == [
+        "archive",
+        "compressed",
+        "files",
+        "mixed",
+    ]
+
+
+@pytest.mark.parametrize(
+    "topic, start, stop, ids",
+    [
+        ("files", 0, 10, [1000, 2500, 3000]),
+        ("files", 1, 3, [1000, 2500]),
+        ("files", 2.5, 2.6, [2500]),
+        ("archive", 4, 5, [4000]),
+        ("archive", 6, 7, []),
+        ("compressed", 0, 10, [6000, 7000]),
+        ("mixed", 0, 10, [8000, 9000]),
+    ],
+)
+def test__walk(folder, topic, start, stop, ids):
+    """Should walk packages with start <= timestamp < stop"""
+    client = LocalClient(folder)
+    assert [pkg.package_id for pkg in client.walk(topic, start, stop)] == ids
+
+
+def test__time_range(folder):
+    """Should cover all packages of topics"""
+    client = LocalClient(folder)
+    assert client.time_range(["files"]) == (
+        "1970-01-01T00:00:01+00:00",
+        "1970-01-01T00:00:04+00:00",
+    )
+    assert client.time_range(["files", "archive"])[1] == "1970-01-01T00:00:06+00:00"
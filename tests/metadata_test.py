@@ -0,0 +1,75 @@
+"""Unit tests for metadata conversion"""
+
+import pytest
+from drift_protocol.common import StatusCode
+from drift_protocol.meta import ImageInfo, MetaInfo
+from google.protobuf.json_format import MessageToDict
+
+from drift_cli.export_impl.metadata import message_to_dict
+
+
+def _time_series() -> MetaInfo:
+    meta = MetaInfo()
+    meta.type = MetaInfo.TIME_SERIES
+    info = meta.time_series_info
+    info.start_timestamp.FromMilliseconds(1640995200123)
+    info.stop_timestamp.FromMilliseconds(1640995201123)
+    info.size = 10
+    info.first = 0.1
+    info.mean = 1 / 3
+    info.max = float("nan")
+    info.min = float("-inf")
+    return meta
+
+
+def _image() -> MetaInfo:
+    meta = MetaInfo()
+    meta.type = MetaInfo.IMAGE
+    meta.image_info.type = ImageInfo.JPEG
+    meta.image_info.width = 640
+    meta.image_info.height = 480
+    meta.image_info.channel_layout = "RGB"
+    return meta
+
+
+def _typed_data() -> MetaInfo:
+    meta = MetaInfo()
+    meta.type = MetaInfo.TYPED_DATA
+    for name, status in [("a", StatusCode.GOOD), ("b", StatusCode.BAD)]:
+        item = meta.typed_data_info.items.add()
+        item.name = name
+        item.status = status
+    return meta
+
+
+def _alignment() -> MetaInfo:
+    meta = MetaInfo()
+    package = meta.alignment_info.packages.add()
+    package.topic = "topic"
+    package.meta.CopyFrom(_image())
+    return meta
+
+
+def _wavelet_buffer() -> MetaInfo:
+    meta = MetaInfo()
+    meta.wavelet_buffer_info.decomposition_steps = 3
+    meta.wavelet_buffer_info.threshold_denoising.a = 0.5
+    return meta
+
+
+@pytest.mark.parametrize(
+    "meta",
+    [
+        MetaInfo(),
+        _time_series(),
+        _image(),
+        _typed_data(),
+        _alignment(),
+        _wavelet_buffer(),
+    ],
+)
+def test__same_as_message_to_dict(meta):
+    """Should convert metadata as MessageToDict does"""
+    assert message_to_dict(meta) == MessageToDict(
+        meta, preserving_proto_field_name=True
+    )
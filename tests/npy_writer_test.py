@@ -0,0 +1,50 @@
+"""Unit tests for NPY writer"""
+
+import json
+from pathlib import Path
+from tempfile import gettempdir
+
+import numpy as np
+import pytest
+
+from drift_cli.export_impl.npy_writer import TimeseriesNpyWriter
+
+
+@pytest.fixture(name="npy_path")
+def _make_npy_path() -> Path:
+    path = Path(gettempdir()) / "drift_writer.npy"
+    yield path
+    path.unlink(missing_ok=True)
+    Path(f"{path}.json").unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("shape", [(100,), (100, 3)])
+def test__write_blocks(npy_path, shape):
+    """Should write blocks as one array which can be memory-mapped"""
+    blocks = [np.random.rand(*shape) for _ in range(3)]
+
+    writer = TimeseriesNpyWriter(npy_path)
+    for block in blocks:
+        writer.write(block)
+    writer.close("topic", 3, 1, 2)
+
+    data = np.load(npy_path, mmap_mode="r")
+    assert data.dtype == np.float32
+    assert np.array_equal(data, np.concatenate(blocks).astype(np.float32))
+
+    with open(f"{npy_path}.json", encoding="utf-8") as file:
+        assert json.load(file) == {
+            "topic": "topic",
+            "count": 3,
+            "first_timestamp": 1,
+            "last_timestamp": 2,
+        }
+
+
+def test__wrong_shape(npy_path):
+    """Should not mix blocks with different number of channels"""
+    writer = TimeseriesNpyWriter(npy_path)
+    writer.write(np.zeros((10, 2)))
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((10, 3)))
+    writer.close("topic", 1, 1, 2)
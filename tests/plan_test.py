@@ -0,0 +1,159 @@
+"""Unit tests for export plan"""
+
+import asyncio
+from typing import List
+
+from drift_client import DriftDataPackage
+from drift_client.error import DriftClientError
+from drift_protocol.common import DriftPackage
+from rich.console import Console
+
+from drift_cli.export_impl.plan import (
+    TopicPlan,
+    plan_export,
+    print_plan,
+    sample_topic,
+    total_duration,
+)
+
+START = 1640995200  # 2022-01-01T00:00:00Z
+
+
+class Client:  # pylint: disable=too-few-public-methods
+    """Topics with a package of the given size every second"""
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.calls = []
+
+    def walk(self, topic: str, start: float, stop: float) -> List[DriftDataPackage]:
+        """Walk packages"""
+        self.calls.append((topic, start, stop))
+        count, size = self.topics[topic]
+        if count is None:
+            raise DriftClientError("Topic is broken")
+
+        for package_id in range(int(start), min(int(stop), START + count)):
+            pkg = DriftPackage()
+            pkg.id = package_id * 1000
+            pkg.data.add().value = b"x" * size
+            yield DriftDataPackage(pkg.SerializeToString())
+
+
+def test__sample_topic():
+    """Should extrapolate packages in sampled windows to the whole range"""
+    client = Client({"topic": (3600, 100)})
+    plan = sample_topic(
+        client,
+        "topic",
+        "2022-01-01T00:00:00Z",
+        "2022-01-01T01:00:00Z",
+        samples=4,
+        sample_size=10,
+    )
+
+    assert plan.packages == 3600
+    assert plan.sampled == 40
+    assert not plan.exact
+    assert 100 * 3600 < plan.size < 120 * 3600
+    assert plan.speed > 0
+    assert plan.duration == plan.size / plan.speed
+    assert [call[1] for call in client.calls] == [START + i * 900 for i in range(4)]
+
+
+def test__sample_small_topic():
+    """Should count packages exactly if windows have fewer packages than sample size"""
+    client = Client({"topic": (15, 100)})
+    plan = sample_topic(
+        client,
+        "topic",
+        "2022-01-01T00:00:00Z",
+        "2022-01-01T01:00:00Z",
+        samples=4,
+        sample_size=20,
+    )
+    assert plan.packages == 15
+    assert plan.exact
+
+
+def test__plan_export():
+    """Should sort topics by size and skip broken ones"""
+    client = Client({"small": (5, 10), "large": (5, 1000), "broken": (None, 0)})
+    plans = asyncio.run(
+        plan_export(
+            client,
+            ["small", "large", "broken"],
+            2,
+            start="2022-01-01T00:00:00Z",
+            stop="2022-01-01T01:00:00Z",
+        )
+    )
+    assert [plan.topic for plan in plans] == ["large", "small"]
+
+
+class LoopClient(Client):  # pylint: disable=too-few-public-methods
+    """Client which runs a request in its event loop for each package
+    as DriftClient does"""
+
+    def __init__(self, topics, loop):
+        super().__init__(topics)
+        self._loop = loop
+
+    def _run(self, coro):
+        if self._loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+        return self._loop.run_until_complete(coro)
+
+    def walk(self, topic: str, start: float, stop: float) -> List[DriftDataPackage]:
+        for pkg in super().walk(topic, start, stop):
+            yield self._run(asyncio.sleep(0.001, result=pkg))
+
+
+def test__plan_export_in_event_loop():
+    """Should walk topics in parallel while the event loop of the client is running"""
+
+    async def _run():
+        client = LoopClient(
+            {f"topic{i}": (20, 10 * (i + 1)) for i in range(4)},
+            asyncio.get_running_loop(),
+        )
+        return await asyncio.wait_for(
+            plan_export(
+                client,
+                list(client.topics),
+                10,
+                start="2022-01-01T00:00:00Z",
+                stop="2022-01-01T01:00:00Z",
+            ),
+            timeout=10,
+        )
+
+    plans = asyncio.run(_run())
+    assert [plan.topic for plan in plans] == ["topic3", "topic2", "topic1", "topic0"]
+    assert all(plan.sampled > 0 for plan in plans)
+
+
+def test__total_duration():
+    """Should divide duration between parallel topics"""
+    plans = [
+        TopicPlan(topic=str(i), duration=duration)
+        for i, duration in enumerate([10, 2, 2, 2])
+    ]
+    assert total_duration(plans, 1) == 16
+    assert total_duration(plans, 2) == 10
+    assert total_duration([], 2) == 0
+
+
+def test__print_plan():
+    """Should print table with totals"""
+    console = Console(width=200, record=True)
+    plans = [
+        TopicPlan(topic="topic1", packages=100, size=2000, exact=True),
+        TopicPlan(topic="topic2", packages=50, size=1000, exact=False),
+    ]
+    print_plan(plans, 2, console)
+
+    text = console.export_text()
+    assert "topic1 │      100 │" in text
+    assert "~50" in text
+    assert "Total  │     ~150 │" in text
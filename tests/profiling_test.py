@@ -0,0 +1,71 @@
+"""Unit tests for profiling of stages"""
+
+import json
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+from rich.console import Console
+
+from drift_cli.utils.profiling import Profiler, profiled, record, set_profiler, stage
+
+
+@pytest.fixture(name="profiler")
+def _make_profiler() -> Profiler:
+    profiler = Profiler()
+    set_profiler(profiler)
+    yield profiler
+    set_profiler(None)
+
+
+def test__stage(profiler):
+    """Should count calls and time of stages for each topic"""
+    for _ in range(3):
+        with stage("decode", "topic1"):
+            sum(range(10000))
+    with stage("write", "topic2"):
+        pass
+    record("jpeg", "topic1", 2.0, 1.5)
+
+    stages = profiler.report()["stages"]
+    assert [(s["topic"], s["stage"], s["calls"]) for s in stages] == [
+        ("topic1", "decode", 3),
+        ("topic1", "jpeg", 1),
+        ("topic2", "write", 1),
+    ]
+    assert stages[0]["wall"] > 0
+    assert stages[0]["cpu"] > 0
+    assert stages[1]["wall"] == 2.0
+    assert stages[1]["cpu"] == 1.5
+
+
+def test__profiled(profiler):
+    """Should measure each next() of iterator"""
+    assert list(profiled(iter([1, 2, 3]), "walk", "topic")) == [1, 2, 3]
+    assert profiler.report()["stages"][0]["calls"] == 4
+
+
+def test__disabled():
+    """Should do nothing if profiling is disabled"""
+    items = iter([1, 2])
+    assert profiled(items, "walk", "topic") is items
+    with stage("decode", "topic"):
+        pass
+    record("jpeg", "topic", 1.0, 1.0)
+
+
+def test__summary_and_report(profiler):
+    """Should print table and save JSON report"""
+    with stage("walk", "topic1"):
+        pass
+
+    console = Console(record=True, width=120)
+    profiler.print_summary(console)
+    assert "topic1" in console.export_text()
+
+    path = Path(gettempdir()) / "drift_profile.json"
+    profiler.save(path)
+    report = json.loads(path.read_text())
+    path.unlink()
+    assert report["stages"][0]["stage"] == "walk"
+    assert report["elapsed"] > 0
@@ -0,0 +1,85 @@
+"""Unit tests for progress reporting"""
+
+import json
+
+import pytest
+from rich.console import Console
+
+from drift_cli.utils.progress import LineProgress, SpeedMeter
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """Fake clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test__speed_meter():
+    """Should measure speed in sliding window"""
+    clock = Clock()
+    meter = SpeedMeter(window=5.0, buckets=10, clock=clock)
+    assert meter.speed() == 0.0
+
+    for _ in range(10):
+        meter.add(100)
+        clock.now += 0.5
+    assert meter.speed() == pytest.approx(200.0, rel=0.1)
+
+    clock.now += 2.5
+    assert meter.speed() == pytest.approx(100.0, rel=0.2)
+
+    clock.now += 100
+    assert meter.speed() == 0.0
+
+
+def test__speed_meter_start():
+    """Should measure speed since the first sample when the window isn't full"""
+    clock = Clock()
+    meter = SpeedMeter(window=5.0, clock=clock)
+    meter.add(100)
+    clock.now += 1.0
+    meter.add(100)
+    assert meter.speed() == pytest.approx(200.0)
+
+
+@pytest.fixture(name="console")
+def _make_console() -> Console:
+    return Console(record=True, width=200)
+
+
+def test__line_progress_throttle(console):
+    """Should print advances not more often than interval but other updates at once"""
+    progress = LineProgress("plain", interval=3600, console=console)
+    task = progress.add_task("waiting", total=10)
+    for i in range(10):
+        progress.update(task, description=f"copied {i}", advance=1)
+    progress.update(task, description="done", total=1, completed=True)
+
+    assert console.export_text().splitlines() == ["copied 0", "done"]
+
+
+def test__line_progress_json(console):
+    """Should print updates as JSON lines with fields"""
+    progress = LineProgress("json", console=console)
+    task = progress.add_task("waiting", total=10)
+    progress.update(task, description="copied", advance=5, packages=2)
+
+    assert json.loads(console.export_text()) == {
+        "description": "copied",
+        "completed": 5,
+        "total": 10,
+        "packages": 2,
+    }
+
+
+def test__line_progress_none(console):
+    """Should print nothing"""
+    progress = LineProgress("none", console=console)
+    task = progress.add_task("waiting", total=10)
+    progress.update(task, description="copied", advance=5)
+
+    assert console.export_text() == ""
@@ -0,0 +1,73 @@
+"""Unit tests for topic selector"""
+
+import re
+
+import pytest
+
+from drift_cli.utils.helpers import filter_topics
+from drift_cli.utils.selector import TopicSelector
+
+TOPICS = [
+    "sensor-1",
+    "sensor-2",
+    "sensor-10",
+    "sensor-1/temp",
+    "camera-front",
+    "camera-rear",
+    "log",
+]
+
+
+@pytest.mark.parametrize(
+    "include, exclude, expected",
+    [
+        ([], [], TOPICS),
+        (["log", "camera-rear"], [], ["camera-rear", "log"]),
+        (["sensor-*"], [], ["sensor-1", "sensor-2", "sensor-10", "sensor-1/temp"]),
+        (["sensor-?"], [], ["sensor-1", "sensor-2"]),
+        (["sensor-[12]0"], [], ["sensor-10"]),
+        (["*-front", "log"], [], ["camera-front", "log"]),
+        (["re:sensor-\\d+"], [], ["sensor-1", "sensor-2", "sensor-10"]),
+        (["re:.*/temp|log"], [], ["sensor-1/temp", "log"]),
+        ([], ["sensor-*"], ["camera-front", "camera-rear", "log"]),
+        (["sensor-*"], ["*/temp", "sensor-2"], ["sensor-1", "sensor-10"]),
+        (
+            ["*"],
+            ["re:camera-.*", "log"],
+            ["sensor-1", "sensor-2", "sensor-10", "sensor-1/temp"],
+        ),
+        (["sensor"], [], []),
+    ],
+)
+def test__select(include, exclude, expected):
+    """Should select topics which match include and don't match exclude patterns"""
+    assert TopicSelector(include, exclude).select(TOPICS) == expected
+
+
+def test__same_prefix():
+    """Should match patterns with the same literal prefix"""
+    selector = TopicSelector(["sensor-*/temp", "sensor-?", "sensor-1*"])
+    assert selector.select(TOPICS) == [
+        "sensor-1",
+        "sensor-2",
+        "sensor-10",
+        "sensor-1/temp",
+    ]
+
+
+def test__invalid_regex():
+    """Should raise error for invalid regular expression"""
+    with pytest.raises(re.error):
+        TopicSelector(["re:sensor-("])
+
+
+def test__filter_topics():
+    """Should keep behaviour of --topics with empty names and trailing *"""
+    assert filter_topics(TOPICS, [""]) == TOPICS
+    assert filter_topics(TOPICS, []) == TOPICS
+    assert filter_topics(TOPICS, ["camera*", "log"]) == [
+        "camera-front",
+        "camera-rear",
+        "log",
+    ]
+    assert filter_topics(TOPICS, ["camera*"], ["camera-rear", ""]) == ["camera-front"]
@@ -0,0 +1,61 @@
+"""Unit tests for stream of exported packages"""
+
+import io
+import json
+
+import pytest
+from drift_client import DriftDataPackage
+from drift_protocol.common import DriftPackage
+
+from drift_cli.export_impl.stream import FrameWriter, read_frames
+
+
+def _package(package_id: int, blob: bytes = b"") -> DriftDataPackage:
+    pkg = DriftPackage()
+    pkg.id = package_id
+    pkg.status = 0
+    pkg.data.add().value = blob
+    return DriftDataPackage(pkg.SerializeToString())
+
+
+def test__frames():
+    """Should write packages as frames which read_frames() reads back"""
+    stream = io.BytesIO()
+    packages = [_package(1, b"x" * 100), _package(2)]
+    writer = FrameWriter(stream, chunk_size=64)
+    writer.write_package("topic", packages[0])
+    assert stream.getvalue() != b""  # the chunk is full
+
+    writer.write_package("тема", packages[1])
+    writer.flush()
+
+    stream.seek(0)
+    assert list(read_frames(stream)) == [
+        ("topic", 1, 0, packages[0].blob),
+        ("тема", 2, 0, packages[1].blob),
+    ]
+
+
+def test__rows():
+    """Should write rows as NDJSON"""
+    stream = io.BytesIO()
+    writer = FrameWriter(stream)
+    writer.write_row({"topic": "topic", "timestamp": 1, "value": 1.5})
+    writer.write_row({"topic": "topic", "timestamp": 2, "value": b"\x00"})
+    assert stream.getvalue() == b""
+
+    writer.flush()
+    lines = stream.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(line)["timestamp"] for line in lines] == [1, 2]
+    assert lines[0] == '{"topic":"topic","timestamp":1,"value":1.5}'
+
+
+def test__truncated_frame():
+    """Should raise error if the stream ends in the middle of a frame"""
+    stream = io.BytesIO()
+    writer = FrameWriter(stream)
+    writer.write_package("topic", _package(1, b"data"))
+    writer.flush()
+
+    with pytest.raises(EOFError):
+        list(read_frames(io.BytesIO(stream.getvalue()[:-1])))
@@ -0,0 +1,63 @@
+"""Unit tests for tracing"""
+
+import json
+import os
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+
+from drift_cli.utils import tracing
+from drift_cli.utils.profiling import record, stage
+from drift_cli.utils.tracing import Tracer, set_tracer
+
+
+@pytest.fixture(name="tracer")
+def _make_tracer() -> Tracer:
+    tracer = Tracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+
+
+@pytest.fixture(name="trace_path")
+def _make_trace_path() -> Path:
+    path = Path(gettempdir()) / "drift_trace.json"
+    yield path
+    path.unlink(missing_ok=True)
+
+
+def test__trace(tracer, trace_path):
+    """Should write stages, async events and thread names in Chrome format"""
+    tracing.begin("wait", "topic1")
+    tracing.end("wait", "topic1")
+    with stage("decode", "topic1"):
+        pass
+    record("jpeg", "topic1", 0.5, 0.4, started=10.0, pid=1)
+    tracer.save(trace_path)
+
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    phases = [(event["name"], event["ph"]) for event in events]
+    assert phases == [
+        ("thread_name", "M"),
+        ("thread_name", "M"),
+        ("wait", "b"),
+        ("wait", "e"),
+        ("decode", "X"),
+        ("jpeg", "X"),
+    ]
+    assert events[0]["pid"] == os.getpid()
+    assert events[1]["args"] == {"name": "worker 1"}
+    assert events[2]["id"] == events[3]["id"]
+    assert events[4]["args"] == {"topic": "topic1"}
+    assert events[5]["ts"] == 10e6
+    assert events[5]["dur"] == pytest.approx(0.5e6)
+
+
+def test__disabled(trace_path):
+    """Should do nothing if tracing is disabled"""
+    tracing.begin("wait", "topic1")
+    tracing.end("wait", "topic1")
+    with stage("decode", "topic1"):
+        pass
+    assert not trace_path.exists()
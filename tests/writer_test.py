@@ -0,0 +1,114 @@
+"""Unit tests for writer threads"""
+
+import asyncio
+import threading
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+
+from drift_cli.export_impl.csv_writer import TimeseriesCsvWriter
+from drift_cli.export_impl.writer import Writer
+
+
+@pytest.fixture(name="folder")
+def _make_folder() -> Path:
+    path = Path(gettempdir()) / "drift_writer"
+    path.mkdir(exist_ok=True)
+    yield path
+    for file in path.iterdir():
+        file.unlink()
+    path.rmdir()
+
+
+def test__keep_order_of_topic(folder):
+    """Should execute operations of a key in order of submission"""
+    calls = []
+
+    async def _run():
+        with Writer(lanes=2, queue_size=1) as writer:
+            for i in range(10):
+                await writer.submit(i % 3, calls.append, i)
+                await writer.write_file(i % 3, folder / f"{i}.dp", bytes([i]))
+            for key in range(3):
+                await writer.sync(key)
+
+    asyncio.run(_run())
+    for key in range(3):
+        assert [i for i in calls if i % 3 == key] == list(range(key, 10, 3))
+    assert (folder / "7.dp").read_bytes() == b"\x07"
+
+
+def test__raise_error():
+    """Should raise error of a queued operation on next call"""
+
+    def _fail():
+        raise OSError("No space left on device")
+
+    async def _run():
+        with Writer() as writer:
+            await writer.submit("topic", _fail)
+            await writer.sync("topic")
+
+    with pytest.raises(OSError, match="No space left on device"):
+        asyncio.run(_run())
+
+
+def test__call():
+    """Should return result of operation"""
+
+    async def _run():
+        with Writer() as writer:
+            return await writer.call("topic", sum, [1, 2, 3])
+
+    assert asyncio.run(_run()) == 6
+
+
+def test__scoped():
+    """Should give topics of different scopes their own keys"""
+    threads = {}
+
+    async def _run():
+        with Writer(lanes=2) as writer:
+            assert writer.scoped("") is writer
+            for scope in ("device-1", "device-2"):
+                scoped = writer.scoped(scope)
+                threads[scope] = await scoped.call("topic", threading.get_ident)
+                await scoped.sync("topic")
+
+    asyncio.run(_run())
+    assert threads["device-1"] != threads["device-2"]
+
+
+def test__wrong_policy():
+    """Should check fsync policy"""
+    with pytest.raises(ValueError, match="Unknown fsync policy 'sometimes'"):
+        Writer(fsync="sometimes")
+
+
+@pytest.mark.parametrize(
+    "fsync, after_write, after_sync",
+    [("none", 0, 0), ("batch", 0, 2), ("always", 3, 3)],
+)
+def test__fsync_policy(mocker, folder, fsync, after_write, after_sync):
+    """Should fsync files after each write, on sync or never"""
+    os_fsync = mocker.patch("drift_cli.export_impl.writer.os.fsync")
+    counts = []
+
+    async def _run():
+        with Writer(fsync=fsync) as writer:
+            stream = await writer.call(
+                "topic", TimeseriesCsvWriter, folder / "topic.csv"
+            )
+            await writer.write_file("topic", folder / "1.dp", b"data")
+            for _ in range(2):
+                await writer.submit("topic", stream.flush, target=stream)
+            await writer.call("topic", lambda: None)
+            counts.append(os_fsync.call_count)
+
+            await writer.sync("topic")
+            counts.append(os_fsync.call_count)
+            await writer.call("topic", stream.close, "topic", 0, 0, 0)
+
+    asyncio.run(_run())
+    assert counts == [after_write, after_sync]